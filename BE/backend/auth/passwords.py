@@ -0,0 +1,146 @@
+# backend/auth/passwords.py
+"""
+비밀번호 해시 (scrypt) + 전용 해시 풀.
+
+- 새 해시는 hashlib.scrypt (메모리 하드 KDF, 외부 라이브러리 없음)
+  저장 형식: "scrypt$<n>$<r>$<p>$<salt b64>$<hash b64>"
+- 예전 SHA-256 (64자리 hex) 해시도 검증은 되고, 로그인 성공 시 scrypt 로 다시 저장 (needs_rehash)
+- scrypt 1번에 수십 ms + 128 * r * n 바이트 (기본 16MB) 라서 요청 핸들러에서 바로 돌리면
+  로그인 몰릴 때 이벤트 루프가 멈추고 메모리도 예측이 안 됨 →
+  작은 전용 스레드 풀(workers 개 동시 실행 = 최대 메모리 workers * 16MB)에서만 돌리고,
+  대기 + 실행 중 요청이 max_pending 을 넘으면 PasswordHashQueueFull 로 바로 거절 (503)
+"""
+
+import asyncio
+import base64
+import contextvars
+import hashlib
+import hmac
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Callable
+
+from backend.metrics import Counter, Gauge, Histogram
+
+# scrypt 파라미터 (n 은 2의 거듭제곱). 바꾸면 다음 로그인 때 자동으로 다시 해시됨
+SCRYPT_N = int(os.getenv("KCU_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("KCU_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("KCU_SCRYPT_P", "1"))
+SCRYPT_DKLEN = 32
+SALT_BYTES = 16
+
+HASH_WORKERS = int(os.getenv("KCU_PASSWORD_HASH_WORKERS", "2"))
+HASH_MAX_PENDING = int(os.getenv("KCU_PASSWORD_HASH_MAX_PENDING", "32"))
+
+HASH_IN_FLIGHT = Gauge(
+    "kcu_password_hash_in_flight",
+    "비밀번호 해시 풀에 들어와 있는 (대기 + 처리 중) 요청 수",
+)
+HASH_REJECTED = Counter(
+    "kcu_password_hash_rejected_total",
+    "비밀번호 해시 풀이 가득 차서 503 으로 거절한 요청 수",
+)
+HASH_SECONDS = Histogram(
+    "kcu_password_hash_seconds",
+    "비밀번호 해시 / 검증 1번에 걸린 시간 (풀 대기 제외)",
+    labelnames=("op",),
+    trace=True,
+)
+
+
+class PasswordHashQueueFull(Exception):
+    """해시 풀에 더 이상 요청을 받을 자리가 없음"""
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+# 없는 계정 / 비밀번호가 없는 계정으로 로그인할 때 대신 검증하는 해시.
+# 현재 파라미터라서 실제 계정과 비용이 같고, digest 가 전부 0 이라 어떤 비밀번호와도 안 맞음
+# → 응답 시간으로 가입 여부를 알 수 없게
+DUMMY_HASH = f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(bytes(SALT_BYTES))}${_b64(bytes(SCRYPT_DKLEN))}"
+
+
+def _scrypt(plain_password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        plain_password.encode("utf-8"),
+        salt=salt, n=n, r=r, p=p,
+        maxmem=256 * r * n,  # 기본 maxmem(32MB) 보다 큰 n 도 쓸 수 있게
+        dklen=SCRYPT_DKLEN,
+    )
+
+
+def hash_password(plain_password: str) -> str:
+    started = time.perf_counter()
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(plain_password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    HASH_SECONDS.observe(time.perf_counter() - started, op="hash")
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """scrypt 해시 / 예전 SHA-256 hex 해시 둘 다 검증"""
+    started = time.perf_counter()
+    try:
+        if hashed_password.startswith("scrypt$"):
+            _, n, r, p, salt, digest = hashed_password.split("$")
+            candidate = _scrypt(plain_password, base64.b64decode(salt), int(n), int(r), int(p))
+            return hmac.compare_digest(candidate, base64.b64decode(digest))
+        legacy = hashlib.sha256(plain_password.encode("utf-8")).hexdigest()
+        return hmac.compare_digest(legacy, hashed_password)
+    except ValueError:
+        return False
+    finally:
+        HASH_SECONDS.observe(time.perf_counter() - started, op="verify")
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """예전 SHA-256 이거나 scrypt 파라미터가 현재 설정과 다르면 True"""
+    return not hashed_password.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        # 이벤트 루프 스레드에서만 바뀌는 값이라 락 필요 없음
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @asynccontextmanager
+    async def slot(self):
+        """자리가 없으면 기다리지 않고 바로 PasswordHashQueueFull"""
+        if self._pending >= self.max_pending:
+            HASH_REJECTED.inc()
+            raise PasswordHashQueueFull()
+        self._pending += 1
+        HASH_IN_FLIGHT.set(self._pending)
+        try:
+            yield
+        finally:
+            self._pending -= 1
+            HASH_IN_FLIGHT.set(self._pending)
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        async with self.slot():
+            loop = asyncio.get_running_loop()
+            # copy_context: 느린 요청 로그에 이 요청의 해시 시간이 남도록
+            return await loop.run_in_executor(self.executor, partial(contextvars.copy_context().run, fn, *args))
+
+    async def hash(self, plain_password: str) -> str:
+        return await self._run(hash_password, plain_password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+
+# 서버 전체에서 공유하는 해시 풀
+password_hasher = PasswordHasher()
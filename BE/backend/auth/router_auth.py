@@ -1,13 +1,21 @@
 # backend/auth/router_auth.py
 
 from datetime import datetime, timedelta
-import hashlib
-from typing import Optional, Dict
+import time
+from typing import Optional
 
 from fastapi import APIRouter, HTTPException, status, Depends, Body
 from pydantic import BaseModel
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database import get_async_db
+from backend.models import User
+from backend.auth.token_cache import AUTH_SECONDS, token_cache
+from backend.auth.passwords import DUMMY_HASH, PasswordHashQueueFull, needs_rehash, password_hasher
 
 # -----------------------
 #  JWT 설정
@@ -23,13 +31,15 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 router = APIRouter()
 
 # -----------------------
-#  비밀번호 해시 함수 (SHA-256)
+#  비밀번호 해시 (scrypt, 전용 풀에서 실행 → backend/auth/passwords.py)
 # -----------------------
-def hash_password(plain_password: str) -> str:
-    return hashlib.sha256(plain_password.encode("utf-8")).hexdigest()
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return hash_password(plain_password) == hashed_password
+def hash_busy() -> HTTPException:
+    # 로그인 / 가입이 몰려서 해시 풀 대기열이 가득 찬 경우
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="로그인 요청이 많습니다. 잠시 후 다시 시도해주세요.",
+        headers={"Retry-After": "1"},
+    )
 
 # -----------------------
 #  Pydantic 모델들
@@ -50,8 +60,13 @@ class Token(BaseModel):
     token_type: str = "bearer"
     email: str
 
-# 메모리 DB (이메일 → 유저 dict)
-fake_users_db: Dict[str, Dict] = {}
+# 계정은 DB users 테이블에 저장 (user_id = email, email 은 unique 인덱스)
+# 예전 메모리 dict(fake_users_db) 는 재시작하면 사라지고 워커끼리 공유도 안 됐음
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalar_one_or_none()
 
 
 # -----------------------
@@ -66,7 +81,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserPublic:
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> UserPublic:
+    """
+    토큰 검증 + 유저 확인.
+    한 번 검증한 토큰은 exp 까지 token_cache 에서 바로 꺼냄 (jwt.decode / DB 조회 생략)
+    """
+    started = time.perf_counter()
+    claims = token_cache.get(token)
+    if claims is not None:
+        AUTH_SECONDS.observe(time.perf_counter() - started, result="cache_hit")
+        return UserPublic(email=claims["sub"])
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="유효하지 않은 인증 정보입니다.",
@@ -77,13 +105,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserPublic:
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = fake_users_db.get(email)
-    if user is None:
+        user = await get_user_by_email(db, email)
+        if user is None:
+            raise credentials_exception
+    except (JWTError, HTTPException):
+        AUTH_SECONDS.observe(time.perf_counter() - started, result="rejected")
         raise credentials_exception
 
+    token_cache.put(token, payload)
+    AUTH_SECONDS.observe(time.perf_counter() - started, result="verified")
     return UserPublic(email=email)
 
 
@@ -101,38 +131,61 @@ def root():
     return {"message": "Auth Router + JWT 동작 중"}
 
 @router.post("/signup", response_model=Token)
-def signup(payload: SignUpRequest):
+async def signup(payload: SignUpRequest, db: AsyncSession = Depends(get_async_db)):
     email = payload.email
     password = payload.password
 
-    if email in fake_users_db:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="이미 존재하는 이메일입니다.",
-        )
+    duplicate = HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="이미 존재하는 이메일입니다.",
+    )
+    if await get_user_by_email(db, email) is not None:
+        raise duplicate
 
-    hashed_pw = hash_password(password)
-    fake_users_db[email] = {
-        "email": email,
-        "password": hashed_pw,
-    }
+    try:
+        hashed_pw = await password_hasher.hash(password)
+    except PasswordHashQueueFull:
+        raise hash_busy()
+    db.add(User(user_id=email, email=email, password_hash=hashed_pw))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # 같은 이메일로 동시에 가입한 경우 (unique 인덱스)
+        await db.rollback()
+        raise duplicate
 
     # 회원가입 성공 시 바로 JWT 발급
     access_token = create_access_token(data={"sub": email})
     return Token(access_token=access_token, email=email)
 
 @router.post("/login", response_model=Token)
-def login(payload: LoginRequest = Body(...)):
+async def login(payload: LoginRequest = Body(...), db: AsyncSession = Depends(get_async_db)):
     email = payload.email
     password = payload.password
 
-    user = fake_users_db.get(email)
-    if not user or not verify_password(password, user["password"]):
+    user = await get_user_by_email(db, email)
+    has_password = bool(user and user.password_hash)
+    try:
+        # 계정이 없어도 같은 비용의 scrypt 를 돌림 (바로 401 을 주면 응답 시간으로 가입 여부가 드러남)
+        verified = await password_hasher.verify(password, user.password_hash if has_password else DUMMY_HASH)
+        verified = verified and has_password
+    except PasswordHashQueueFull:
+        raise hash_busy()
+
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="이메일 또는 비밀번호가 틀렸습니다.",
         )
 
+    # 예전 SHA-256 해시 (또는 scrypt 설정 변경 전 해시) 면 로그인 성공한 김에 다시 저장
+    if needs_rehash(user.password_hash):
+        try:
+            user.password_hash = await password_hasher.hash(password)
+            await db.commit()
+        except PasswordHashQueueFull:
+            pass  # 풀이 바쁘면 다음 로그인 때 다시 시도
+
     access_token = create_access_token(data={"sub": email})
     return Token(access_token=access_token, email=email)
 
@@ -0,0 +1,69 @@
+# backend/auth/token_cache.py
+"""
+검증이 끝난 JWT -> claims 캐시.
+
+get_current_user 가 인증이 필요한 요청마다 jwt.decode (HMAC 검증 + JSON 파싱) + 유저 조회를
+다시 하지 않도록, 한 번 검증한 토큰은 exp 까지 메모리에서 바로 꺼냄.
+- 키는 토큰 문자열 전체 (서명만 키로 쓰면 payload 를 바꾼 토큰이 캐시에 걸릴 수 있음)
+- exp 가 지나면 캐시에 있어도 무효
+- 크기 제한 LRU (오래 안 쓴 토큰부터 버림)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from backend.metrics import Histogram
+
+TOKEN_CACHE_SIZE = int(os.getenv("KCU_TOKEN_CACHE_SIZE", "10000"))
+
+AUTH_SECONDS = Histogram(
+    "kcu_auth_seconds",
+    "get_current_user 에 걸린 시간 (result: cache_hit / verified / rejected)",
+    labelnames=("result",),
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05),
+    trace=True,
+)
+
+
+class TokenCache:
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()  # token -> (exp, claims)
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            exp, claims = entry
+            if time.time() >= exp:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        """검증된 토큰 저장 (exp 가 없는 토큰은 캐시하지 않음)"""
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._entries[token] = (float(exp), claims)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 서버 전체에서 공유하는 토큰 캐시
+token_cache = TokenCache()
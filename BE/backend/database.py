@@ -1,13 +1,117 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import logging
+import os
+import time
 
-# SQLite 파일: 프로젝트 루트에 shape.db 생성
-SQLALCHEMY_DATABASE_URL = "sqlite:///./shape.db"
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},  # SQLite에서 필수 옵션
+from backend.filelock import file_lock
+from backend.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# DB 주소는 환경변수로 (PostgreSQL 등으로 바꿀 때: postgresql+psycopg://user:pw@host/db)
+# 기본값은 BE/shape.db (실행 위치(CWD)와 상관없이 같은 파일)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATABASE_URL = "sqlite:///" + os.path.join(BASE_DIR, "shape.db")
+SQLALCHEMY_DATABASE_URL = os.getenv("KCU_DATABASE_URL", DEFAULT_DATABASE_URL)
+
+IS_SQLITE = make_url(SQLALCHEMY_DATABASE_URL).get_backend_name() == "sqlite"
+
+# 스키마 생성 / 마이그레이션을 한 프로세스씩만 하도록 잡는 파일 락
+MIGRATE_LOCK_PATH = os.getenv("KCU_MIGRATE_LOCK", os.path.join(BASE_DIR, "migrate.lock"))
+
+
+def _default_async_url(url: str) -> str:
+    """동기 URL -> 같은 DB 를 가리키는 async 드라이버 URL (sqlite -> aiosqlite, postgresql -> asyncpg)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    return url
+
+
+# async 라우터용 URL (기본은 SQLALCHEMY_DATABASE_URL 에서 드라이버만 바꿈)
+ASYNC_DATABASE_URL = os.getenv("KCU_ASYNC_DATABASE_URL", _default_async_url(SQLALCHEMY_DATABASE_URL))
+
+DB_SESSION_SECONDS = Histogram(
+    "kcu_db_session_seconds",
+    "get_db / get_async_db 세션을 열고 닫을 때까지 걸린 시간 (요청 처리 시간과 거의 같음)",
+    labelnames=("kind",),
+    trace=True,
 )
+DB_COMMIT_SECONDS = Histogram(
+    "kcu_db_commit_seconds",
+    "commit 1번에 걸린 시간 (flush 포함, 성공한 commit 만)",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+    trace=True,
+)
+
+# 커넥션 풀 크기 (동시에 DB 를 쓰는 스레드 수에 맞춰 조절)
+DB_POOL_SIZE = int(os.getenv("KCU_DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("KCU_DB_MAX_OVERFLOW", "20"))
+
+# SQLite 튜닝 (KCU_SQLITE_TUNING=0 이면 기본 설정 그대로 사용)
+SQLITE_TUNING = os.getenv("KCU_SQLITE_TUNING", "1") == "1"
+SQLITE_MMAP_SIZE = int(os.getenv("KCU_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("KCU_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_KB = int(os.getenv("KCU_SQLITE_CACHE_KB", str(64 * 1024)))
+SQLITE_STATEMENT_CACHE = int(os.getenv("KCU_SQLITE_STATEMENT_CACHE", "256"))
+
+
+def _engine_kwargs() -> dict:
+    if IS_SQLITE:
+        return {
+            "connect_args": {
+                "check_same_thread": False,  # SQLite에서 필수 옵션
+                # sqlite3 모듈의 커넥션별 prepared statement 캐시 크기
+                "cached_statements": SQLITE_STATEMENT_CACHE,
+            },
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+        }
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_pre_ping": True,
+    }
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_kwargs())
+
+# 라우터에서 쓰는 async 엔진 (DB I/O 중에 이벤트 루프를 막지 않음)
+_async_kwargs = _engine_kwargs()
+_async_kwargs.get("connect_args", {}).pop("cached_statements", None)  # aiosqlite 는 지원 안 함
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_async_kwargs)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    새 SQLite 커넥션마다 적용하는 설정
+    - WAL: 읽기가 쓰기를 막지 않음 (/ranking 조회 중에도 /score/save 가능)
+    - synchronous=NORMAL: WAL 에서는 커밋마다 fsync 하지 않아도 DB 가 깨지지 않음
+    - mmap_size: 읽기를 read() 대신 메모리 매핑으로
+    - busy_timeout: 쓰기 락 경합 시 바로 "database is locked" 대신 잠깐 기다림
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+if IS_SQLITE and SQLITE_TUNING:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -15,13 +119,119 @@ SessionLocal = sessionmaker(
     bind=engine,
 )
 
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,  # commit 후 속성 접근 시 다시 SELECT (await 없이) 하지 않도록
+)
+
 Base = declarative_base()
 
 
+# commit 시간: 모든 세션 (AsyncSession 도 안쪽은 동기 Session) 에 걸림
+# before_commit 은 flush 전에 불리니까 flush 시간까지 포함
+@event.listens_for(Session, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+
 # FastAPI 의 Depends() 로 쓰는 DB 세션 dependency
 def get_db():
+    started = time.perf_counter()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        DB_SESSION_SECONDS.observe(time.perf_counter() - started, kind="sync")
+
+
+# async 라우터용 DB 세션 dependency
+async def get_async_db():
+    started = time.perf_counter()
+    try:
+        async with AsyncSessionLocal() as db:
+            yield db
+    finally:
+        DB_SESSION_SECONDS.observe(time.perf_counter() - started, kind="async")
+
+
+_db_prepared = False
+
+
+def prepare_db() -> None:
+    """
+    서버 시작 시 DB 준비 (프로세스당 1번, 이미 했으면 바로 리턴).
+    - init_db(): 테이블 / 컬럼 / 인덱스 생성
+    - user_best_scores 백필, 만료된 Idempotency-Key 정리
+    gunicorn 은 마스터의 when_ready (fork 전) 에서 불러서 워커들은 건너뜀.
+    uvicorn --workers 처럼 워커마다 부르는 경우에도 파일 락으로 한 번에 한 프로세스만 실행
+    (동시에 create_all 하면 "table ... already exists" 로 워커가 못 뜸).
+    """
+    global _db_prepared
+    if _db_prepared:
+        return
+    from backend.idempotency import idempotency
+    from backend.rankings import backfill_user_best
+
+    with file_lock(MIGRATE_LOCK_PATH):
+        init_db()
+        with SessionLocal() as db:
+            backfill_user_best(db)
+            idempotency.purge_expired(db)
+    # 마스터에서 연 커넥션을 fork 된 워커들이 같이 쓰지 않도록 풀을 비움
+    engine.dispose()
+    _db_prepared = True
+
+
+def init_db():
+    """
+    prepare_db() 에서 호출 (직접 부를 때는 여러 프로세스가 동시에 부르지 않게 주의).
+    - 없는 테이블 생성
+    - 이미 있는 테이블에 새로 추가된 (nullable) 컬럼 / 인덱스도 생성
+      (create_all 은 기존 테이블은 건드리지 않음)
+    """
+    from backend import models  # noqa: F401  (모델 클래스들을 Base.metadata 에 등록)
+
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except IntegrityError:
+                # unique 인덱스인데 기존 데이터에 중복이 있는 경우 (정리 후 재시작하면 생성됨)
+                logger.warning("기존 데이터 중복으로 unique 인덱스 %s 를 만들지 못했습니다.", index.name)
+
+
+def _add_missing_columns():
+    """
+    모델에는 있는데 기존 DB 테이블에는 없는 컬럼을 ALTER TABLE 로 추가 (nullable 컬럼만).
+    prepare_db 의 파일 락 안에서 돌지만, 락이 없는 환경 (Windows / 다른 호스트) 에서
+    다른 프로세스가 먼저 추가한 경우도 "duplicate column" 에러를 무시해서 몇 번을 돌려도 같은 결과
+    """
+    for table in Base.metadata.sorted_tables:
+        # 테이블마다 새로 조회 (Inspector 는 결과를 캐시해서 다른 프로세스가 바꾼 걸 못 봄)
+        existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            try:
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
+            except DBAPIError as exc:
+                message = str(exc.orig).lower()
+                if "duplicate column" not in message and "already exists" not in message:
+                    raise
+                logger.info("%s.%s 컬럼은 이미 다른 프로세스가 추가함", table.name, column.name)
+                continue
+            logger.info("%s.%s 컬럼 추가", table.name, column.name)
@@ -0,0 +1,22 @@
+# backend/filelock.py
+"""
+여러 워커 프로세스가 같은 작업을 동시에 하지 않게 거는 파일 락 (fcntl.flock).
+
+Windows (로컬 개발용 단일 프로세스) 에는 fcntl 이 없어서 락 없이 그냥 실행.
+"""
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str):
+    """path 파일에 배타 락을 잡고 블록 실행 (다른 프로세스는 블록이 끝날 때까지 대기)"""
+    with open(path, "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)  # 파일을 닫으면 락도 풀림
+        yield
@@ -0,0 +1,82 @@
+# backend/http_metrics.py
+"""
+모든 HTTP 요청의 latency / 상태 코드 / 처리 중 요청 수를 기록하는 ASGI 미들웨어.
+
+- route 라벨은 실제 경로가 아니라 라우트 템플릿 (예: /match/events/{user_id})
+  → user_id 마다 시계열이 생기지 않음. 어느 라우트에도 안 걸린 요청은 "unmatched"
+- BaseHTTPMiddleware 를 안 쓰고 ASGI 레벨에서 send 만 감싸서 요청당 오버헤드는
+  perf_counter 2번 + 메트릭 업데이트 3번 정도
+- WebSocket (/match/ws) 은 연결 시간이 곧 세션 길이라 latency 로 의미가 없어서 제외
+- /metrics 스크레이프 자체는 기록하지 않음
+"""
+
+import time
+
+from backend.metrics import Counter, Gauge, Histogram
+
+HTTP_REQUESTS = Counter(
+    "kcu_http_requests_total",
+    "처리한 HTTP 요청 수",
+    labelnames=("method", "route", "status"),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "kcu_http_request_seconds",
+    "HTTP 요청 처리 시간 (응답 본문 전송까지)",
+    labelnames=("method", "route"),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "kcu_http_requests_in_flight",
+    "지금 처리 중인 HTTP 요청 수",
+)
+
+SKIP_PATHS = frozenset({"/metrics"})
+
+
+def route_label(scope) -> str:
+    """라우팅이 끝난 scope 에서 라우트 템플릿을 꺼냄"""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    path = scope["path"]
+    regex = getattr(route, "path_regex", None)
+    if regex is None or regex.match(path):
+        return template
+    # FastAPI 버전에 따라 include_router 의 prefix 가 route.path 에 안 붙어 있음
+    # → 템플릿이 맞기 시작하는 위치 앞부분(/match 등, 고정 문자열)이 prefix
+    start = path.find("/", 1)
+    while start != -1:
+        if regex.match(path[start:]):
+            return path[:start] + template
+        start = path.find("/", start + 1)
+    return template
+
+
+class HTTPMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # 응답 시작 전에 예외가 나면 ServerErrorMiddleware 가 500 으로 응답
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            method = scope["method"]
+            route = route_label(scope)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=status)
@@ -0,0 +1,184 @@
+# backend/idempotency.py
+"""
+Idempotency-Key 헤더 처리 (/score/save, /compete/submit, /match/result).
+
+프론트(CompeteMode.jsx 등)가 타임아웃 / 네트워크 오류로 같은 요청을 다시 보내면
+Score 행이 중복으로 들어가서 리더보드가 부풀려졌음.
+클라이언트가 요청마다 Idempotency-Key (예: UUID) 를 붙이면
+- 처음 요청: 쓰기와 같은 트랜잭션에서 (key, 응답 JSON) 을 idempotency_keys 에 저장
+- 재시도: 메모리 LRU → DB 순으로 찾아서 원래 응답을 그대로 반환 (쓰기 없이 조회 1번)
+- 동시에 같은 키 두 개: 늦은 쪽은 PK 충돌(IntegrityError) → rollback 후 먼저 저장된 응답 반환
+- 보관 기간이 지난 키를 다시 쓰면 새 요청으로 처리 (만료된 행은 같은 트랜잭션에서 지우고 새로 저장)
+write-behind 모드에서는 레코드와 같이 journal 에 넣었다가 flush 때 저장 (backend.ingest).
+헤더가 없으면 기존과 동일하게 동작.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.metrics import Counter
+from backend.models import IdempotencyKey
+
+# 메모리에 들고 있는 최근 키 수 / 키 보관 기간
+CACHE_SIZE = int(os.getenv("KCU_IDEMPOTENCY_CACHE_SIZE", "10000"))
+TTL_SECONDS = float(os.getenv("KCU_IDEMPOTENCY_TTL_HOURS", "24")) * 3600
+MAX_KEY_LENGTH = 255
+
+# write-behind 레코드에 같이 실어 보내는 필드 이름
+RECORD_FIELD = "_idempotency"
+
+IDEMPOTENT_REPLAYS = Counter(
+    "kcu_idempotent_replays_total",
+    "Idempotency-Key 재시도로 저장 없이 돌려준 응답 수",
+    labelnames=("scope", "source"),
+)
+
+
+def scoped_key(scope: str, header: Optional[str]) -> Optional[str]:
+    """헤더 값 -> 저장용 키 (라우트별로 분리). 헤더가 없으면 None"""
+    if header is None:
+        return None
+    header = header.strip()
+    if not header or len(header) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key 는 1~{MAX_KEY_LENGTH}자여야 합니다.")
+    return f"{scope}:{header}"
+
+
+def _scope_of(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+class IdempotencyStore:
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl_seconds: float = TTL_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # key -> (저장 시각, 응답)
+        self._lock = threading.Lock()
+
+    # -----------------------
+    #  메모리 LRU
+    # -----------------------
+    def cached(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, body = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def offer(self, key: Optional[str], response: Any) -> None:
+        """commit 된 (또는 journal 에 적재된) 응답을 메모리에 기억"""
+        if key is None:
+            return
+        body = jsonable_encoder(response)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # -----------------------
+    #  조회 / 저장
+    # -----------------------
+    async def lookup(self, db: AsyncSession, key: Optional[str]) -> Optional[JSONResponse]:
+        """이미 처리된 키면 원래 응답 (메모리 → DB 순), 아니면 None"""
+        if key is None:
+            return None
+        body = self.cached(key)
+        if body is not None:
+            IDEMPOTENT_REPLAYS.inc(scope=_scope_of(key), source="memory")
+            return self._replay(body)
+
+        body = await db.run_sync(self._load, key)
+        if body is None:
+            return None
+        self.offer(key, body)
+        IDEMPOTENT_REPLAYS.inc(scope=_scope_of(key), source="db")
+        return self._replay(body)
+
+    def _cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+
+    def _load(self, db: Session, key: str) -> Optional[Any]:
+        row = db.get(IdempotencyKey, key)
+        if row is None:
+            return None
+        if row.created_at is not None and row.created_at < self._cutoff():
+            # 만료된 키 재사용: 이번 요청의 record() 가 같은 PK 로 INSERT 하니까 먼저 지워둠
+            # (요청이 실패해서 rollback 되면 삭제도 같이 취소됨)
+            db.delete(row)
+            db.flush()
+            return None
+        return json.loads(row.response)
+
+    def live_keys(self, db: Session, keys: Set[str]) -> Set[str]:
+        """
+        keys 중 보관 기간 안에 저장된 키 (write-behind flush 용).
+        만료된 행은 같은 트랜잭션에서 지워서 이번 배치가 같은 키로 새로 저장할 수 있게 함
+        """
+        if not keys:
+            return set()
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.key.in_(keys),
+            IdempotencyKey.created_at < self._cutoff(),
+        ).delete(synchronize_session=False)
+        return {k for (k,) in db.query(IdempotencyKey.key).filter(IdempotencyKey.key.in_(keys))}
+
+    @staticmethod
+    def record(db, key: Optional[str], response: Any) -> None:
+        """쓰기와 같은 세션(트랜잭션)에 키 + 응답 추가 (sync / async 세션 둘 다 가능)"""
+        if key is None:
+            return
+        db.add(IdempotencyKey(key=key, response=json.dumps(jsonable_encoder(response), ensure_ascii=False)))
+
+    async def commit_or_replay(self, db: AsyncSession, key: Optional[str]) -> Optional[JSONResponse]:
+        """
+        commit. 같은 키가 동시에 먼저 저장돼서 충돌하면 rollback 후 그 응답 반환.
+        키와 상관없는 IntegrityError 는 그대로 올림
+        """
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            replay = await self.lookup(db, key)
+            if replay is None:
+                raise
+            return replay
+        return None
+
+    @staticmethod
+    def with_record(record: dict, key: Optional[str], response: Any) -> dict:
+        """write-behind 레코드에 키 + 응답을 실음 (flush 때 같은 트랜잭션에서 저장)"""
+        if key is None:
+            return record
+        return {**record, RECORD_FIELD: {"key": key, "response": jsonable_encoder(response)}}
+
+    @staticmethod
+    def _replay(body: Any) -> JSONResponse:
+        return JSONResponse(content=body, headers={"Idempotent-Replayed": "true"})
+
+    def purge_expired(self, db: Session) -> int:
+        """보관 기간이 지난 키 삭제 (서버 시작 시)"""
+        deleted = db.query(IdempotencyKey).filter(IdempotencyKey.created_at < self._cutoff()).delete()
+        db.commit()
+        return deleted
+
+
+# 서버 전체에서 공유하는 idempotency 저장소
+idempotency = IdempotencyStore()
@@ -0,0 +1,440 @@
+# backend/ingest.py
+"""
+점수 / 매치 결과 write-behind 버퍼.
+
+기존에는 요청 1건마다 세션 열고 add / commit / refresh 라서
+SQLite 에서는 게임 결과 하나당 fsync 트랜잭션이 1번씩 일어났음.
+write-behind 모드(KCU_WRITE_BEHIND=1)에서는
+- submit() 이 레코드를 journal 파일에 append(+fsync) 하면 바로 응답 (durably queued)
+- 백그라운드 스레드가 max_batch 개가 모이거나 flush_interval 이 지나면
+  여러 행을 트랜잭션 1번으로 DB 에 씀 → 랭킹에는 flush_interval 정도 늦게 반영
+- 서버 종료 시 남은 것 전부 flush, 비정상 종료로 남은 journal 은 다음 시작 때 replay
+  (DB commit 직후 journal 삭제 전에 죽으면 replay 로 중복 저장될 수 있음: at-least-once)
+- journal 은 프로세스(워커)마다 따로 씀: KCU_INGEST_JOURNAL 이 ingest.journal 이면
+  ingest.journal.<pid> / ingest.journal.<pid>.<ns>.flushing
+  replay 는 ingest.journal.lock 파일 락을 잡고, 이미 죽은 pid 의 journal 만 가져와서 처리
+  (살아 있는 다른 워커가 쓰는 중인 journal 을 건드리지 않음)
+- DB 가 거부하는 레코드 (IntegrityError 등, 다시 해도 똑같이 실패) 는 배치를 반씩 나눠서
+  그 레코드만 ingest.journal.dead 로 옮기고 나머지는 저장 (무한 재시도 / 시작 실패 방지)
+"""
+
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.database import BASE_DIR, SessionLocal
+from backend.filelock import file_lock
+from backend.leaderboard import leaderboard
+from backend.metrics import Counter, Gauge, Histogram
+from backend.models import MatchResult, Score
+from backend.idempotency import RECORD_FIELD, idempotency
+from backend.rankings import record_user_best
+from backend.ratings import rating_cache, record_match_rating
+
+logger = logging.getLogger(__name__)
+
+INGEST_QUEUED = Gauge(
+    "kcu_ingest_queued",
+    "write-behind 버퍼에서 DB flush 를 기다리는 레코드 수",
+)
+INGEST_FLUSHED = Counter(
+    "kcu_ingest_flushed_total",
+    "write-behind 버퍼에서 DB 에 쓴 레코드 수",
+    labelnames=("kind",),
+)
+INGEST_FLUSH_SIZE = Histogram(
+    "kcu_ingest_flush_batch_size",
+    "트랜잭션 1번에 쓴 레코드 수",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+INGEST_FLUSH_SECONDS = Histogram(
+    "kcu_ingest_flush_seconds",
+    "배치 1번 DB 쓰기 시간",
+)
+INGEST_DEAD_LETTERS = Counter(
+    "kcu_ingest_dead_letters_total",
+    "DB 가 거부해서 dead-letter 파일로 옮긴 레코드 수",
+)
+
+SCORE = "score"
+MATCH_RESULT = "match_result"
+
+Record = Tuple[str, dict]
+
+# 다시 시도해도 같은 결과인 에러 (DB 가 데이터 자체를 거부)
+NON_TRANSIENT_ERRORS = (IntegrityError, DataError)
+
+
+class IngestQueueFull(Exception):
+    """flush 를 기다리는 레코드가 너무 많음 (DB 가 못 따라오는 상태)"""
+
+
+def write_records(db: Session, records: List[Record]) -> Tuple[List[Score], List[MatchResult]]:
+    """
+    레코드들을 트랜잭션 1번으로 저장하고, 저장된 Score / MatchResult 행 반환.
+    유저별 최고 점수 / 메모리 리더보드 / Elo 레이팅 / Idempotency-Key 도 같이 갱신.
+    이미 저장된 Idempotency-Key / match_id 레코드는 건너뜀
+    (재시도 + journal replay 가 at-least-once 라서 중복이 들어올 수 있음)
+    """
+    entries = [(kind, _parse(data)) for kind, data in records]
+    keys = {data[RECORD_FIELD]["key"] for _, data in entries if RECORD_FIELD in data}
+    match_ids = {data.get("match_id") for kind, data in entries if kind == MATCH_RESULT}
+    seen_keys = idempotency.live_keys(db, keys)  # 보관 기간이 지난 키는 새 요청으로 처리
+    seen_matches = (
+        {m for (m,) in db.query(MatchResult.match_id).filter(MatchResult.match_id.in_(match_ids))}
+        if match_ids else set()
+    )
+
+    scores, results, replies = [], [], []
+    for kind, data in entries:
+        reply = data.pop(RECORD_FIELD, None)
+        if reply is not None:
+            if reply["key"] in seen_keys:
+                continue
+            seen_keys.add(reply["key"])
+            replies.append(reply)
+        if kind == SCORE:
+            scores.append(Score(**data))
+        elif kind == MATCH_RESULT:
+            if data.get("match_id") in seen_matches:
+                continue
+            seen_matches.add(data.get("match_id"))
+            results.append(MatchResult(**data))
+
+    db.expire_on_commit = False  # commit 후 id 등을 다시 SELECT 하지 않도록
+    db.add_all(scores)
+    db.add_all(results)
+    for reply in replies:
+        idempotency.record(db, reply["key"], reply["response"])
+    db.flush()
+
+    # 같은 배치에 같은 유저 점수가 여러 개면 가장 좋은 것 하나만 반영
+    best: dict = {}
+    for row in scores:
+        current = best.get(row.user_id)
+        if row.score is not None and (current is None or row.score > current.score):
+            best[row.user_id] = row
+    for row in best.values():
+        record_user_best(db, row)
+
+    # 레이팅은 순서가 중요해서 저장 순서대로 한 판씩
+    ratings = {}
+    for result in results:
+        for row in record_match_rating(db, result):
+            ratings[row.user_id] = row
+
+    db.commit()
+
+    for row in scores:
+        leaderboard.offer(row)
+    rating_cache.offer(ratings.values())
+    return scores, results
+
+
+def _parse(data: dict) -> dict:
+    parsed = dict(data)
+    if isinstance(parsed.get("created_at"), str):
+        parsed["created_at"] = datetime.fromisoformat(parsed["created_at"])
+    return parsed
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        # 같은 pid 의 파일은 pid 가 재사용된 이전 실행이 남긴 것 (아직 journal 을 안 열었으니까)
+        return False
+    if os.name == "nt":
+        # Windows 에서는 os.kill(pid, 0) 이 시그널 확인이 아니라서 못 씀.
+        # write-behind 다중 워커 (gunicorn) 는 리눅스에서만 돌리니까 전부 고아로 취급
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _dump(kind: str, data: dict) -> str:
+    return json.dumps({"kind": kind, "data": data}, ensure_ascii=False, default=str) + "\n"
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        journal_path: str,
+        max_batch: int = 500,
+        flush_interval: float = 0.2,
+        max_queue: int = 50_000,
+        fsync: bool = True,
+    ):
+        self.session_factory = session_factory
+        self.journal_base = journal_path
+        self.journal_path = journal_path  # start() 에서 <base>.<pid> 로 정해짐 (fork 후)
+        self.dead_letter_path = f"{journal_path}.dead"
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self.max_queue = max(1, max_queue)
+        self.fsync = fsync
+
+        self._items: List[Record] = []
+        self._journal = None
+        self._retry: Optional[Tuple[List[Record], str]] = None
+        self._written = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    # -----------------------
+    #  시작 / 종료
+    # -----------------------
+    def start(self) -> None:
+        """이전 실행 / 죽은 워커가 남긴 journal replay 후 flush 스레드 시작"""
+        if self._thread is not None:
+            return
+        self.journal_path = f"{self.journal_base}.{os.getpid()}"
+        # 같은 고아 journal 을 두 워커가 동시에 replay 하지 않게
+        with file_lock(f"{self.journal_base}.lock"):
+            self._replay()
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="score-ingest", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """남은 레코드를 전부 flush 하고 종료 (graceful shutdown)"""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+
+        try:
+            self.drain()
+        except Exception:
+            # 못 쓴 레코드는 journal segment 에 남아서 다음 시작 때 replay 됨
+            logger.exception("종료 중 write-behind flush 실패")
+        with self._lock:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) == 0:
+            os.remove(self.journal_path)
+
+    # -----------------------
+    #  적재
+    # -----------------------
+    def submit(self, kind: str, records: List[dict]) -> None:
+        """
+        레코드들을 journal 에 쓰고 (fsync 1번) 큐에 넣음.
+        리턴되면 서버가 죽어도 다음 시작 때 replay 되는 상태.
+        """
+        lines = "".join(_dump(kind, data) for data in records)
+        with self._lock:
+            if self._journal is None:
+                raise RuntimeError("write-behind 버퍼가 시작되지 않았습니다.")
+            if len(self._items) + len(records) > self.max_queue:
+                raise IngestQueueFull()
+
+            self._journal.write(lines)
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+
+            self._items.extend((kind, data) for data in records)
+            queued = len(self._items)
+
+        INGEST_QUEUED.set(queued)
+        if queued >= self.max_batch:
+            self._wakeup.set()
+
+    # -----------------------
+    #  flush
+    # -----------------------
+    def flush(self) -> int:
+        """
+        지금 쌓인 레코드를 한 번 flush. 쓴 레코드 수 반환.
+        journal 을 새 파일로 돌려놓고(rotate) 이전 파일은 DB commit 이 끝난 뒤 삭제.
+        """
+        with self._flush_lock:
+            batch = self._retry or self._rotate()
+            if batch is None:
+                return 0
+
+            records, segment = batch
+            try:
+                self._write(records, segment)
+            except Exception:
+                # 일시적인 실패 (DB 잠김 / 연결 끊김 등) 는 다음 flush 때 다시 시도.
+                # 이미 commit 된 청크는 _write 가 segment 에서 빼뒀으니 남은 것만 다시 읽음
+                self._retry = (self._read_journal(segment), segment)
+                raise
+
+            self._retry = None
+            os.remove(segment)
+            return len(records)
+
+    def drain(self) -> None:
+        while self.flush():
+            pass
+
+    def _rotate(self) -> Optional[Tuple[List[Record], str]]:
+        with self._lock:
+            if not self._items:
+                return None
+            records, self._items = self._items, []
+            segment = f"{self.journal_path}.{time.time_ns()}.flushing"  # <base>.<pid>.<ns>.flushing
+            self._journal.close()
+            os.replace(self.journal_path, segment)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        INGEST_QUEUED.set(0)
+        return records, segment
+
+    def _write(self, records: List[Record], path: str) -> None:
+        """
+        max_batch 개씩 나눠서 저장 (청크마다 트랜잭션 1번).
+        중간에 실패하면 journal 파일(path) 을 아직 안 쓴 레코드만 남기도록 바꾸고 예외를 올림
+        → 재시도 / replay 때 이미 commit 된 청크 (키가 없는 Score 등) 를 또 쓰지 않음
+        """
+        self._written = 0  # 앞에서부터 commit (또는 dead-letter) 된 레코드 수
+        try:
+            for start in range(0, len(records), self.max_batch):
+                self._write_chunk(records[start:start + self.max_batch])
+        except Exception:
+            if self._written:
+                self._rewrite_journal(path, records[self._written:])
+            raise
+
+    def _write_chunk(self, chunk: List[Record]) -> None:
+        started = time.perf_counter()
+        try:
+            with self.session_factory() as db:
+                write_records(db, chunk)
+        except NON_TRANSIENT_ERRORS as exc:
+            # 배치를 반으로 나눠 다시 시도해서 DB 가 거부하는 레코드만 골라냄 (앞쪽 반부터 순서대로)
+            if len(chunk) == 1:
+                self._dead_letter(chunk[0], exc)
+                self._written += 1
+                return
+            middle = len(chunk) // 2
+            self._write_chunk(chunk[:middle])
+            self._write_chunk(chunk[middle:])
+            return
+        self._written += len(chunk)
+        INGEST_FLUSH_SECONDS.observe(time.perf_counter() - started)
+        INGEST_FLUSH_SIZE.observe(len(chunk))
+        for kind in (SCORE, MATCH_RESULT):
+            count = sum(1 for k, _ in chunk if k == kind)
+            if count:
+                INGEST_FLUSHED.inc(count, kind=kind)
+
+    def _dead_letter(self, record: Record, exc: Exception) -> None:
+        """재시도해도 안 들어가는 레코드를 따로 보관 (수동 확인 / 복구용)"""
+        kind, data = record
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.write(_dump(kind, data))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        INGEST_DEAD_LETTERS.inc()
+        logger.error("DB 가 거부한 %s 레코드를 %s 로 옮김: %s", kind, self.dead_letter_path, exc)
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.drain()
+            except Exception:
+                logger.exception("write-behind flush 실패, 잠시 후 재시도")
+                time.sleep(min(5.0, max(self.flush_interval, 0.5)))
+
+    def _orphaned_journals(self) -> List[str]:
+        """
+        주인 프로세스가 없는 journal 파일들 (replay 순서대로).
+        - <base>: pid 별로 나누기 전 버전이 남긴 파일
+        - <base>.<pid> / <base>.<pid>.<ns>.flushing: 죽은 (또는 pid 가 재사용된 이전 실행의) 워커 것
+        """
+        pattern = re.compile(re.escape(self.journal_base) + r"(?:\.(\d+))?(?:\.(\d+))?(\.flushing)?")
+        found = []
+        for path in glob.glob(f"{glob.escape(self.journal_base)}*"):
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue  # .lock / .dead
+            first, second, flushing = match.groups()
+            if first is None:
+                if flushing:
+                    continue
+                found.append(((0, float("inf"), 1), path))  # 옛 버전 현재 파일
+            elif second is None and flushing:
+                found.append(((0, int(first), 1), path))  # 옛 버전 segment (<base>.<ns>.flushing)
+            elif second is not None and flushing:
+                found.append(((int(first), int(second), 1), path))
+            elif second is None:
+                found.append(((int(first), float("inf"), 1), path))  # 현재 파일은 segment 들 다음
+        # 옛 버전 파일 먼저, 그다음 pid 별로 segment (시간순) → 현재 파일
+        return [path for key, path in sorted(found) if key[0] == 0 or not _pid_alive(key[0])]
+
+    def _replay(self) -> None:
+        """비정상 종료로 남은 journal (flush 중이던 segment + 현재 파일) 을 DB 에 반영"""
+        for path in self._orphaned_journals():
+            records = self._read_journal(path)
+            if records:
+                logger.info("journal %s 에서 %d 건 replay", path, len(records))
+                self._write(records, path)
+            os.remove(path)
+
+    @staticmethod
+    def _read_journal(path: str) -> List[Record]:
+        records: List[Record] = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 쓰다가 죽은 마지막 줄
+                    logger.warning("journal %s 의 깨진 줄을 건너뜀", path)
+                    continue
+                records.append((entry["kind"], entry["data"]))
+        return records
+
+    def _rewrite_journal(self, path: str, records: List[Record]) -> None:
+        """path 를 records 만 담은 파일로 원자적으로 교체 (임시 파일에 쓰고 os.replace)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("".join(_dump(kind, data) for kind, data in records))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+# write-behind 모드 설정 (기본은 꺼짐: 요청마다 바로 commit)
+WRITE_BEHIND = os.getenv("KCU_WRITE_BEHIND", "0") == "1"
+
+
+def _make_buffer() -> WriteBehindBuffer:
+    return WriteBehindBuffer(
+        SessionLocal,
+        # 기본값은 BE/ingest.journal (실행 위치(CWD)와 상관없이 같은 파일, DB 경로와 같은 규칙)
+        journal_path=os.getenv("KCU_INGEST_JOURNAL", os.path.join(BASE_DIR, "ingest.journal")),
+        max_batch=int(os.getenv("KCU_INGEST_MAX_BATCH", "500")),
+        flush_interval=float(os.getenv("KCU_INGEST_FLUSH_MS", "200")) / 1000.0,
+        max_queue=int(os.getenv("KCU_INGEST_MAX_QUEUE", "50000")),
+        fsync=os.getenv("KCU_INGEST_FSYNC", "1") == "1",
+    )
+
+
+score_ingestor = _make_buffer()
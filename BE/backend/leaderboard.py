@@ -0,0 +1,130 @@
+# backend/leaderboard.py
+"""
+메모리에 유지하는 상위 N 점수 리더보드.
+
+/ranking/top10 이 매번 scores 테이블 전체를 정렬하지 않도록
+- 처음 조회할 때 DB 에서 상위 capacity 개만 읽어서 채우고 (seed)
+- 점수가 저장될 때마다 offer() 로 갱신
+- 읽기는 정렬된 리스트 앞부분만 잘라서 반환 (DB 조회 없음)
+
+워커 프로세스가 여러 개면 다른 워커에서 저장한 점수는 offer 로 안 들어오니까
+refresh_seconds 마다 DB 에서 다시 seed 해서 지연을 제한함.
+"""
+
+import bisect
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.models import Score
+
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    id: int
+    user_id: str
+    score: float
+    date: Optional[str]
+    created_at: Optional[datetime]
+
+    @property
+    def sort_key(self):
+        # 점수 내림차순 → 먼저 저장된 순 (id) (DB 랭킹 정렬과 같은 순서)
+        return (-self.score, self.id)
+
+
+class Leaderboard:
+    def __init__(self, capacity: int = 100, refresh_seconds: float = 0.0):
+        self.capacity = max(1, capacity)
+        self.refresh_seconds = refresh_seconds
+        self._entries: List[LeaderboardEntry] = []
+        self._keys: list = []
+        self._seeded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def needs_seed(self) -> bool:
+        if self._seeded_at is None:
+            return True
+        if self.refresh_seconds > 0:
+            return time.monotonic() - self._seeded_at >= self.refresh_seconds
+        return False
+
+    def seed(self, db: Session) -> None:
+        """
+        DB 에서 상위 capacity 개를 읽어서 리더보드를 다시 채움 (score 인덱스 사용).
+        async 세션에서는 await db.run_sync(leaderboard.seed) 로 호출.
+        읽는 동안 offer() 로 들어온 점수 (id 가 조회 시점의 최대 id 보다 큰 것) 는
+        DB 결과에 없을 수 있으니 버리지 않고 합침.
+        """
+        # 조회 전에 먼저 읽음 → 이보다 큰 id 는 rows 에 없을 수도 있는 점수
+        max_id = db.query(func.max(Score.id)).scalar() or 0
+        rows = (
+            db.query(Score)
+            .filter(Score.score.isnot(None))
+            .order_by(Score.score.desc(), Score.id.asc())
+            .limit(self.capacity)
+            .all()
+        )
+        entries = {e.id: e for e in map(self._to_entry, rows)}
+        with self._lock:
+            for entry in self._entries:
+                if entry.id > max_id:
+                    entries.setdefault(entry.id, entry)
+            merged = sorted(entries.values(), key=lambda e: e.sort_key)[: self.capacity]
+            self._entries = merged
+            self._keys = [e.sort_key for e in merged]
+            self._seeded_at = time.monotonic()
+
+    def offer(self, row: Score) -> None:
+        """새로 저장된 점수 1건 반영. 상위 capacity 안에 못 들면 무시"""
+        if row.score is None:
+            return
+        entry = self._to_entry(row)
+        key = entry.sort_key
+
+        with self._lock:
+            # seed 전 (또는 seed 중) 이어도 넣어 둠: seed 가 DB 에서 못 읽은 최신 점수만 골라서 합침
+            if len(self._keys) >= self.capacity and key >= self._keys[-1]:
+                return
+
+            idx = bisect.bisect_left(self._keys, key)
+            if idx < len(self._keys) and self._keys[idx] == key:
+                return  # 이미 들어 있는 점수
+            self._keys.insert(idx, key)
+            self._entries.insert(idx, entry)
+            del self._keys[self.capacity:]
+            del self._entries[self.capacity:]
+
+    def top(self, k: int, db: Optional[Session] = None) -> List[LeaderboardEntry]:
+        """상위 k 개 (k <= capacity). 필요하면 db 로 seed/refresh"""
+        if db is not None and self.needs_seed():
+            self.seed(db)
+        with self._lock:
+            return self._entries[:k]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._seeded_at = None
+
+    @staticmethod
+    def _to_entry(row: Score) -> LeaderboardEntry:
+        return LeaderboardEntry(
+            id=row.id,
+            user_id=row.user_id,
+            score=float(row.score),
+            date=str(row.date) if row.date else None,
+            created_at=row.created_at,
+        )
+
+
+# 앱 전체에서 쓰는 리더보드 (KCU_LEADERBOARD_REFRESH_SECONDS=0 이면 주기적 재조회 안 함)
+leaderboard = Leaderboard(
+    capacity=int(os.getenv("KCU_LEADERBOARD_CAPACITY", "100")),
+    refresh_seconds=float(os.getenv("KCU_LEADERBOARD_REFRESH_SECONDS", "5")),
+)
@@ -1,20 +1,69 @@
+import asyncio
+import contextlib
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.utils import get_openapi
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # Routers
 from backend.auth.router_auth import router as auth_router
-from backend.visualization.router_visualize import router as visual_router
+from backend.visualization.router_visualize import router as visual_router, model_loader
 from backend.router_ranking import router as ranking_router
-from backend.router_matchmaking import router as matchmaking_router
+from backend.router_matchmaking import router as matchmaking_router, run_sweeper
+from backend.match_backends import matchmaking
 from backend.router_compete import router as compete_router
 from backend.router_score import router as score_router
+from backend.metrics import render_metrics
+from backend.http_metrics import HTTPMetricsMiddleware
+from backend.profiling import (
+    ADMIN_ENABLED,
+    SLOW_REQUEST_MS,
+    SlowRequestMiddleware,
+    router as profiling_router,
+)
+from backend.database import SessionLocal, prepare_db
+from backend.ratings import rating_cache
+from backend.ingest import WRITE_BEHIND, score_ingestor
+
+# 서버 시작 시 CLIP 모델을 백그라운드에서 로드 + warm-up
+# (KCU_MODEL_WARMUP=0 이면 첫 /visualize 요청 때 로딩 시작)
+MODEL_WARMUP = os.getenv("KCU_MODEL_WARMUP", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 테이블 / 인덱스 생성 + 백필 (gunicorn 이면 마스터에서 이미 끝나서 건너뜀)
+    prepare_db()
+    with SessionLocal() as db:
+        rating_cache.load(db)  # 매칭 큐에서 쓰는 Elo 레이팅 (워커 메모리)
+    # write-behind 모드면 남은 journal replay 후 flush 스레드 시작
+    if WRITE_BEHIND:
+        score_ingestor.start()
+    if MODEL_WARMUP:
+        model_loader.start()
+    # 매칭 저장소 (sqlite 면 스키마 생성 + 워커 간 이벤트 relay 시작)
+    await matchmaking.start()
+    # 레이팅 창 매칭 + stale 대기자 / 버려진 매치 정리
+    sweeper = asyncio.create_task(run_sweeper())
+    yield
+    sweeper.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await sweeper
+    await matchmaking.stop()
+    # 종료 시 대기 중인 점수 / 결과를 전부 DB 에 쓰고 끝냄
+    if WRITE_BEHIND:
+        score_ingestor.stop()
+
 
 app = FastAPI(
     title="KCU Shape Classification API",
     version="1.0.0",
     description="로그인 + 도형 분석 + 랭킹 + 대결 + 점수 저장 API 서버",
+    lifespan=lifespan,
 )
 
 
@@ -29,6 +78,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 라우트별 latency / 상태 코드 / 처리 중 요청 수 (GET /metrics 로 확인)
+app.add_middleware(HTTPMetricsMiddleware)
+
+# 느린 요청 로그 (KCU_SLOW_REQUEST_MS 를 넘은 요청만 단계별 시간과 함께 기록, 기본 꺼짐)
+if SLOW_REQUEST_MS > 0:
+    app.add_middleware(SlowRequestMiddleware, threshold_ms=SLOW_REQUEST_MS)
+
 
 # --------------------------------------------------
 # Static Files
@@ -44,6 +100,37 @@ app.include_router(visual_router, prefix="/visualize", tags=["Visualization"])
 app.include_router(ranking_router, prefix="/ranking", tags=["Ranking"])
 app.include_router(matchmaking_router, prefix="/match", tags=["Matchmaking"])
 app.include_router(score_router, prefix="/score", tags=["Score"])
+app.include_router(compete_router, prefix="/compete", tags=["Compete"])
+
+# 프로파일러 / 느린 요청 조회 (켜져 있고 KCU_PROFILER_TOKEN 이 있을 때만 붙임)
+if ADMIN_ENABLED:
+    app.include_router(profiling_router, prefix="/admin", tags=["Admin"], include_in_schema=False)
+
+
+# --------------------------------------------------
+# Health check (liveness / readiness)
+# --------------------------------------------------
+@app.get("/healthz", include_in_schema=False)
+def healthz():
+    # 프로세스가 살아서 요청을 받을 수 있으면 OK (모델 로딩 여부와 무관)
+    return {"status": "ok"}
+
+
+@app.get("/readyz", include_in_schema=False)
+def readyz():
+    # CLIP 모델 로드 + warm-up 까지 끝났을 때만 200
+    status = model_loader.status()
+    if not model_loader.ready:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
+# --------------------------------------------------
+# Metrics (Prometheus 텍스트 포맷)
+# --------------------------------------------------
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    return render_metrics()
 
 
 # --------------------------------------------------
@@ -0,0 +1,473 @@
+# backend/match_backends.py
+"""
+매칭 상태 저장소 (KCU_MATCH_BACKEND 로 선택).
+
+- memory (기본): 프로세스 안의 MatchQueue + match_events. 워커 1개일 때 가장 빠름
+- sqlite: 여러 워커 / 프로세스가 같은 SQLite 파일(KCU_MATCH_STORE)을 공유.
+  `uvicorn --workers 4` 처럼 워커가 여러 개면 워커마다 큐가 따로 생겨서
+  서로 다른 워커에 붙은 두 유저가 영원히 매칭 안 되거나, /match/result 가 404 나는 문제가 있음.
+  join / pairing / finish 는 BEGIN IMMEDIATE 트랜잭션 하나로 처리해서
+  (쓰기 락을 먼저 잡으니까) 두 워커가 같은 대기자를 동시에 데려가는 일이 없음.
+  push 이벤트도 공유 테이블에 쌓고, 워커마다 relay task 가 읽어서 자기 WebSocket / long-poll 로 전달.
+
+라우터는 어느 쪽이든 같은 async 메서드만 부름.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import uuid4
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.database import BASE_DIR
+from backend.match_events import match_events
+from backend.metrics import Histogram
+from backend.match_queue import (
+    MATCH_ABANDONED,
+    MATCH_ACTIVE,
+    MATCH_EXPIRED,
+    MATCH_LEFT,
+    MATCH_QUEUE_LENGTH,
+    MATCH_RATING_GAP,
+    MATCH_TTL_SECONDS,
+    MATCH_WAIT_SECONDS,
+    RATING_WINDOW_BASE,
+    RATING_WINDOW_GROWTH,
+    RATING_WINDOW_MAX,
+    WAITER_TTL_SECONDS,
+    Match,
+    MatchQueue,
+    match_queue,
+)
+from backend.ratings import rating_cache
+
+logger = logging.getLogger(__name__)
+
+MATCH_BACKEND = os.getenv("KCU_MATCH_BACKEND", "memory")
+MATCH_STORE_PATH = os.getenv("KCU_MATCH_STORE", os.path.join(BASE_DIR, "match_state.db"))
+# 다른 워커가 쌓은 이벤트를 읽어오는 주기
+EVENT_POLL_SECONDS = float(os.getenv("KCU_MATCH_EVENT_POLL_MS", "200")) / 1000
+# 공유 이벤트 테이블에서 이 시간보다 오래된 이벤트는 sweep 때 삭제
+EVENT_RETENTION_SECONDS = 60.0
+
+BACKEND_NAMES = ("memory", "sqlite")
+
+# memory 백엔드는 이벤트 루프 스레드 안에서만 바뀌어서 락이 없음 → sqlite 만 기록
+MATCH_LOCK_WAIT_SECONDS = Histogram(
+    "kcu_match_lock_wait_seconds",
+    "sqlite 매칭 저장소에서 BEGIN IMMEDIATE 로 쓰기 락을 잡을 때까지 기다린 시간",
+    labelnames=("op",),
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+    trace=True,
+)
+
+
+class InProcessMatchBackend:
+    """기존 프로세스 내 MatchQueue 를 async 인터페이스로 감싼 것"""
+
+    def __init__(self, queue: MatchQueue):
+        self.queue = queue
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def join(self, user_id: str) -> Tuple[Optional[Match], bool, Optional[Match]]:
+        return self.queue.join(user_id)
+
+    async def leave(self, user_id: str) -> bool:
+        return self.queue.leave(user_id)
+
+    async def heartbeat(self, user_id: str) -> bool:
+        return self.queue.heartbeat(user_id)
+
+    async def get(self, match_id: str) -> Optional[Match]:
+        return self.queue.get(match_id)
+
+    async def finish(self, match_id: str) -> Optional[Match]:
+        return self.queue.finish(match_id)
+
+    async def mark_seen(self, user_id: str, match_id: str) -> None:
+        self.queue.mark_seen(user_id, match_id)
+
+    async def waiting_users(self) -> List[str]:
+        return self.queue.waiting_users()
+
+    async def pair_waiting(self) -> List[Match]:
+        return self.queue.pair_waiting()
+
+    async def sweep(self) -> Tuple[List[str], List[Match]]:
+        return self.queue.sweep()
+
+    async def publish(self, user_id: str, event: dict) -> bool:
+        return match_events.publish(user_id, event)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS match_waiters (
+    user_id TEXT PRIMARY KEY,
+    rating REAL NOT NULL,
+    joined_at REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_match_waiters_rating ON match_waiters (rating);
+CREATE INDEX IF NOT EXISTS ix_match_waiters_joined_at ON match_waiters (joined_at);
+
+CREATE TABLE IF NOT EXISTS active_matches (
+    match_id TEXT PRIMARY KEY,
+    player1 TEXT NOT NULL,
+    player2 TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    created_ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_active_matches_player1 ON active_matches (player1);
+CREATE INDEX IF NOT EXISTS ix_active_matches_player2 ON active_matches (player2);
+CREATE INDEX IF NOT EXISTS ix_active_matches_created_ts ON active_matches (created_ts);
+
+-- 매치가 만들어졌다는 걸 아직 못 받은 참가자 (MatchQueue._unseen 과 같음)
+CREATE TABLE IF NOT EXISTS match_unseen (
+    user_id TEXT PRIMARY KEY,
+    match_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_match_unseen_match_id ON match_unseen (match_id);
+
+CREATE TABLE IF NOT EXISTS match_event_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_match_event_log_created_ts ON match_event_log (created_ts);
+"""
+
+# 레이팅 창 안의 가장 가까운 대기자 (rating 인덱스 range scan)
+_FIND_OPPONENT = """
+SELECT user_id, rating, joined_at FROM match_waiters
+WHERE rating BETWEEN :low AND :high
+  AND user_id != :user_id
+  AND last_seen >= :alive_after
+  AND ABS(rating - :rating) <= MAX(:own_window, MIN(:max_window, :base + :growth * (:now - joined_at)))
+ORDER BY ABS(rating - :rating), joined_at
+LIMIT 1
+"""
+
+
+class SqliteMatchBackend:
+    """
+    여러 워커가 공유하는 SQLite 매칭 저장소.
+    SQL 은 블로킹이라 전부 스레드풀에서 실행 (스레드마다 커넥션 1개).
+    시간은 워커 사이에서 비교해야 하니 time.time() 사용.
+    레이팅은 워커별 rating_cache 를 씀 (다른 워커에서 끝난 경기는 재시작 / replay 전까지 반영 안 됨).
+    """
+
+    def __init__(self, path: str = MATCH_STORE_PATH, waiter_ttl: float = WAITER_TTL_SECONDS,
+                 match_ttl: float = MATCH_TTL_SECONDS):
+        self.path = path
+        self.waiter_ttl = waiter_ttl
+        self.match_ttl = match_ttl
+        self._local = threading.local()
+        self._relay: Optional[asyncio.Task] = None
+
+    # -----------------------
+    #  커넥션 / 트랜잭션
+    # -----------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: BEGIN / COMMIT 을 직접 관리
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, fn, *args):
+        """BEGIN IMMEDIATE 로 쓰기 락을 먼저 잡고 fn 실행 (다른 워커와 원자적으로)"""
+        conn = self._conn()
+        with MATCH_LOCK_WAIT_SECONDS.timer(op=fn.__name__.lstrip("_")):
+            conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    async def _run(self, fn, *args):
+        return await run_in_threadpool(self._transaction, fn, *args)
+
+    # -----------------------
+    #  시작 / 종료
+    # -----------------------
+    async def start(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        last_id = await run_in_threadpool(self._init_schema)
+        self._relay = asyncio.create_task(self._relay_events(last_id))
+
+    async def stop(self) -> None:
+        if self._relay is not None:
+            self._relay.cancel()
+            try:
+                await self._relay
+            except asyncio.CancelledError:
+                pass
+            self._relay = None
+
+    def _init_schema(self) -> int:
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM match_event_log").fetchone()
+        return row[0]
+
+    # -----------------------
+    #  대기열
+    # -----------------------
+    async def join(self, user_id: str) -> Tuple[Optional[Match], bool, Optional[Match]]:
+        match, created, ended = await self._run(self._join, user_id, rating_cache.get(user_id))
+        if ended is not None:
+            MATCH_ABANDONED.inc()
+        return match, created, ended
+
+    def _join(self, conn, user_id: str, rating: float):
+        """MatchQueue.join 과 같은 규칙 (아직 못 받은 매치만 돌려주고, 받은 매치면 끝내고 새로 참가)"""
+        now = time.time()
+
+        ended = None
+        match = self._match_of(conn, user_id)
+        if match is not None:
+            unseen = conn.execute(
+                "DELETE FROM match_unseen WHERE user_id = ? AND match_id = ?", (user_id, match.match_id)
+            ).rowcount
+            if unseen:
+                return match, False, None
+            ended = self._finish(conn, match.match_id)
+
+        updated = conn.execute(
+            "UPDATE match_waiters SET last_seen = ? WHERE user_id = ?", (now, user_id)
+        ).rowcount
+        if updated:
+            return None, False, ended
+
+        opponent = self._find_opponent(conn, user_id, rating, now, now)
+        if opponent is None:
+            conn.execute(
+                "INSERT INTO match_waiters (user_id, rating, joined_at, last_seen) VALUES (?, ?, ?, ?)",
+                (user_id, rating, now, now),
+            )
+            return None, False, ended
+
+        MATCH_WAIT_SECONDS.observe(0.0)
+        return self._pair(conn, opponent, user_id, rating, now), True, ended
+
+    async def pair_waiting(self) -> List[Match]:
+        return await self._run(self._pair_waiting)
+
+    def _pair_waiting(self, conn) -> List[Match]:
+        now = time.time()
+        matches = []
+        waiters = conn.execute(
+            "SELECT user_id, rating, joined_at FROM match_waiters WHERE last_seen >= ? ORDER BY joined_at",
+            (now - self.waiter_ttl,),
+        ).fetchall()
+        paired = set()
+        for waiter in waiters:
+            if waiter["user_id"] in paired:
+                continue
+            opponent = self._find_opponent(conn, waiter["user_id"], waiter["rating"], waiter["joined_at"], now)
+            if opponent is None:
+                continue
+            conn.execute("DELETE FROM match_waiters WHERE user_id = ?", (waiter["user_id"],))
+            MATCH_WAIT_SECONDS.observe(now - waiter["joined_at"])
+            matches.append(self._pair(conn, opponent, waiter["user_id"], waiter["rating"], now, notified=False))
+            paired.update(matches[-1].players)
+        return matches
+
+    def _find_opponent(self, conn, user_id: str, rating: float, joined_at: float, now: float):
+        own_window = min(RATING_WINDOW_MAX, RATING_WINDOW_BASE + RATING_WINDOW_GROWTH * (now - joined_at))
+        return conn.execute(_FIND_OPPONENT, {
+            "user_id": user_id,
+            "rating": rating,
+            "low": rating - RATING_WINDOW_MAX,
+            "high": rating + RATING_WINDOW_MAX,
+            "alive_after": now - self.waiter_ttl,
+            "own_window": own_window,
+            "max_window": RATING_WINDOW_MAX,
+            "base": RATING_WINDOW_BASE,
+            "growth": RATING_WINDOW_GROWTH,
+            "now": now,
+        }).fetchone()
+
+    def _pair(self, conn, opponent, user_id: str, rating: float, now: float, notified: bool = True) -> Match:
+        """
+        opponent(대기자 행)를 큐에서 빼고 user_id 와의 매치 생성 (같은 트랜잭션).
+        notified: user_id 가 join 응답으로 바로 매치를 받음 (sweeper 가 묶은 경우 둘 다 이벤트로 받음)
+        """
+        conn.execute("DELETE FROM match_waiters WHERE user_id = ?", (opponent["user_id"],))
+        match = Match(match_id=str(uuid4()), players=[opponent["user_id"], user_id], created_at=datetime.utcnow())
+        conn.execute(
+            "INSERT INTO active_matches (match_id, player1, player2, created_at, created_ts) VALUES (?, ?, ?, ?, ?)",
+            (match.match_id, match.players[0], match.players[1], match.created_at.isoformat(), now),
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO match_unseen (user_id, match_id) VALUES (?, ?)",
+            [(player, match.match_id) for player in match.players if not notified or player != user_id],
+        )
+        MATCH_WAIT_SECONDS.observe(now - opponent["joined_at"])
+        MATCH_RATING_GAP.observe(abs(opponent["rating"] - rating))
+        return match
+
+    async def leave(self, user_id: str) -> bool:
+        left = await self._run(self._leave, user_id)
+        if left:
+            MATCH_LEFT.inc()
+        return left
+
+    def _leave(self, conn, user_id: str) -> bool:
+        return conn.execute("DELETE FROM match_waiters WHERE user_id = ?", (user_id,)).rowcount > 0
+
+    async def heartbeat(self, user_id: str) -> bool:
+        return await self._run(self._heartbeat, user_id)
+
+    def _heartbeat(self, conn, user_id: str) -> bool:
+        updated = conn.execute(
+            "UPDATE match_waiters SET last_seen = ? WHERE user_id = ?", (time.time(), user_id)
+        ).rowcount
+        return updated > 0 or self._match_of(conn, user_id) is not None
+
+    async def waiting_users(self) -> List[str]:
+        rows = await run_in_threadpool(
+            lambda: self._conn().execute("SELECT user_id FROM match_waiters ORDER BY joined_at").fetchall()
+        )
+        return [row[0] for row in rows]
+
+    # -----------------------
+    #  진행 중 매치
+    # -----------------------
+    @staticmethod
+    def _to_match(row) -> Match:
+        return Match(
+            match_id=row["match_id"],
+            players=[row["player1"], row["player2"]],
+            created_at=datetime.fromisoformat(row["created_at"]),
+        )
+
+    def _match_of(self, conn, user_id: str) -> Optional[Match]:
+        row = conn.execute(
+            "SELECT * FROM active_matches WHERE player1 = ? UNION ALL "
+            "SELECT * FROM active_matches WHERE player2 = ? LIMIT 1",
+            (user_id, user_id),
+        ).fetchone()
+        return self._to_match(row) if row else None
+
+    async def get(self, match_id: str) -> Optional[Match]:
+        row = await run_in_threadpool(
+            lambda: self._conn().execute("SELECT * FROM active_matches WHERE match_id = ?", (match_id,)).fetchone()
+        )
+        return self._to_match(row) if row else None
+
+    async def finish(self, match_id: str) -> Optional[Match]:
+        return await self._run(self._finish, match_id)
+
+    def _finish(self, conn, match_id: str) -> Optional[Match]:
+        row = conn.execute("SELECT * FROM active_matches WHERE match_id = ?", (match_id,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("DELETE FROM active_matches WHERE match_id = ?", (match_id,))
+        conn.execute("DELETE FROM match_unseen WHERE match_id = ?", (match_id,))
+        return self._to_match(row)
+
+    async def mark_seen(self, user_id: str, match_id: str) -> None:
+        await run_in_threadpool(
+            lambda: self._conn().execute(
+                "DELETE FROM match_unseen WHERE user_id = ? AND match_id = ?", (user_id, match_id)
+            )
+        )
+
+    # -----------------------
+    #  만료 처리
+    # -----------------------
+    async def sweep(self) -> Tuple[List[str], List[Match]]:
+        stale, expired, waiting, active = await self._run(self._sweep)
+        if stale:
+            MATCH_EXPIRED.inc(len(stale), kind="waiter")
+        if expired:
+            MATCH_EXPIRED.inc(len(expired), kind="match")
+        MATCH_QUEUE_LENGTH.set(waiting)
+        MATCH_ACTIVE.set(active)
+        return stale, expired
+
+    def _sweep(self, conn):
+        now = time.time()
+        stale = [row[0] for row in conn.execute(
+            "SELECT user_id FROM match_waiters WHERE last_seen < ?", (now - self.waiter_ttl,)
+        )]
+        conn.execute("DELETE FROM match_waiters WHERE last_seen < ?", (now - self.waiter_ttl,))
+        expired = [self._to_match(row) for row in conn.execute(
+            "SELECT * FROM active_matches WHERE created_ts < ?", (now - self.match_ttl,)
+        ).fetchall()]
+        conn.execute("DELETE FROM active_matches WHERE created_ts < ?", (now - self.match_ttl,))
+        conn.execute("DELETE FROM match_unseen WHERE match_id NOT IN (SELECT match_id FROM active_matches)")
+        conn.execute("DELETE FROM match_event_log WHERE created_ts < ?", (now - EVENT_RETENTION_SECONDS,))
+        waiting = conn.execute("SELECT COUNT(*) FROM match_waiters").fetchone()[0]
+        active = conn.execute("SELECT COUNT(*) FROM active_matches").fetchone()[0]
+        return stale, expired, waiting, active
+
+    # -----------------------
+    #  이벤트 (워커 간 공유)
+    # -----------------------
+    async def publish(self, user_id: str, event: dict) -> bool:
+        """공유 테이블에 쌓기만 하고, 실제 전달은 각 워커의 relay 가 함"""
+        payload = json.dumps(event, ensure_ascii=False, default=str)
+        await run_in_threadpool(
+            lambda: self._conn().execute(
+                "INSERT INTO match_event_log (user_id, payload, created_ts) VALUES (?, ?, ?)",
+                (user_id, payload, time.time()),
+            )
+        )
+        return True
+
+    def _read_events(self, after_id: int):
+        return self._conn().execute(
+            "SELECT id, user_id, payload FROM match_event_log WHERE id > ? ORDER BY id LIMIT 500",
+            (after_id,),
+        ).fetchall()
+
+    async def _relay_events(self, last_id: int) -> None:
+        """다른 워커(와 자기 자신)가 쌓은 이벤트를 읽어서 이 워커의 mailbox 로 전달"""
+        while True:
+            try:
+                rows = await run_in_threadpool(self._read_events, last_id)
+                for row in rows:
+                    match_events.publish(row["user_id"], json.loads(row["payload"]))
+                    last_id = row["id"]
+                if len(rows) == 500:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("match event relay failed")
+            await asyncio.sleep(EVENT_POLL_SECONDS)
+
+
+def create_match_backend(name: str = MATCH_BACKEND):
+    """설정값(name)에 맞는 매칭 저장소 생성"""
+    if name == "memory":
+        return InProcessMatchBackend(match_queue)
+    if name == "sqlite":
+        return SqliteMatchBackend()
+    raise ValueError(f"알 수 없는 매칭 백엔드: {name} (가능한 값: {', '.join(BACKEND_NAMES)})")
+
+
+# 라우터에서 쓰는 매칭 저장소
+matchmaking = create_match_backend()
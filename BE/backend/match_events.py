@@ -0,0 +1,125 @@
+# backend/match_events.py
+"""
+매칭 / 대결 이벤트 push 용 유저별 mailbox.
+
+기존에는 대기 중인 클라이언트가 /match/join 이나 /match/status 를 계속 폴링해야
+매칭 성사 / 상대 점수 / 결과를 알 수 있었음.
+여기서는 유저마다 mailbox (최근 이벤트 deque + 기다리는 asyncio.Future 1개) 를 두고
+- publish(): 이벤트를 넣고 기다리는 future 를 깨움
+- wait(): 쌓인 이벤트가 있으면 바로, 없으면 future 에서 timeout 까지 대기
+/match/ws (WebSocket) 와 /match/events/{user_id} (long-poll) 가 둘 다 wait() 를 씀.
+long-poll 사이에 온 이벤트도 mailbox 에 남아 있어서 다음 poll 에서 받음.
+이벤트 루프 스레드에서만 호출.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from backend.metrics import Counter, Gauge
+
+# 유저당 보관하는 최대 이벤트 수 (안 읽으면 오래된 것부터 버림)
+MAX_PENDING_EVENTS = int(os.getenv("KCU_MATCH_MAX_PENDING_EVENTS", "32"))
+# 이 시간 동안 아무도 안 읽는 mailbox 는 sweep 때 제거
+MAILBOX_IDLE_SECONDS = float(os.getenv("KCU_MATCH_MAILBOX_IDLE_SECONDS", "120"))
+
+MATCH_EVENT_WAITERS = Gauge(
+    "kcu_match_event_waiters",
+    "WebSocket / long-poll 로 이벤트를 기다리는 연결 수",
+)
+MATCH_EVENTS_PUBLISHED = Counter(
+    "kcu_match_events_published_total",
+    "push 한 매칭 이벤트 수",
+    labelnames=("type",),
+)
+
+
+class _Mailbox:
+    __slots__ = ("events", "waiter", "last_active")
+
+    def __init__(self):
+        self.events: Deque[dict] = deque(maxlen=MAX_PENDING_EVENTS)
+        self.waiter: Optional[asyncio.Future] = None
+        self.last_active = time.monotonic()
+
+    def wake(self, delivered: bool) -> None:
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(delivered)
+
+    def drain(self) -> List[dict]:
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+
+class MatchEvents:
+    def __init__(self):
+        self._boxes: Dict[str, _Mailbox] = {}
+
+    def open(self, user_id: str) -> None:
+        """이 유저 앞으로 오는 이벤트를 모으기 시작 (join 시점에 열어둠)"""
+        box = self._boxes.get(user_id)
+        if box is None:
+            self._boxes[user_id] = _Mailbox()
+        else:
+            box.last_active = time.monotonic()
+
+    def close(self, user_id: str) -> None:
+        box = self._boxes.pop(user_id, None)
+        if box is not None:
+            box.wake(True)
+
+    def publish(self, user_id: str, event: dict) -> bool:
+        """mailbox 가 열린 유저에게만 전달 (폴링만 쓰는 클라이언트는 join 응답으로 확인)"""
+        box = self._boxes.get(user_id)
+        if box is None:
+            return False
+        box.events.append(event)
+        box.wake(True)
+        MATCH_EVENTS_PUBLISHED.inc(type=event.get("type", ""))
+        return True
+
+    async def wait(self, user_id: str, timeout: Optional[float]) -> List[dict]:
+        """
+        이벤트가 올 때까지 (최대 timeout 초) 대기 후 쌓인 이벤트 반환.
+        같은 유저가 새로 wait 하면 이전 대기는 빈 리스트로 끝남 (탭 2개 / 재연결).
+        """
+        box = self._boxes.get(user_id)
+        if box is None:
+            box = self._boxes[user_id] = _Mailbox()
+        box.last_active = time.monotonic()
+        if box.events:
+            return box.drain()
+
+        box.wake(False)  # 이전 대기자 밀어냄
+        fut = asyncio.get_running_loop().create_future()
+        box.waiter = fut
+        MATCH_EVENT_WAITERS.inc()
+        try:
+            await asyncio.wait({fut}, timeout=timeout)
+        finally:
+            MATCH_EVENT_WAITERS.dec()
+            if box.waiter is fut:
+                box.waiter = None
+            box.last_active = time.monotonic()
+
+        if fut.done() and fut.result() is False:
+            return []
+        return box.drain()
+
+    def sweep(self, idle_seconds: float = MAILBOX_IDLE_SECONDS) -> int:
+        """아무도 기다리지 않고 오래 안 읽힌 mailbox 제거"""
+        now = time.monotonic()
+        idle = [
+            user_id for user_id, box in self._boxes.items()
+            if box.waiter is None and now - box.last_active > idle_seconds
+        ]
+        for user_id in idle:
+            del self._boxes[user_id]
+        return len(idle)
+
+
+# 서버 전체에서 공유하는 이벤트 허브
+match_events = MatchEvents()
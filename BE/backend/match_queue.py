@@ -0,0 +1,334 @@
+# backend/match_queue.py
+"""
+1:1 매칭 대기열 + 진행 중 매치 저장소.
+
+기존 router_matchmaking 은 List[str] 큐라서
+- `user_id in waiting_queue` / `pop(0)` 가 O(n)
+- 탭을 닫은 유저는 영원히 큐에 남고, 결과가 안 올라온 매치는 active_matches 에 계속 쌓임
+
+여기서는
+- 대기열: OrderedDict (user_id -> Waiter) 로 join / leave 모두 O(1), 들어온 순서 유지
+- 레이팅 매칭: 대기자를 레이팅 구간(RATING_BUCKET_WIDTH) 별 OrderedDict 에도 넣어두고,
+  새로 들어온 유저는 자기 구간에서 가까운 구간 순으로 각 구간의 가장 오래 기다린 사람만 확인
+  → 대기자 수와 상관없이 (최대 창 / 구간 폭) 개 구간만 봄.
+  허용 레이팅 차이(창)는 기다린 시간에 비례해 넓어짐 (RATING_WINDOW_BASE + GROWTH * 초, 최대 MAX).
+  오래 기다린 사람끼리는 새 join 이 없어도 sweeper 의 pair_waiting() 이 묶어줌
+- 하트비트: /match/join 재호출, /match/heartbeat 가 last_seen 을 갱신
+- 진행 중 매치가 있는 유저의 join: 아직 그 매치를 못 받은 쪽이면 (먼저 기다리던 사람이
+  join 을 다시 불러 결과를 받는 경우) 그 매치를 돌려주고, 이미 받은 사람이 다시 join 하면
+  새 게임을 하겠다는 뜻이라 이전 매치를 끝내고 (상대에게는 match_expired) 큐에 새로 넣음
+- sweep(): last_seen 이 WAITER_TTL 보다 오래된 대기자 제거,
+           MATCH_TTL 이 지나도록 결과가 안 온 매치 만료
+- 짝을 지을 때도 후보가 stale 이면 버리고 다음 사람과 매칭 (sweep 사이 유령 매칭 방지)
+이벤트 루프 스레드에서만 호출하는 것을 전제로 함 (내부에 await 없음).
+"""
+
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+from backend.metrics import Counter, Gauge, Histogram
+from backend.ratings import rating_cache
+
+# 대기자가 이 시간 동안 하트비트가 없으면 큐에서 제거 (클라이언트는 몇 초마다 join / heartbeat)
+WAITER_TTL_SECONDS = float(os.getenv("KCU_MATCH_WAITER_TTL_SECONDS", "30"))
+# 매칭 후 이 시간 안에 /match/result 가 안 오면 버려진 매치로 보고 제거
+MATCH_TTL_SECONDS = float(os.getenv("KCU_MATCH_TTL_SECONDS", "900"))
+
+# 레이팅 매칭 창: 처음엔 ±BASE, 1초마다 GROWTH 씩 넓어져서 최대 ±MAX
+RATING_WINDOW_BASE = float(os.getenv("KCU_MATCH_RATING_WINDOW", "100"))
+RATING_WINDOW_GROWTH = float(os.getenv("KCU_MATCH_RATING_WINDOW_GROWTH", "20"))
+RATING_WINDOW_MAX = float(os.getenv("KCU_MATCH_RATING_WINDOW_MAX", "800"))
+RATING_BUCKET_WIDTH = float(os.getenv("KCU_MATCH_RATING_BUCKET", "50"))
+
+MATCH_QUEUE_LENGTH = Gauge(
+    "kcu_match_queue_length",
+    "매칭 대기 중인 유저 수",
+)
+MATCH_ACTIVE = Gauge(
+    "kcu_match_active",
+    "결과 저장 전인 진행 중 매치 수",
+)
+MATCH_RATING_GAP = Histogram(
+    "kcu_match_rating_gap",
+    "매칭된 두 유저의 레이팅 차이",
+    buckets=(25, 50, 100, 200, 400, 800),
+)
+MATCH_WAIT_SECONDS = Histogram(
+    "kcu_match_wait_seconds",
+    "큐에 들어간 뒤 매칭될 때까지 걸린 시간",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+MATCH_EXPIRED = Counter(
+    "kcu_match_expired_total",
+    "하트비트 / TTL 만료로 제거된 대기자(waiter) / 매치(match) 수",
+    labelnames=("kind",),
+)
+MATCH_LEFT = Counter(
+    "kcu_match_left_total",
+    "/match/leave 로 스스로 나간 대기자 수",
+)
+MATCH_ABANDONED = Counter(
+    "kcu_match_abandoned_total",
+    "결과 없이 참가자가 다시 join 해서 끝낸 매치 수",
+)
+
+
+class Match(BaseModel):
+    match_id: str
+    players: List[str]
+    created_at: datetime
+
+
+@dataclass
+class Waiter:
+    user_id: str
+    joined_at: float   # time.monotonic()
+    last_seen: float
+    rating: float
+    bucket: int
+
+
+def rating_window(waited: float) -> float:
+    """기다린 시간(초)에 따른 허용 레이팅 차이"""
+    return min(RATING_WINDOW_MAX, RATING_WINDOW_BASE + RATING_WINDOW_GROWTH * waited)
+
+
+class MatchQueue:
+    def __init__(
+        self,
+        waiter_ttl: float = WAITER_TTL_SECONDS,
+        match_ttl: float = MATCH_TTL_SECONDS,
+        rating_of: Callable[[str], float] = rating_cache.get,
+    ):
+        self.waiter_ttl = waiter_ttl
+        self.match_ttl = match_ttl
+        self.rating_of = rating_of
+        self._waiting: "OrderedDict[str, Waiter]" = OrderedDict()  # 들어온 순서
+        # 레이팅 구간 -> 그 구간 대기자 (들어온 순서). 빈 구간은 지움
+        self._buckets: Dict[int, "OrderedDict[str, Waiter]"] = {}
+        # match_id -> (Match, 만들어진 monotonic 시각). dict 삽입 순서 = 생성 순서라 앞에서부터 만료
+        self._active: Dict[str, Tuple[Match, float]] = {}
+        self._user_match: Dict[str, str] = {}  # user_id -> 진행 중 match_id
+        # 매치가 만들어졌다는 걸 아직 못 받은 참가자 (user_id -> match_id)
+        self._unseen: Dict[str, str] = {}
+
+    # -----------------------
+    #  대기열
+    # -----------------------
+    def is_waiting(self, user_id: str) -> bool:
+        return user_id in self._waiting
+
+    def waiting_users(self) -> List[str]:
+        return list(self._waiting)
+
+    def __len__(self) -> int:
+        return len(self._waiting)
+
+    def join(self, user_id: str) -> Tuple[Optional[Match], bool, Optional[Match]]:
+        """
+        큐 참가. (match, created, ended) 반환
+        - 아직 못 받은 진행 중 매치가 있으면 그 매치 (먼저 들어와 기다리던 쪽이 다시 join 해서 결과를 받는 경우)
+        - 이미 받은 매치가 진행 중이면 그 매치는 끝내고 (ended) 아래처럼 새로 참가
+        - 레이팅 창 안에 대기 중인 다른 유저가 있으면 새 매치 (created=True)
+        - 없으면 None (대기열에 들어가거나, 이미 있으면 하트비트만 갱신)
+        """
+        now = time.monotonic()
+
+        ended = None
+        match_id = self._user_match.get(user_id)
+        if match_id is not None and match_id in self._active:
+            if self._unseen.get(user_id) == match_id:
+                del self._unseen[user_id]
+                return self._active[match_id][0], False, None
+            ended = self.finish(match_id)
+            MATCH_ABANDONED.inc()
+
+        waiter = self._waiting.get(user_id)
+        if waiter is not None:
+            waiter.last_seen = now
+            return None, False, ended
+
+        rating = self.rating_of(user_id)
+        waiter = Waiter(user_id, joined_at=now, last_seen=now, rating=rating, bucket=self._bucket_of(rating))
+        opponent = self._find_opponent(waiter, now)
+        if opponent is None:
+            self._add(waiter)
+            return None, False, ended
+        return self._pair(opponent, waiter, now), True, ended
+
+    def pair_waiting(self) -> List[Match]:
+        """
+        기다리는 동안 창이 넓어진 대기자끼리 매칭 (sweeper 에서 주기적으로 호출).
+        오래 기다린 사람부터 상대를 찾음
+        """
+        now = time.monotonic()
+        matches = []
+        for user_id in list(self._waiting):
+            waiter = self._waiting.get(user_id)
+            if waiter is None:  # 이번 루프에서 이미 매칭됨
+                continue
+            opponent = self._find_opponent(waiter, now)
+            if opponent is not None:
+                self._remove(user_id)
+                matches.append(self._pair(opponent, waiter, now, second_notified=False))
+        return matches
+
+    def leave(self, user_id: str) -> bool:
+        """대기열에서 나가기 (없으면 False)"""
+        if self._remove(user_id) is None:
+            return False
+        MATCH_LEFT.inc()
+        return True
+
+    def heartbeat(self, user_id: str) -> bool:
+        """대기자 / 진행 중 매치 참가자가 아직 살아 있음을 표시"""
+        waiter = self._waiting.get(user_id)
+        if waiter is not None:
+            waiter.last_seen = time.monotonic()
+            return True
+        return user_id in self._user_match
+
+    @staticmethod
+    def _bucket_of(rating: float) -> int:
+        return int(rating // RATING_BUCKET_WIDTH)
+
+    def _add(self, waiter: Waiter) -> None:
+        self._waiting[waiter.user_id] = waiter
+        self._buckets.setdefault(waiter.bucket, OrderedDict())[waiter.user_id] = waiter
+        MATCH_QUEUE_LENGTH.set(len(self._waiting))
+
+    def _remove(self, user_id: str) -> Optional[Waiter]:
+        waiter = self._waiting.pop(user_id, None)
+        if waiter is not None:
+            bucket = self._buckets[waiter.bucket]
+            del bucket[user_id]
+            if not bucket:
+                del self._buckets[waiter.bucket]
+            MATCH_QUEUE_LENGTH.set(len(self._waiting))
+        return waiter
+
+    def _find_opponent(self, waiter: Waiter, now: float) -> Optional[Waiter]:
+        """
+        waiter 와 매칭할 대기자를 찾아서 큐에서 빼고 반환.
+        가까운 레이팅 구간부터 보고, 각 구간에서는 가장 오래 기다린 (창이 가장 넓은) 사람만 확인.
+        두 사람 중 한 명의 창에라도 들어오면 매칭.
+        """
+        own_window = rating_window(now - waiter.joined_at)
+        reach = int(RATING_WINDOW_MAX // RATING_BUCKET_WIDTH) + 1
+        for distance in range(reach + 1):
+            if not self._buckets:
+                return None
+            best: Optional[Waiter] = None
+            for bucket_id in {waiter.bucket - distance, waiter.bucket + distance}:
+                candidate = self._bucket_head(bucket_id, waiter.user_id, now)
+                if candidate is None:
+                    continue
+                gap = abs(candidate.rating - waiter.rating)
+                if gap > max(own_window, rating_window(now - candidate.joined_at)):
+                    continue
+                if best is None or gap < abs(best.rating - waiter.rating):
+                    best = candidate
+            if best is not None:
+                self._remove(best.user_id)
+                return best
+        return None
+
+    def _bucket_head(self, bucket_id: int, exclude: str, now: float) -> Optional[Waiter]:
+        """구간에서 가장 오래 기다린 살아있는 대기자 (stale 이면 여기서 제거)"""
+        bucket = self._buckets.get(bucket_id)
+        while bucket:
+            for candidate in bucket.values():
+                if candidate.user_id != exclude:
+                    break
+            else:
+                return None
+            if now - candidate.last_seen <= self.waiter_ttl:
+                return candidate
+            self._remove(candidate.user_id)
+            MATCH_EXPIRED.inc(kind="waiter")
+            bucket = self._buckets.get(bucket_id)
+        return None
+
+    def _pair(self, first: Waiter, second: Waiter, now: float, second_notified: bool = True) -> Match:
+        """second_notified: second 가 join 응답으로 바로 매치를 받음 (sweeper 가 묶은 경우 둘 다 이벤트로 받음)"""
+        MATCH_WAIT_SECONDS.observe(now - first.joined_at)
+        MATCH_WAIT_SECONDS.observe(now - second.joined_at)
+        MATCH_RATING_GAP.observe(abs(first.rating - second.rating))
+        match = self._create_match([first.user_id, second.user_id], now)
+        self._unseen[first.user_id] = match.match_id
+        if not second_notified:
+            self._unseen[second.user_id] = match.match_id
+        return match
+
+    # -----------------------
+    #  진행 중 매치
+    # -----------------------
+    def _create_match(self, players: List[str], now: float) -> Match:
+        match = Match(match_id=str(uuid4()), players=players, created_at=datetime.utcnow())
+        self._active[match.match_id] = (match, now)
+        for user_id in players:
+            self._user_match[user_id] = match.match_id
+        MATCH_ACTIVE.set(len(self._active))
+        return match
+
+    def get(self, match_id: str) -> Optional[Match]:
+        entry = self._active.get(match_id)
+        return entry[0] if entry else None
+
+    def mark_seen(self, user_id: str, match_id: str) -> None:
+        """matched 이벤트 등으로 매치를 받았음 (이후 join 은 새 게임 참가로 처리)"""
+        if self._unseen.get(user_id) == match_id:
+            del self._unseen[user_id]
+
+    def finish(self, match_id: str) -> Optional[Match]:
+        """결과가 저장된 매치 제거"""
+        entry = self._active.pop(match_id, None)
+        if entry is None:
+            return None
+        match = entry[0]
+        for user_id in match.players:
+            if self._user_match.get(user_id) == match_id:
+                del self._user_match[user_id]
+            if self._unseen.get(user_id) == match_id:
+                del self._unseen[user_id]
+        MATCH_ACTIVE.set(len(self._active))
+        return match
+
+    # -----------------------
+    #  만료 처리
+    # -----------------------
+    def sweep(self, now: Optional[float] = None) -> Tuple[List[str], List[Match]]:
+        """stale 대기자 / 버려진 매치 제거. (제거된 대기자 user_id 들, 만료된 매치들) 반환"""
+        now = time.monotonic() if now is None else now
+
+        # 대기자는 하트비트 순서가 들어온 순서와 달라서 전체를 훑음 (주기 작업이라 괜찮음)
+        stale = [uid for uid, w in self._waiting.items() if now - w.last_seen > self.waiter_ttl]
+        for user_id in stale:
+            self._remove(user_id)
+
+        # 매치는 생성 순서대로 들어있으니 앞에서부터 만료 안 된 것이 나오면 멈춤
+        expired_ids = []
+        for match_id, (_, created) in self._active.items():
+            if now - created <= self.match_ttl:
+                break
+            expired_ids.append(match_id)
+        expired = [self.finish(match_id) for match_id in expired_ids]
+
+        if stale:
+            MATCH_EXPIRED.inc(len(stale), kind="waiter")
+        if expired:
+            MATCH_EXPIRED.inc(len(expired), kind="match")
+        MATCH_QUEUE_LENGTH.set(len(self._waiting))
+        MATCH_ACTIVE.set(len(self._active))
+        return stale, expired
+
+
+# 서버 전체에서 공유하는 매칭 큐
+match_queue = MatchQueue()
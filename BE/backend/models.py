@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, TIMESTAMP
+from sqlalchemy import Column, Integer, String, Float, Text, TIMESTAMP, Index
 from sqlalchemy.sql import func
 from backend.database import Base
 
@@ -7,13 +7,21 @@ class User(Base):
     로그인 시스템은 도원이가 만들었으니까,
     여기서는 user_id만 받아서 저장하는 용도로만 쓴다고 생각하면 됨.
     (실제 User 테이블은 로그인 쪽에서 쓰거나, 안 써도 됨)
+    - /auth/signup 으로 가입한 계정은 user_id = email 로 저장 (점수 / 매칭의 user_id 와 같은 값)
+    - email 은 unique 인덱스 (로그인 시 이메일로 조회)
     """
     __tablename__ = "users"
 
     user_id = Column(String, primary_key=True, index=True)
     username = Column(String, nullable=True)
+    email = Column(String, nullable=True)
+    password_hash = Column(String, nullable=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+    __table_args__ = (
+        Index("uq_users_email", email, unique=True),
+    )
+
 # (중간 Daily 모델 부분 생략)
 
 class Score(Base):
@@ -33,6 +41,35 @@ class Score(Base):
     image_path = Column(String, nullable=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+    # 랭킹 정렬 순서는 (score DESC, id ASC).
+    # id 는 저장 순서라서 "점수가 같으면 먼저 기록된 것이 위" 와 같은 의미이고,
+    # 유일한 값이라 cursor 페이지네이션 키로도 바로 쓸 수 있음
+    __table_args__ = (
+        # 전체 기간 랭킹: 정렬 없이 인덱스 순서로 읽기
+        Index("ix_scores_score_id", score.desc(), id),
+        # 일간 / 주간 랭킹: date 고정 후 같은 순서로 range scan
+        Index("ix_scores_date_score_id", date, score.desc(), id),
+    )
+
+
+class UserBestScore(Base):
+    """
+    유저별 최고 점수 (점수 저장할 때 같은 트랜잭션에서 갱신)
+    - 유저당 1행이라 "유저별 베스트 랭킹" / "내 순위" 를 정렬 없이 인덱스로 조회 가능
+    - score_id: 최고 점수를 낸 scores.id (동점일 때 먼저 낸 사람이 위)
+    """
+    __tablename__ = "user_best_scores"
+
+    user_id = Column(String, primary_key=True)
+    score = Column(Float, nullable=False)
+    score_id = Column(Integer, nullable=False)
+    date = Column(String, nullable=True)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_user_best_scores_score_score_id", score.desc(), score_id),
+    )
+
 
 class MatchResult(Base):
     """
@@ -48,3 +85,37 @@ class MatchResult(Base):
     winner_id = Column(String, index=True)
     loser_id = Column(String, index=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
+
+    __table_args__ = (
+        # 매치 1개당 결과 1행 (재시도 / 동시 요청으로 중복 저장 방지)
+        Index("uq_match_results_match_id", match_id, unique=True),
+    )
+
+
+class Rating(Base):
+    """
+    유저별 Elo 레이팅 (/match/result 저장 시 같은 트랜잭션에서 갱신)
+    - 매칭 큐는 메모리 캐시(backend.ratings.rating_cache)를 보고 비슷한 레이팅끼리 매칭
+    - match_results 전체로 다시 계산: python -m backend.ratings replay
+    """
+    __tablename__ = "ratings"
+
+    user_id = Column(String, primary_key=True)
+    rating = Column(Float, nullable=False)
+    games = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+
+class IdempotencyKey(Base):
+    """
+    Idempotency-Key 헤더로 들어온 쓰기 요청의 원래 응답
+    - key: "<scope>:<헤더 값>" (scope 는 score.save / compete.submit / match.result)
+    - 같은 키로 재시도하면 다시 쓰지 않고 response 를 그대로 돌려줌
+    - 쓰기와 같은 트랜잭션에서 저장해서 "저장은 됐는데 키는 없음" 상태가 없음
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    response = Column(Text, nullable=False)  # JSON
+    created_at = Column(TIMESTAMP, server_default=func.now(), index=True)
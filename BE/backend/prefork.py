@@ -0,0 +1,51 @@
+# backend/prefork.py
+"""
+gunicorn pre-fork 모드용 CLIP 가중치 공유.
+
+uvicorn --workers N 은 워커마다 모델을 따로 로드해서 (fp32 약 600MB) 워커 수가 제한됨.
+gunicorn(preload_app) 마스터에서 fork 전에 가중치를 한 번만 로드해두면
+워커들은 copy-on-write 로 같은 물리 메모리 페이지를 공유함
+(추론은 no_grad 라 가중치 페이지에 쓰기가 일어나지 않음).
+
+실제 연결은 BE/gunicorn.conf.py 에서 함.
+"""
+
+import gc
+import importlib
+import logging
+import os
+
+from backend.visualization.router_visualize import model_loader
+
+logger = logging.getLogger(__name__)
+
+
+def preload_model() -> None:
+    """
+    마스터 프로세스에서 fork 전에 호출.
+    warm-up forward 는 하지 않음 (OpenMP 스레드 풀이 fork 전에 생기면 워커에서 멈출 수 있음).
+    onnx 백엔드도 InferenceSession (ORT 스레드 풀) 은 만들지 않고 각 워커가 처음 쓸 때 생성.
+    """
+    import torch
+
+    # 로딩 중 텐서 복사가 OpenMP 병렬 영역을 만들지 않도록 마스터는 1 스레드
+    torch.set_num_threads(1)
+    importlib.import_module(model_loader.module_name)
+
+    # 지금까지 만든 객체는 GC 대상에서 빼서, 워커의 GC 가 refcount/헤더를 건드려
+    # 공유 페이지를 복사하게 만드는 일을 줄임
+    gc.collect()
+    gc.freeze()
+    logger.info("CLIP 가중치 pre-fork 로드 완료 (pid=%s)", os.getpid())
+
+
+def init_worker(workers: int) -> None:
+    """
+    fork 직후 워커에서 호출.
+    KCU_TORCH_THREADS 가 없으면 코어를 워커 수로 나눠서 torch 스레드 수 결정.
+    (warm-up 은 앱 lifespan 의 model_loader.start() 에서 import 캐시를 재사용하며 실행됨)
+    """
+    import torch
+
+    if int(os.getenv("KCU_TORCH_THREADS", "0")) <= 0:
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // max(1, workers)))
@@ -0,0 +1,267 @@
+# backend/profiling.py
+"""
+운영 중인 워커 안에서 시간이 어디에 쓰이는지 보는 도구 (둘 다 기본 꺼짐).
+
+1) 샘플링 프로파일러 (KCU_PROFILER=1)
+   GET /admin/profile?seconds=10 → 그동안 interval_ms 마다 sys._current_frames() 로
+   모든 스레드의 파이썬 스택을 찍어서 flamegraph 용 collapsed stack 텍스트로 반환
+   ("스레드;바깥 함수;...;안쪽 함수 샘플수" 한 줄씩, flamegraph.pl / speedscope 에 그대로 넣으면 됨).
+   요청한 워커 1개만 측정하고, 한 번에 하나만 실행.
+
+2) 느린 요청 로그 (KCU_SLOW_REQUEST_MS > 0)
+   요청마다 trace=True 인 Histogram (visualize 단계, DB commit, 매칭 락 대기, 비밀번호 해시 등)
+   의 observe 를 모아두었다가, 전체 시간이 기준을 넘으면 route / 단계별 시간 / torch 스레드 설정을
+   backend.slow_requests 로거에 JSON 한 줄로 남기고 최근 것들은 GET /admin/slow-requests 로 보여줌.
+
+/admin 라우터는 KCU_PROFILER_TOKEN 이 설정돼 있을 때만 붙고 X-Admin-Token 헤더가 맞아야 함
+(토큰 없이 열어두면 느린 요청의 path 에 든 user_id 등이 그대로 보이니까 fail closed).
+토큰이 없으면 느린 요청은 로그로만 남음.
+꺼져 있으면 main.py 가 라우터 / 미들웨어를 아예 붙이지 않고 metrics 훅도 None 이라 비용 없음.
+"""
+
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from backend import metrics
+from backend.http_metrics import route_label
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("backend.slow_requests")
+
+PROFILER_ENABLED = os.getenv("KCU_PROFILER", "0") == "1"
+PROFILER_TOKEN = os.getenv("KCU_PROFILER_TOKEN", "")
+PROFILE_MAX_SECONDS = float(os.getenv("KCU_PROFILER_MAX_SECONDS", "60"))
+
+SLOW_REQUEST_MS = float(os.getenv("KCU_SLOW_REQUEST_MS", "0"))
+SLOW_REQUEST_KEEP = int(os.getenv("KCU_SLOW_REQUEST_KEEP", "100"))
+# 원래 오래 걸리는 라우트 (long-poll, 프로파일링 자체) 는 느린 요청으로 안 남김
+SLOW_REQUEST_EXCLUDE = frozenset(
+    route.strip()
+    for route in os.getenv("KCU_SLOW_REQUEST_EXCLUDE", "/admin/profile,/match/events/{user_id}").split(",")
+    if route.strip()
+)
+# /admin 라우터를 붙일지 (기능이 켜져 있고 토큰이 있을 때만)
+ADMIN_ENABLED = bool(PROFILER_TOKEN) and (PROFILER_ENABLED or SLOW_REQUEST_MS > 0)
+if (PROFILER_ENABLED or SLOW_REQUEST_MS > 0) and not PROFILER_TOKEN:
+    logger.warning("KCU_PROFILER_TOKEN 이 없어서 /admin 엔드포인트를 붙이지 않습니다.")
+# 요청 1건에서 모으는 단계 기록 수 상한 (오래 사는 task 가 context 를 물려받아도 무한히 안 늘게)
+MAX_TRACE_ENTRIES = 1000
+
+router = APIRouter()
+
+
+class ProfilerBusy(Exception):
+    """이미 다른 프로파일링이 실행 중"""
+
+
+# -----------------------
+#  샘플링 프로파일러
+# -----------------------
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def sample(self, seconds: float, interval: float) -> Tuple[Counter, int]:
+        """
+        seconds 동안 interval 마다 자기 자신을 뺀 모든 스레드의 스택을 찍음 (블로킹).
+        (collapsed stack -> 샘플 수, 찍은 횟수) 반환
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            me = threading.get_ident()
+            stacks: Counter = Counter()
+            labels: Dict = {}  # code 객체 -> 라벨 (같은 함수를 매번 포맷하지 않게)
+            names = {t.ident: t.name for t in threading.enumerate()}
+            samples = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack: List[str] = []
+                    while frame is not None:
+                        code = frame.f_code
+                        label = labels.get(code)
+                        if label is None:
+                            label = labels[code] = _frame_label(code)
+                        stack.append(label)
+                        frame = frame.f_back
+                    if ident not in names:
+                        names = {t.ident: t.name for t in threading.enumerate()}
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    stacks[";".join(reversed(stack))] += 1
+                samples += 1
+                time.sleep(interval)
+            return stacks, samples
+        finally:
+            self._lock.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+profiler = SamplingProfiler()
+
+
+# -----------------------
+#  느린 요청 로그
+# -----------------------
+_trace: ContextVar[Optional[list]] = ContextVar("kcu_request_trace", default=None)
+recent_slow_requests: deque = deque(maxlen=max(1, SLOW_REQUEST_KEEP))
+
+
+def stage_name(histogram, labels: Dict[str, str]) -> str:
+    """kcu_visualize_stage_seconds{stage=decode} -> visualize_stage.decode"""
+    name = histogram.name
+    if name.startswith("kcu_"):
+        name = name[4:]
+    if name.endswith("_seconds"):
+        name = name[:-8]
+    values = [str(labels[k]) for k in histogram.labelnames if k in labels]
+    return ".".join([name, *values])
+
+
+def _record_stage(histogram, value: float, labels: Dict[str, str]) -> None:
+    trace = _trace.get()
+    if trace is not None and len(trace) < MAX_TRACE_ENTRIES:
+        trace.append((stage_name(histogram, labels), value))
+
+
+def torch_settings() -> dict:
+    """이미 import 된 경우에만 torch 스레드 설정 (여기서 torch 를 새로 import 하지 않음)"""
+    settings = {
+        "KCU_TORCH_THREADS": os.getenv("KCU_TORCH_THREADS"),
+        "OMP_NUM_THREADS": os.getenv("OMP_NUM_THREADS"),
+    }
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        settings["num_threads"] = torch.get_num_threads()
+        settings["num_interop_threads"] = torch.get_num_interop_threads()
+    return settings
+
+
+def summarize_stages(trace: list) -> dict:
+    """같은 단계가 여러 번이면 합계 + 횟수"""
+    stages: Dict[str, dict] = {}
+    for name, seconds in trace:
+        entry = stages.setdefault(name, {"ms": 0.0, "count": 0})
+        entry["ms"] += seconds * 1000
+        entry["count"] += 1
+    for entry in stages.values():
+        entry["ms"] = round(entry["ms"], 3)
+    return stages
+
+
+class SlowRequestMiddleware:
+    """SLOW_REQUEST_MS 를 넘은 HTTP 요청을 단계별 시간과 함께 기록"""
+
+    def __init__(self, app, threshold_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.threshold = threshold_ms / 1000
+        metrics.set_trace_hook(_record_stage)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        trace: list = []
+        token = _trace.set(trace)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _trace.reset(token)
+            if elapsed >= self.threshold:
+                route = route_label(scope)
+                if route not in SLOW_REQUEST_EXCLUDE:
+                    self._log(scope, route, status, elapsed, trace)
+
+    @staticmethod
+    def _log(scope, route: str, status: int, elapsed: float, trace: list) -> None:
+        entry = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "method": scope["method"],
+            "route": route,
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 3),
+            "stages": summarize_stages(trace),
+            "torch": torch_settings(),
+            "pid": os.getpid(),
+        }
+        recent_slow_requests.append(entry)
+        slow_logger.warning(json.dumps(entry, ensure_ascii=False))
+
+
+# -----------------------
+#  관리자 API (/admin)
+# -----------------------
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    # 토큰이 설정 안 돼 있으면 (라우터를 직접 붙인 경우에도) 항상 거절
+    if not PROFILER_TOKEN or not hmac.compare_digest(x_admin_token or "", PROFILER_TOKEN):
+        raise HTTPException(status_code=403, detail="관리자 토큰이 필요합니다.")
+
+
+@router.get("/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+):
+    """이 워커를 seconds 동안 샘플링해서 collapsed stack 으로 반환"""
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="프로파일러가 꺼져 있습니다. (KCU_PROFILER=1)")
+    if seconds > PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds 는 {PROFILE_MAX_SECONDS:g} 이하여야 합니다.")
+    try:
+        stacks, samples = await run_in_threadpool(profiler.sample, seconds, interval_ms / 1000)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="이미 프로파일링 중입니다.")
+
+    logger.info("프로파일링 완료: %.1fs, %d 샘플, 스택 %d 개", seconds, samples, len(stacks))
+    return PlainTextResponse(
+        collapsed(stacks),
+        headers={
+            "Content-Disposition": f'attachment; filename="profile-{os.getpid()}-{int(time.time())}.collapsed"',
+            "X-Profile-Samples": str(samples),
+        },
+    )
+
+
+@router.get("/slow-requests", dependencies=[Depends(require_admin)])
+async def slow_requests():
+    """최근 느린 요청 (최대 KCU_SLOW_REQUEST_KEEP 개, 이 워커 것만)"""
+    if SLOW_REQUEST_MS <= 0:
+        raise HTTPException(status_code=404, detail="느린 요청 로그가 꺼져 있습니다. (KCU_SLOW_REQUEST_MS)")
+    return {"threshold_ms": SLOW_REQUEST_MS, "requests": list(recent_slow_requests)}
@@ -0,0 +1,260 @@
+# backend/rankings.py
+"""
+랭킹 조회 쿼리 모음 (일간 / 주간 / 전체 / 유저별 베스트 / 내 순위).
+
+모든 쿼리는 models.py 의 복합 인덱스 순서 (score DESC, id ASC) 그대로 읽는
+keyset(cursor) 페이지네이션이라, 테이블이 커져도 전체 정렬이 일어나지 않음.
+- 일간: ix_scores_date_score_id range scan
+- 주간: 7일 각각 일간 range scan 후 메모리에서 merge
+- 전체: ix_scores_score_id
+- 유저별 베스트 / 내 순위: user_best_scores + ix_user_best_scores_score_score_id
+"""
+
+import base64
+import heapq
+import json
+from datetime import date as date_type, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session, aliased
+
+from backend.models import Score, UserBestScore
+
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """cursor 문자열을 해석할 수 없음"""
+
+
+# -----------------------
+#  cursor 인코딩
+# -----------------------
+def encode_cursor(rank: int, score: float, tiebreak: int) -> str:
+    """마지막으로 돌려준 항목의 (순위, 점수, id) -> 불투명한 cursor 문자열"""
+    raw = json.dumps([rank, score, tiebreak], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[int, float, int]]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        rank, score, tiebreak = json.loads(base64.urlsafe_b64decode(padded))
+        return int(rank), float(score), int(tiebreak)
+    except Exception:
+        raise InvalidCursor(cursor)
+
+
+def _after(score_col, tiebreak_col, score: float, tiebreak: int):
+    """(score DESC, tiebreak ASC) 순서에서 (score, tiebreak) 다음 항목들 조건"""
+    return or_(
+        score_col < score,
+        and_(score_col == score, tiebreak_col > tiebreak),
+    )
+
+
+def _page(rows: list, limit: int, start_rank: int, tiebreak_attr: str):
+    """limit+1 개 조회한 결과 -> (순위 붙인 항목들, next_cursor)"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    ranked = [(start_rank + i + 1, row) for i, row in enumerate(rows)]
+
+    next_cursor = None
+    if has_more and ranked:
+        rank, last = ranked[-1]
+        next_cursor = encode_cursor(rank, last.score, getattr(last, tiebreak_attr))
+    return ranked, next_cursor
+
+
+# -----------------------
+#  점수 기록 랭킹
+# -----------------------
+def _score_query(db: Session, cursor, limit: int, day: Optional[str] = None):
+    query = db.query(Score).filter(Score.score.isnot(None))
+    if day is not None:
+        query = query.filter(Score.date == day)
+    if cursor is not None:
+        _, score, score_id = cursor
+        query = query.filter(_after(Score.score, Score.id, score, score_id))
+    return query.order_by(Score.score.desc(), Score.id.asc()).limit(limit + 1).all()
+
+
+def all_time(db: Session, limit: int, cursor: Optional[str] = None):
+    position = decode_cursor(cursor)
+    rows = _score_query(db, position, limit)
+    return _page(rows, limit, position[0] if position else 0, "id")
+
+
+def daily(db: Session, day: str, limit: int, cursor: Optional[str] = None):
+    position = decode_cursor(cursor)
+    rows = _score_query(db, position, limit, day=day)
+    return _page(rows, limit, position[0] if position else 0, "id")
+
+
+def week_days(day: date_type) -> List[str]:
+    """day 가 속한 주 (월~일) 의 날짜 문자열 7개"""
+    monday = day - timedelta(days=day.weekday())
+    return [(monday + timedelta(days=i)).isoformat() for i in range(7)]
+
+
+def weekly(db: Session, day: date_type, limit: int, cursor: Optional[str] = None):
+    """
+    주간 랭킹. date 범위 조건 하나로 조회하면 인덱스 순서가 안 맞아 정렬이 필요하니까,
+    하루씩 (date 고정) 인덱스 range scan 으로 limit+1 개씩 읽어서 merge 함.
+    """
+    position = decode_cursor(cursor)
+    per_day = [_score_query(db, position, limit, day=d) for d in week_days(day)]
+    merged = list(heapq.merge(*per_day, key=lambda s: (-s.score, s.id)))[: limit + 1]
+    return _page(merged, limit, position[0] if position else 0, "id")
+
+
+# -----------------------
+#  유저별 최고 점수
+# -----------------------
+def _insert_for(db: Session):
+    """ON CONFLICT 를 지원하는 dialect 의 insert (sqlite / postgresql), 그 외는 None"""
+    name = db.get_bind().dialect.name
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert
+
+
+def record_user_best(db: Session, score: Score) -> None:
+    """
+    점수 1건 저장 시 같은 트랜잭션 안에서 호출 (score.id 가 있어야 하니 flush 후).
+    기존 최고 점수보다 높을 때만 갱신.
+    같은 유저의 첫 점수가 동시에 들어와도 IntegrityError 가 안 나도록
+    INSERT ... ON CONFLICT DO UPDATE ... WHERE excluded.score > score 한 문장으로 처리.
+    """
+    if score.score is None:
+        return
+    insert = _insert_for(db)
+    if insert is None:
+        best = db.get(UserBestScore, score.user_id)
+        if best is None:
+            db.add(UserBestScore(
+                user_id=score.user_id,
+                score=score.score,
+                score_id=score.id,
+                date=score.date,
+            ))
+        elif score.score > best.score:
+            best.score = score.score
+            best.score_id = score.id
+            best.date = score.date
+        return
+
+    stmt = insert(UserBestScore).values(
+        user_id=score.user_id,
+        score=score.score,
+        score_id=score.id,
+        date=score.date,
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserBestScore.user_id],
+        set_={
+            "score": stmt.excluded.score,
+            "score_id": stmt.excluded.score_id,
+            "date": stmt.excluded.date,
+            "updated_at": func.now(),
+        },
+        where=stmt.excluded.score > UserBestScore.score,
+    ))
+
+
+def backfill_user_best(db: Session) -> int:
+    """
+    user_best_scores 가 비어 있으면 기존 scores 로 한 번 채움 (서버 시작 시).
+    유저별로 (score DESC, id ASC) 첫 번째 행을 최고 점수로 사용.
+    """
+    if db.query(UserBestScore.user_id).limit(1).first() is not None:
+        return 0
+
+    # 유저별 최고 점수 행 id (같은 user_id 안에서 score DESC, id ASC 첫 번째)
+    other = aliased(Score)
+    best_id = (
+        db.query(other.id)
+        .filter(other.user_id == Score.user_id, other.score.isnot(None))
+        .order_by(other.score.desc(), other.id.asc())
+        .limit(1)
+        .correlate(Score)
+        .scalar_subquery()
+    )
+    rows = (
+        db.query(Score.user_id, Score.score, Score.id, Score.date)
+        .filter(Score.user_id.isnot(None), Score.id == best_id)
+    )
+
+    result = db.execute(
+        UserBestScore.__table__.insert().from_select(
+            ["user_id", "score", "score_id", "date"],
+            rows.statement,
+        )
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def best_per_user(db: Session, limit: int, cursor: Optional[str] = None):
+    position = decode_cursor(cursor)
+    query = db.query(UserBestScore)
+    if position is not None:
+        _, score, score_id = position
+        query = query.filter(_after(UserBestScore.score, UserBestScore.score_id, score, score_id))
+    rows = query.order_by(UserBestScore.score.desc(), UserBestScore.score_id.asc()).limit(limit + 1).all()
+    return _page(rows, limit, position[0] if position else 0, "score_id")
+
+
+def my_rank(db: Session, user_id: str, window: int):
+    """
+    유저별 베스트 기준 내 순위 + 위/아래로 window 명씩.
+    순위 = 나보다 앞 순서인 유저 수 + 1 (인덱스 range 로 count).
+    """
+    me = db.get(UserBestScore, user_id)
+    if me is None:
+        return None, [], []
+
+    ahead = (
+        db.query(func.count())
+        .select_from(UserBestScore)
+        .filter(
+            or_(
+                UserBestScore.score > me.score,
+                and_(UserBestScore.score == me.score, UserBestScore.score_id < me.score_id),
+            )
+        )
+        .scalar()
+    )
+    rank = ahead + 1
+
+    above = (
+        db.query(UserBestScore)
+        .filter(
+            or_(
+                UserBestScore.score > me.score,
+                and_(UserBestScore.score == me.score, UserBestScore.score_id < me.score_id),
+            )
+        )
+        .order_by(UserBestScore.score.asc(), UserBestScore.score_id.desc())
+        .limit(window)
+        .all()
+    )
+    above.reverse()
+    below = (
+        db.query(UserBestScore)
+        .filter(_after(UserBestScore.score, UserBestScore.score_id, me.score, me.score_id))
+        .order_by(UserBestScore.score.desc(), UserBestScore.score_id.asc())
+        .limit(window)
+        .all()
+    )
+
+    above_ranked = [(rank - len(above) + i, row) for i, row in enumerate(above)]
+    below_ranked = [(rank + 1 + i, row) for i, row in enumerate(below)]
+    return (rank, me), above_ranked, below_ranked
@@ -0,0 +1,143 @@
+# backend/ratings.py
+"""
+Elo 레이팅.
+
+- /match/result 가 저장될 때 같은 트랜잭션에서 winner / loser 의 ratings 행을 갱신
+  (write-behind 모드에서는 배치 flush 때 저장 순서대로 갱신)
+- 매칭 큐가 매번 DB 를 보지 않도록 rating_cache 에 user_id -> rating 을 들고 있음
+  (서버 시작 시 load, commit 후 offer 로 반영. leaderboard 와 같은 방식)
+- 레이팅 공식이나 K 값을 바꾼 뒤에는 match_results 전체를 한 번 훑어서 다시 계산:
+    python -m backend.ratings replay
+"""
+
+import argparse
+import os
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.models import MatchResult, Rating
+
+DEFAULT_RATING = float(os.getenv("KCU_RATING_DEFAULT", "1500"))
+K_FACTOR = float(os.getenv("KCU_RATING_K", "32"))
+
+
+def expected_score(rating: float, opponent: float) -> float:
+    """rating 쪽이 이길 확률 (Elo)"""
+    return 1.0 / (1.0 + 10 ** ((opponent - rating) / 400.0))
+
+
+def elo_update(winner: float, loser: float, k: float = K_FACTOR) -> Tuple[float, float]:
+    """승/패 1판 반영 후 (winner 새 레이팅, loser 새 레이팅)"""
+    delta = k * (1.0 - expected_score(winner, loser))
+    return winner + delta, loser - delta
+
+
+class RatingCache:
+    """user_id -> rating. 없는 유저는 DEFAULT_RATING"""
+
+    def __init__(self):
+        self._ratings: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> int:
+        rows = db.query(Rating.user_id, Rating.rating).all()
+        with self._lock:
+            self._ratings = {user_id: rating for user_id, rating in rows}
+        return len(rows)
+
+    def get(self, user_id: str) -> float:
+        return self._ratings.get(user_id, DEFAULT_RATING)
+
+    def offer(self, rows: Iterable[Rating]) -> None:
+        """commit 된 ratings 행 반영"""
+        with self._lock:
+            for row in rows:
+                self._ratings[row.user_id] = row.rating
+
+    def __len__(self) -> int:
+        return len(self._ratings)
+
+
+def record_match_rating(db: Session, result: MatchResult) -> List[Rating]:
+    """
+    매치 결과 1건 저장 시 같은 트랜잭션 안에서 호출.
+    갱신된 ratings 행을 반환 (commit 후 rating_cache.offer 로 넘기기)
+    """
+    if not result.winner_id or not result.loser_id or result.winner_id == result.loser_id:
+        return []
+
+    winner = _get_or_create(db, result.winner_id)
+    loser = _get_or_create(db, result.loser_id)
+    winner.rating, loser.rating = elo_update(winner.rating, loser.rating)
+    winner.games += 1
+    winner.wins += 1
+    loser.games += 1
+    return [winner, loser]
+
+
+def _get_or_create(db: Session, user_id: str) -> Rating:
+    row = db.get(Rating, user_id)
+    if row is None:
+        row = Rating(user_id=user_id, rating=DEFAULT_RATING, games=0, wins=0)
+        db.add(row)
+        # pending 객체는 flush 전까지 identity map 에 없어서 db.get 이 못 찾음 (autoflush=False)
+        # → 같은 트랜잭션에서 같은 새 유저의 경기가 또 나오면 INSERT 가 두 번 나가 PK 충돌
+        db.flush()
+    return row
+
+
+def replay_ratings(db: Session, chunk_size: int = 1000) -> Tuple[int, int]:
+    """
+    match_results 를 id 순서로 한 번만 훑어서 ratings 테이블 전체를 다시 만듦.
+    (매치 수, 유저 수) 반환
+    """
+    ratings: Dict[str, List] = {}  # user_id -> [rating, games, wins]
+    matches = 0
+
+    rows = (
+        db.query(MatchResult.winner_id, MatchResult.loser_id)
+        .order_by(MatchResult.id)
+        .yield_per(chunk_size)
+    )
+    for winner_id, loser_id in rows:
+        if not winner_id or not loser_id or winner_id == loser_id:
+            continue
+        winner = ratings.setdefault(winner_id, [DEFAULT_RATING, 0, 0])
+        loser = ratings.setdefault(loser_id, [DEFAULT_RATING, 0, 0])
+        winner[0], loser[0] = elo_update(winner[0], loser[0])
+        winner[1] += 1
+        winner[2] += 1
+        loser[1] += 1
+        matches += 1
+
+    db.query(Rating).delete()
+    db.bulk_insert_mappings(Rating, [
+        {"user_id": user_id, "rating": rating, "games": games, "wins": wins}
+        for user_id, (rating, games, wins) in ratings.items()
+    ])
+    db.commit()
+    return matches, len(ratings)
+
+
+# 서버 전체에서 공유하는 레이팅 캐시
+rating_cache = RatingCache()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Elo 레이팅 관리")
+    parser.add_argument("command", choices=["replay"], help="replay: match_results 로 ratings 다시 계산")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    from backend.database import SessionLocal, init_db
+
+    init_db()
+    with SessionLocal() as db:
+        matches, users = replay_ratings(db, args.chunk_size)
+    print(f"replayed {matches} match result(s), {users} rating(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
 # backend/router_compete.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
-from backend.database import get_db
+from backend.database import get_async_db
 from backend.models import Score
+from backend.leaderboard import leaderboard
+from backend.rankings import record_user_best
+from backend.ingest import SCORE, WRITE_BEHIND, IngestQueueFull, score_ingestor
+from backend.idempotency import idempotency, scoped_key
 
 router = APIRouter()
 
@@ -17,10 +22,40 @@ class SubmitScoreRequest(BaseModel):
 
 
 @router.post("/submit")
-def submit_score(req: SubmitScoreRequest, db: Session = Depends(get_db)):
+async def submit_score(
+    req: SubmitScoreRequest,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+):
+    # 같은 Idempotency-Key 로 재시도하면 (CompeteMode 재전송 등) 저장 없이 처음 응답 반환
+    key = scoped_key("compete.submit", idempotency_key)
+    replay = await idempotency.lookup(db, key)
+    if replay is not None:
+        return replay
 
     today = datetime.utcnow().strftime("%Y-%m-%d")
 
+    # write-behind 모드: journal 에 적재되면 바로 응답 (DB 에는 배치로 저장)
+    if WRITE_BEHIND:
+        response = {
+            "message": "점수 저장 대기 중",
+            "score": req.confidence,
+            "date": today,
+        }
+        record = {
+            "user_id": req.user_id,
+            "date": today,
+            "score": req.confidence,
+            "image_path": None,
+            "created_at": datetime.utcnow(),
+        }
+        try:
+            await run_in_threadpool(score_ingestor.submit, SCORE, [idempotency.with_record(record, key, response)])
+        except IngestQueueFull:
+            raise HTTPException(status_code=503, detail="점수 저장 요청이 밀려 있습니다.")
+        idempotency.offer(key, response)
+        return response
+
     new_score = Score(
         user_id=req.user_id,
         date=today,         # ★ 반드시 추가
@@ -29,11 +64,22 @@ def submit_score(req: SubmitScoreRequest, db: Session = Depends(get_db)):
     )
 
     db.add(new_score)
-    db.commit()
-    db.refresh(new_score)
+    await db.flush()  # id 확보 후 같은 트랜잭션에서 유저별 최고 점수 갱신
+    await db.refresh(new_score)
+    await db.run_sync(record_user_best, new_score)
 
-    return {
+    response = {
         "message": "점수 저장 완료",
         "score": new_score.score,
         "date": new_score.date,
     }
+    idempotency.record(db, key, response)
+    replay = await idempotency.commit_or_replay(db, key)
+    if replay is not None:
+        return replay
+    idempotency.offer(key, response)
+
+    # 메모리 리더보드 갱신 (상위권이면 /ranking/top10 에 바로 반영)
+    leaderboard.offer(new_score)
+
+    return response
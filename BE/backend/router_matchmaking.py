@@ -1,28 +1,40 @@
 # backend/router_matchmaking.py
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Dict
-from uuid import uuid4
+from typing import List
 from datetime import datetime
 import asyncio
+import json
+import logging
+import os
 
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from backend.database import get_db
+from backend.database import get_async_db
 from backend.models import MatchResult
+from backend.ratings import rating_cache, record_match_rating
+from backend.match_queue import WAITER_TTL_SECONDS, Match
+from backend.match_events import match_events
+from backend.match_backends import matchmaking
+from backend.ingest import MATCH_RESULT, WRITE_BEHIND, IngestQueueFull, score_ingestor
+from backend.idempotency import idempotency, scoped_key
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# sweeper 주기 (창이 넓어진 대기자끼리 매칭 + stale 대기자 / 버려진 매치 / 안 읽힌 mailbox 정리)
+SWEEP_INTERVAL_SECONDS = float(os.getenv("KCU_MATCH_SWEEP_SECONDS", "2"))
+# WebSocket 연결이 열려 있는 동안 이 주기로 하트비트 갱신
+WS_HEARTBEAT_SECONDS = min(10.0, WAITER_TTL_SECONDS / 3)
 
 # -----------------------
 #  매칭 관련 데이터 구조
 # -----------------------
 
-class Match(BaseModel):
-    match_id: str
-    players: List[str]
-    created_at: datetime
-
 class JoinRequest(BaseModel):
     user_id: str  # 매칭을 신청하는 유저 ID
 
@@ -40,6 +52,23 @@ class MatchStatusResponse(BaseModel):
 class QueueStatus(BaseModel):
     waiting_users: List[str]
 
+class LeaveResponse(BaseModel):
+    left: bool
+    message: str
+
+# 대결 중 점수 중계용
+class MatchScoreRequest(BaseModel):
+    match_id: str
+    user_id: str
+    score: float
+
+class MatchEventsResponse(BaseModel):
+    events: List[dict]
+
+class RatingResponse(BaseModel):
+    user_id: str
+    rating: float
+
 # 매치 결과 저장용
 class MatchResultRequest(BaseModel):
     match_id: str
@@ -47,19 +76,116 @@ class MatchResultRequest(BaseModel):
     loser_id: str
 
 class MatchResultResponse(BaseModel):
-    id: int
+    id: int | None = None  # write-behind 모드에서는 DB flush 전이라 None
     match_id: str
     winner_id: str
     loser_id: str
     created_at: datetime
 
 
-# 전역 상태 (메모리 기반 매칭 큐 + 진행 중 매치)
-waiting_queue: List[str] = []          # 아직 짝이 안 잡힌 유저들
-active_matches: Dict[str, Match] = {}  # match_id -> Match
+# 대기열 / 진행 중 매치는 backend.match_backends.matchmaking 에 있음
+# (KCU_MATCH_BACKEND=memory: 프로세스 안, sqlite: 여러 워커가 공유. 둘 다 pairing 은 원자적)
+# 매칭 성사 / 상대 점수 / 결과는 matchmaking.publish → 각 워커의 match_events mailbox 로 push
+
+
+def opponent_of(match: Match, user_id: str) -> str | None:
+    return next((p for p in match.players if p != user_id), None)
+
+
+async def join_queue(user_id: str) -> JoinResponse:
+    """
+    /match/join 과 /match/ws 가 같이 쓰는 참가 처리 (새 매치면 기다리던 상대에게 push).
+    이미 받은 매치가 결과 없이 남아 있는 상태에서 다시 join 하면 그 매치는 끝나고 상대에게 match_expired
+    """
+    match_events.open(user_id)
+    match, created, ended = await matchmaking.join(user_id)
+    if ended is not None:
+        await matchmaking.publish(opponent_of(ended, user_id), {
+            "type": "match_expired",
+            "match_id": ended.match_id,
+            "reason": "opponent_rejoined",
+        })
+
+    if match is None:
+        return JoinResponse(
+            status="waiting",
+            match_id=None,
+            opponent_id=None,
+            message="상대를 기다리는 중입니다."
+        )
+
+    opponent_id = opponent_of(match, user_id)
+    if created:
+        await publish_matched(match, skip=user_id)
+    return JoinResponse(
+        status="matched",
+        match_id=match.match_id,
+        opponent_id=opponent_id,
+        message="매칭이 성사되었습니다." if created else "이미 매칭된 상대가 있습니다."
+    )
+
+
+async def publish_matched(match: Match, skip: str | None = None) -> None:
+    """매칭 성사를 참가자에게 push (join 응답으로 이미 아는 사람은 skip)"""
+    for user_id in match.players:
+        if user_id != skip:
+            await matchmaking.publish(user_id, {
+                "type": "matched",
+                "match_id": match.match_id,
+                "opponent_id": opponent_of(match, user_id),
+            })
 
-# 동시성 제어용 Lock (여러 요청이 동시에 들어올 때를 대비)
-queue_lock = asyncio.Lock()
+
+async def mark_delivered(user_id: str, events: List[dict]) -> None:
+    """matched 이벤트를 받은 유저는 이후 join 을 새 게임 참가로 처리"""
+    for event in events:
+        if event.get("type") == "matched":
+            await matchmaking.mark_seen(user_id, event["match_id"])
+
+
+async def relay_score(req: MatchScoreRequest) -> bool:
+    """대결 중 내 점수를 상대에게 push"""
+    match = await matchmaking.get(req.match_id)
+    if not match:
+        raise HTTPException(status_code=404, detail="유효하지 않은 match_id 입니다.")
+    if req.user_id not in match.players:
+        raise HTTPException(status_code=400, detail="user_id 가 매치 참가자가 아닙니다.")
+    return await matchmaking.publish(opponent_of(match, req.user_id), {
+        "type": "opponent_score",
+        "match_id": req.match_id,
+        "user_id": req.user_id,
+        "score": req.score,
+    })
+
+
+async def publish_result(match: Match, winner_id: str, loser_id: str) -> None:
+    for user_id in match.players:
+        await matchmaking.publish(user_id, {
+            "type": "result",
+            "match_id": match.match_id,
+            "winner_id": winner_id,
+            "loser_id": loser_id,
+        })
+
+
+async def run_sweeper(interval: float = SWEEP_INTERVAL_SECONDS) -> None:
+    """lifespan 에서 asyncio task 로 띄우는 주기 sweep 루프"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            for match in await matchmaking.pair_waiting():
+                await publish_matched(match)
+            stale, expired = await matchmaking.sweep()
+            for user_id in stale:
+                await matchmaking.publish(user_id, {"type": "queue_expired"})
+            for match in expired:
+                for user_id in match.players:
+                    await matchmaking.publish(user_id, {"type": "match_expired", "match_id": match.match_id})
+            match_events.sweep()
+            if stale or expired:
+                logger.info("match sweep: %d waiter(s), %d match(es) expired", len(stale), len(expired))
+        except Exception:
+            logger.exception("match sweep failed")
 
 
 # -----------------------
@@ -72,55 +198,146 @@ async def join_match(req: JoinRequest):
     실시간 매칭 큐에 참가하는 엔드포인트.
     - 대기 중인 유저가 없으면: 큐에 넣고 'waiting' 상태 반환
     - 이미 누군가 대기 중이면: 둘이 매칭시켜서 'matched' 상태 반환
+    - 대기 중에 다시 호출하면 하트비트 역할, 그 사이 매칭됐으면 'matched' 반환
+    - 이미 받은 매치가 있는데 다시 호출하면 (결과 저장 전이라도) 그 매치는 끝내고 새로 참가
     """
-    user_id = req.user_id
+    return await join_queue(req.user_id)
 
-    async with queue_lock:
-        # 이미 이 유저가 큐에 있는지 체크 (중복 방지)
-        if user_id in waiting_queue:
-            return JoinResponse(
-                status="waiting",
-                match_id=None,
-                opponent_id=None,
-                message="이미 매칭 대기 중입니다."
-            )
 
-        # 대기 중인 유저가 없으면 -> 큐에 넣고 대기 상태
-        if not waiting_queue:
-            waiting_queue.append(user_id)
-            return JoinResponse(
-                status="waiting",
-                match_id=None,
-                opponent_id=None,
-                message="상대를 기다리는 중입니다."
-            )
+@router.post("/leave", response_model=LeaveResponse)
+async def leave_match(req: JoinRequest):
+    """매칭 대기 취소 (창을 닫거나 취소 버튼을 누를 때)"""
+    if await matchmaking.leave(req.user_id):
+        match_events.close(req.user_id)
+        return LeaveResponse(left=True, message="매칭 대기를 취소했습니다.")
+    return LeaveResponse(left=False, message="매칭 대기 중이 아닙니다.")
 
-        # 이미 누군가 대기 중이면 -> 둘이 매칭
-        opponent_id = waiting_queue.pop(0)
 
-        match_id = str(uuid4())
-        match = Match(
-            match_id=match_id,
-            players=[opponent_id, user_id],
-            created_at=datetime.utcnow(),
-        )
-        active_matches[match_id] = match
+@router.post("/heartbeat")
+async def heartbeat(req: JoinRequest):
+    """
+    대기 중임을 알리는 하트비트.
+    KCU_MATCH_WAITER_TTL_SECONDS 동안 join / heartbeat 가 없으면 대기열에서 빠짐.
+    """
+    return {"alive": await matchmaking.heartbeat(req.user_id)}
 
-        return JoinResponse(
-            status="matched",
-            match_id=match_id,
-            opponent_id=opponent_id,
-            message="매칭이 성사되었습니다."
-        )
+
+@router.get("/events/{user_id}", response_model=MatchEventsResponse)
+async def wait_match_events(
+    user_id: str,
+    timeout: float = Query(25.0, ge=0, le=60, description="이벤트가 없을 때 최대 대기 시간(초)"),
+):
+    """
+    WebSocket 을 못 쓰는 클라이언트용 long-poll.
+    /match/join 후 이 API 를 반복 호출하면 matched / opponent_score / result 이벤트가
+    생기는 즉시 응답 (없으면 timeout 후 빈 리스트). 호출 자체가 대기 하트비트 역할도 함.
+    """
+    await matchmaking.heartbeat(user_id)
+    events = await match_events.wait(user_id, timeout)
+    await mark_delivered(user_id, events)
+    return MatchEventsResponse(events=events)
+
+
+@router.post("/score")
+async def send_match_score(req: MatchScoreRequest):
+    """대결 중 내 점수를 상대에게 실시간으로 전달 (DB 저장은 /score/save, /match/result)"""
+    return {"delivered": await relay_score(req)}
+
+
+@router.websocket("/ws")
+async def match_ws(websocket: WebSocket, user_id: str):
+    """
+    매칭 WebSocket (/match/ws?user_id=...).
+    연결하면 바로 큐에 참가하고, 이후 이벤트는 서버가 push:
+      {"type": "status", ...JoinResponse}, {"type": "matched"}, {"type": "opponent_score"},
+      {"type": "result"}, {"type": "queue_expired"}, {"type": "match_expired"}
+    클라이언트 메시지: {"type": "join"} / {"type": "leave"} / {"type": "ping"} /
+      {"type": "score", "match_id": ..., "score": ...}
+    연결이 열려 있는 동안은 하트비트가 자동으로 갱신되고, 대기 중에 끊기면 큐에서 빠짐.
+    """
+    await websocket.accept()
+    await websocket.send_json({"type": "status", **(await join_queue(user_id)).model_dump()})
+
+    receive = asyncio.ensure_future(websocket.receive())
+    try:
+        while True:
+            await matchmaking.heartbeat(user_id)
+            events = asyncio.ensure_future(match_events.wait(user_id, WS_HEARTBEAT_SECONDS))
+            done, _ = await asyncio.wait({receive, events}, return_when=asyncio.FIRST_COMPLETED)
+
+            if events in done:
+                for event in events.result():
+                    await websocket.send_json(event)
+                await mark_delivered(user_id, events.result())
+            else:
+                events.cancel()
+
+            if receive in done:
+                frame = receive.result()
+                if frame["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(frame.get("code", 1000))
+                receive = asyncio.ensure_future(websocket.receive())
+                message = parse_ws_frame(frame)
+                if message is None:
+                    # 바이너리 / 깨진 프레임 하나 때문에 연결을 끊지 않고 에러만 알려줌
+                    await websocket.send_json({"type": "error", "detail": "JSON 텍스트 메시지가 아닙니다."})
+                    continue
+                await handle_ws_message(websocket, user_id, message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receive.cancel()
+        # 대기 중에 탭을 닫은 경우 (매칭된 뒤라면 매치는 TTL 까지 유지)
+        if await matchmaking.leave(user_id):
+            match_events.close(user_id)
+
+
+def parse_ws_frame(frame: dict):
+    """websocket.receive 메시지 -> JSON 값 (텍스트 프레임이 아니거나 JSON 이 아니면 None)"""
+    text = frame.get("text")
+    if text is None:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+async def handle_ws_message(websocket: WebSocket, user_id: str, message: dict) -> None:
+    kind = message.get("type") if isinstance(message, dict) else None
+    if kind == "join":
+        await websocket.send_json({"type": "status", **(await join_queue(user_id)).model_dump()})
+    elif kind == "leave":
+        left = await matchmaking.leave(user_id)
+        await websocket.send_json({"type": "left", "left": left})
+    elif kind == "score":
+        try:
+            await relay_score(MatchScoreRequest(
+                match_id=str(message.get("match_id")),
+                user_id=user_id,
+                score=float(message.get("score")),
+            ))
+        except (HTTPException, TypeError, ValueError) as e:
+            await websocket.send_json({"type": "error", "detail": getattr(e, "detail", str(e))})
+    elif kind == "ping":
+        await websocket.send_json({"type": "pong"})
+    else:
+        await websocket.send_json({"type": "error", "detail": "알 수 없는 메시지입니다."})
+
+
+@router.get("/rating/{user_id}", response_model=RatingResponse)
+async def get_rating(user_id: str):
+    """매칭에 쓰는 현재 Elo 레이팅 (경기 기록이 없으면 기본값)"""
+    return RatingResponse(user_id=user_id, rating=rating_cache.get(user_id))
 
 
 @router.get("/status/{match_id}", response_model=MatchStatusResponse)
 async def get_match_status(match_id: str):
     """
     현재 매치 상태를 조회하는 엔드포인트.
-    - active_matches 에 있는 매치만 조회 (아직 결과 저장 전 상태라고 가정)
+    - 진행 중 매치만 조회 (결과 저장 전 + TTL 이 안 지난 매치)
     """
-    match = active_matches.get(match_id)
+    match = await matchmaking.get(match_id)
     if not match:
         raise HTTPException(status_code=404, detail="해당 match_id의 매치를 찾을 수 없습니다.")
 
@@ -137,7 +354,21 @@ async def get_queue_status():
     현재 매칭 대기 중인 유저 리스트를 반환 (디버깅/관리용).
     운영에서는 제거해도 되는 API.
     """
-    return QueueStatus(waiting_users=list(waiting_queue))
+    return QueueStatus(waiting_users=await matchmaking.waiting_users())
+
+
+def find_match_result(db: Session, match_id: str) -> MatchResult | None:
+    return db.query(MatchResult).filter(MatchResult.match_id == match_id).first()
+
+
+def to_result_response(result: MatchResult) -> MatchResultResponse:
+    return MatchResultResponse(
+        id=result.id,
+        match_id=result.match_id,
+        winner_id=result.winner_id,
+        loser_id=result.loser_id,
+        created_at=result.created_at,
+    )
 
 
 # -----------------------
@@ -147,42 +378,81 @@ async def get_queue_status():
 @router.post("/result", response_model=MatchResultResponse)
 async def save_match_result(
     req: MatchResultRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
 ):
     """
     게임이 끝난 후, 매치 결과를 DB에 저장하는 엔드포인트.
     - match_id: 매칭 당시 부여받은 UUID
     - winner_id: 이긴 사람 user_id
     - loser_id: 진 사람 user_id
+    - Idempotency-Key 헤더 (선택). 헤더가 없어도 같은 match_id 로 다시 보내면 저장된 결과를 반환
     """
-    # (선택) active_matches 에 존재하는 match_id 인지 확인
-    match = active_matches.get(req.match_id)
+    key = scoped_key("match.result", idempotency_key)
+    replay = await idempotency.lookup(db, key)
+    if replay is not None:
+        return replay
+
+    # 진행 중인 매치인지 확인 (결과 저장 후 / 만료된 매치는 이미 지워져 있음)
+    match = await matchmaking.get(req.match_id)
     if not match:
-        # 이미 지워졌거나 잘못된 match_id 일 수 있음 -> 여기서는 그냥 경고만
-        # 필요하면 404로 막아도 됨
+        # 같은 매치 결과를 다시 보낸 경우 (헤더 없는 재시도) 저장된 결과를 그대로 반환
+        existing = await db.run_sync(find_match_result, req.match_id)
+        if existing is not None:
+            return to_result_response(existing)
         raise HTTPException(status_code=404, detail="유효하지 않은 match_id 입니다.")
 
     # winner_id / loser_id 가 실제 매치에 참여한 유저인지 체크
     if req.winner_id not in match.players or req.loser_id not in match.players:
         raise HTTPException(status_code=400, detail="winner_id / loser_id 가 매치 참가자가 아닙니다.")
 
-    # DB에 결과 저장
+    # write-behind 모드: journal 에 적재되면 바로 응답 (fsync 는 스레드풀에서)
+    if WRITE_BEHIND:
+        record = {
+            "match_id": req.match_id,
+            "winner_id": req.winner_id,
+            "loser_id": req.loser_id,
+            "created_at": datetime.utcnow(),
+        }
+        response = MatchResultResponse(**record)
+        try:
+            await run_in_threadpool(
+                score_ingestor.submit, MATCH_RESULT, [idempotency.with_record(record, key, response)]
+            )
+        except IngestQueueFull:
+            raise HTTPException(status_code=503, detail="결과 저장 요청이 밀려 있습니다.")
+        idempotency.offer(key, response)
+        await matchmaking.finish(req.match_id)
+        await publish_result(match, req.winner_id, req.loser_id)
+        return response
+
+    # DB에 결과 저장 (match_id 는 unique 라서 동시에 같은 결과가 들어오면 하나만 저장됨)
     result = MatchResult(
         match_id=req.match_id,
         winner_id=req.winner_id,
         loser_id=req.loser_id,
     )
-    db.add(result)
-    db.commit()
-    db.refresh(result)
-
-    # 매치가 끝났으니 active_matches 에서 제거 (선택)
-    del active_matches[req.match_id]
-
-    return MatchResultResponse(
-        id=result.id,
-        match_id=result.match_id,
-        winner_id=result.winner_id,
-        loser_id=result.loser_id,
-        created_at=result.created_at,
-    )
+    try:
+        db.add(result)
+        await db.flush()
+        await db.refresh(result)
+        ratings = await db.run_sync(record_match_rating, result)  # 같은 트랜잭션에서 Elo 갱신
+        response = to_result_response(result)
+        idempotency.record(db, key, response)
+        replay = await idempotency.commit_or_replay(db, key)
+    except IntegrityError:
+        await db.rollback()
+        existing = await db.run_sync(find_match_result, req.match_id)
+        if existing is None:
+            raise
+        return to_result_response(existing)
+    if replay is not None:
+        return replay
+    idempotency.offer(key, response)
+    rating_cache.offer(ratings)
+
+    # 매치가 끝났으니 진행 중 매치에서 제거 + 두 사람에게 결과 push
+    await matchmaking.finish(req.match_id)
+    await publish_result(match, req.winner_id, req.loser_id)
+
+    return response
@@ -1,12 +1,14 @@
 # backend/router_ranking.py
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from typing import List
-from sqlalchemy.orm import Session
+from datetime import date as date_type, datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.database import get_db
-from backend.models import Score
+from backend.database import get_async_db
+from backend.leaderboard import leaderboard
+from backend import rankings
 
 # ✅ Swagger에도 보이도록
 router = APIRouter(include_in_schema=True)
@@ -29,18 +31,16 @@ class RankItem(BaseModel):
 #  상위 10위 랭킹 API
 # -----------------------
 @router.get("/top10", response_model=List[RankItem])
-def get_top10_ranking(db: Session = Depends(get_db)):
+async def get_top10_ranking(db: AsyncSession = Depends(get_async_db)):
     """
     전체 Score 테이블에서 점수 기준 상위 10명 가져오기.
     - 점수 내림차순
     - 점수가 같으면 더 먼저 기록된 것(created_at)이 위에 오도록 정렬
+    - 메모리 리더보드에서 바로 읽음 (DB 는 첫 조회 / 주기적 refresh 때만)
     """
-    scores = (
-        db.query(Score)
-        .order_by(Score.score.desc(), Score.created_at.asc())
-        .limit(10)
-        .all()
-    )
+    if leaderboard.needs_seed():
+        await db.run_sync(leaderboard.seed)
+    scores = leaderboard.top(10)
 
     ranking: list[RankItem] = []
     for idx, s in enumerate(scores, start=1):
@@ -49,10 +49,119 @@ def get_top10_ranking(db: Session = Depends(get_db)):
                 rank=idx,
                 user_id=s.user_id,
                 score=s.score,
-                # date 컬럼이 datetime 이면 문자열로 변환
-                date=str(s.date) if getattr(s, "date", None) else None,
+                date=s.date,
             )
         )
 
     # ✅ 데이터가 없어도 [] 반환 (404 X)
     return ranking
+
+
+
+# -----------------------
+#  기간별 / 유저별 랭킹 (cursor 페이지네이션)
+# -----------------------
+class RankPage(BaseModel):
+    items: List[RankItem]
+    next_cursor: str | None = None  # 다음 페이지 요청 시 ?cursor= 로 넘김 (없으면 마지막 페이지)
+
+
+class MyRankResponse(BaseModel):
+    user_id: str
+    rank: int | None = None     # 베스트 점수 기록이 없으면 None
+    score: float | None = None
+    above: List[RankItem] = []  # 내 바로 위 순위들
+    below: List[RankItem] = []  # 내 바로 아래 순위들
+
+
+def to_rank_items(ranked) -> List[RankItem]:
+    return [
+        RankItem(rank=rank, user_id=row.user_id, score=row.score, date=row.date)
+        for rank, row in ranked
+    ]
+
+
+def parse_day(value: str | None) -> date_type:
+    if value is None:
+        return datetime.now().date()
+    try:
+        return date_type.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date 는 YYYY-MM-DD 형식이어야 합니다.")
+
+
+async def ranking_page(db: AsyncSession, fetch, *args) -> RankPage:
+    """
+    rankings 모듈의 (동기) 쿼리 함수를 async 세션에서 실행.
+    run_sync 는 DB I/O 를 await 하면서 돌리기 때문에 이벤트 루프를 막지 않음.
+    """
+    try:
+        ranked, next_cursor = await db.run_sync(fetch, *args)
+    except rankings.InvalidCursor:
+        raise HTTPException(status_code=400, detail="잘못된 cursor 입니다.")
+    return RankPage(items=to_rank_items(ranked), next_cursor=next_cursor)
+
+
+@router.get("/daily", response_model=RankPage)
+async def get_daily_ranking(
+    date: str | None = Query(None, description="YYYY-MM-DD (없으면 오늘)"),
+    limit: int = Query(10, ge=1, le=rankings.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """특정 날짜(Score.date)의 점수 랭킹"""
+    day = parse_day(date).isoformat()
+    return await ranking_page(db, rankings.daily, day, limit, cursor)
+
+
+@router.get("/weekly", response_model=RankPage)
+async def get_weekly_ranking(
+    date: str | None = Query(None, description="이 날짜가 속한 주 (월~일), 없으면 이번 주"),
+    limit: int = Query(10, ge=1, le=rankings.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """주간 (월~일) 점수 랭킹"""
+    day = parse_day(date)
+    return await ranking_page(db, rankings.weekly, day, limit, cursor)
+
+
+@router.get("/all", response_model=RankPage)
+async def get_all_time_ranking(
+    limit: int = Query(10, ge=1, le=rankings.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """전체 기간 점수 랭킹 (top10 이후 순위까지 페이지로 조회)"""
+    return await ranking_page(db, rankings.all_time, limit, cursor)
+
+
+@router.get("/best", response_model=RankPage)
+async def get_best_per_user_ranking(
+    limit: int = Query(10, ge=1, le=rankings.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """유저별 최고 점수 랭킹 (한 유저가 여러 자리를 차지하지 않음)"""
+    return await ranking_page(db, rankings.best_per_user, limit, cursor)
+
+
+@router.get("/me/{user_id}", response_model=MyRankResponse)
+async def get_my_rank(
+    user_id: str,
+    window: int = Query(2, ge=0, le=20, description="위/아래로 몇 명씩 같이 보여줄지"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """유저별 최고 점수 기준 내 순위 + 주변 순위"""
+    mine, above, below = await db.run_sync(rankings.my_rank, user_id, window)
+    if mine is None:
+        return MyRankResponse(user_id=user_id)
+
+    rank, me = mine
+    return MyRankResponse(
+        user_id=user_id,
+        rank=rank,
+        score=me.score,
+        above=to_rank_items(above),
+        below=to_rank_items(below),
+    )
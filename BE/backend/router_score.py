@@ -1,12 +1,18 @@
 # backend/router_score.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
-from backend.database import get_db
+from backend.database import get_async_db
 from backend.models import Score
+from backend.leaderboard import leaderboard
+from backend.rankings import record_user_best
+from backend.ingest import SCORE, WRITE_BEHIND, IngestQueueFull, score_ingestor, write_records
+from backend.idempotency import idempotency, scoped_key
 
 router = APIRouter()
 
@@ -20,19 +26,63 @@ class SaveScoreRequest(BaseModel):
     image_path: str | None = None
 
 class SaveScoreResponse(BaseModel):
-    id: int
+    id: int | None = None  # write-behind 모드에서는 DB flush 전이라 None
     user_id: str
     score: float
     date: str
     created_at: datetime
+    queued: bool = False   # True 면 저장 대기열에 들어감 (곧 DB / 랭킹에 반영)
+
+# 한 번에 여러 라운드 점수 저장
+MAX_BATCH_SCORES = 100
+
+class SaveScoreBatchRequest(BaseModel):
+    scores: List[SaveScoreRequest]
+
+class SaveScoreBatchResponse(BaseModel):
+    saved: List[SaveScoreResponse]
+
+
+def to_score_record(req: SaveScoreRequest) -> dict:
+    """요청 -> Score 컬럼 dict (날짜가 없으면 오늘, created_at 은 접수 시각)"""
+    return {
+        "user_id": req.user_id,
+        "score": req.score,
+        "date": req.date or datetime.now().strftime("%Y-%m-%d"),
+        "image_path": req.image_path,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def queued_response(record: dict) -> SaveScoreResponse:
+    return SaveScoreResponse(
+        user_id=record["user_id"],
+        score=record["score"],
+        date=record["date"],
+        created_at=record["created_at"],
+        queued=True,
+    )
+
+
+async def queue_scores(records: list[dict]) -> None:
+    try:
+        # journal fsync 는 블로킹이라 스레드풀에서
+        await run_in_threadpool(score_ingestor.submit, SCORE, records)
+    except IngestQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="점수 저장 요청이 밀려 있습니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": "1"},
+        )
 
 # -----------------------
 #  점수 저장 API
 # -----------------------
 @router.post("/save", response_model=SaveScoreResponse)
-def save_score(
+async def save_score(
     req: SaveScoreRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
 ):
     """
     게임 후 점수를 저장하는 엔드포인트
@@ -40,7 +90,21 @@ def save_score(
     - score: 획득한 점수
     - date: 점수 기록 날짜 (선택, 없으면 오늘)
     - image_path: 이미지 경로 (선택)
+    - Idempotency-Key 헤더 (선택): 같은 키로 재시도하면 저장 없이 처음 응답을 그대로 반환
     """
+    key = scoped_key("score.save", idempotency_key)
+    replay = await idempotency.lookup(db, key)
+    if replay is not None:
+        return replay
+
+    # write-behind 모드: journal 에 적재되면 바로 응답 (DB 에는 배치로 저장)
+    if WRITE_BEHIND:
+        record = to_score_record(req)
+        response = queued_response(record)
+        await queue_scores([idempotency.with_record(record, key, response)])
+        idempotency.offer(key, response)
+        return response
+
     # 날짜가 없으면 오늘 날짜 사용
     score_date = req.date or datetime.now().strftime("%Y-%m-%d")
     
@@ -53,13 +117,59 @@ def save_score(
     )
     
     db.add(new_score)
-    db.commit()
-    db.refresh(new_score)
-    
-    return SaveScoreResponse(
+    await db.flush()  # id 확보 후 같은 트랜잭션에서 유저별 최고 점수 갱신
+    await db.refresh(new_score)  # created_at (server default)
+    await db.run_sync(record_user_best, new_score)
+
+    response = SaveScoreResponse(
         id=new_score.id,
         user_id=new_score.user_id,
         score=new_score.score,
         date=new_score.date,
         created_at=new_score.created_at,
     )
+    idempotency.record(db, key, response)
+    replay = await idempotency.commit_or_replay(db, key)
+    if replay is not None:
+        return replay
+    idempotency.offer(key, response)
+
+    # 메모리 리더보드 갱신 (상위권이면 /ranking/top10 에 바로 반영)
+    leaderboard.offer(new_score)
+
+    return response
+
+
+
+# -----------------------
+#  점수 여러 개 한 번에 저장 API
+# -----------------------
+@router.post("/batch", response_model=SaveScoreBatchResponse)
+async def save_score_batch(
+    req: SaveScoreBatchRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    여러 라운드 점수를 한 번에 저장 (트랜잭션 / journal fsync 1번).
+    write-behind 모드면 적재만 하고 queued=True 로 응답.
+    """
+    if not 1 <= len(req.scores) <= MAX_BATCH_SCORES:
+        raise HTTPException(status_code=400, detail=f"scores 는 1~{MAX_BATCH_SCORES}개여야 합니다.")
+
+    records = [to_score_record(item) for item in req.scores]
+
+    if WRITE_BEHIND:
+        await queue_scores(records)
+        return SaveScoreBatchResponse(saved=[queued_response(r) for r in records])
+
+    scores, _ = await db.run_sync(write_records, [(SCORE, r) for r in records])
+    return SaveScoreBatchResponse(saved=[
+        SaveScoreResponse(
+            id=s.id,
+            user_id=s.user_id,
+            score=s.score,
+            date=s.date,
+            created_at=s.created_at,
+        )
+        for s in scores
+    ])
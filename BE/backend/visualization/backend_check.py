@@ -0,0 +1,103 @@
+# backend/visualization/backend_check.py
+"""
+CLIP 백엔드 export / 검증 커맨드.
+
+사용법 (BE 디렉토리에서):
+    # ONNX vision encoder 만들기
+    python -m backend.visualization.backend_check export [--out models/clip_vision.onnx]
+
+    # 로컬 이미지 폴더로 fp32 대비 top-1 일치율 / 확률 오차 확인
+    python -m backend.visualization.backend_check validate IMAGE_DIR --backend int8
+    python -m backend.visualization.backend_check validate IMAGE_DIR --backend onnx
+"""
+
+import argparse
+import os
+import sys
+
+from PIL import Image
+
+# 비교 기준은 fp32 CLIPModel 전체 (int8 / onnx 설정이면 clip_model 이 가중치 일부를 버림)
+os.environ["KCU_CLIP_BACKEND"] = "torch"
+
+from backend.visualization.clip_backends import (
+    BACKEND_NAMES,
+    DEFAULT_ONNX_PATH,
+    TorchBackend,
+    create_backend,
+    export_onnx,
+)
+from backend.visualization.clip_model import (
+    classify_batch,
+    model,
+    preprocess_image,
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def cmd_export(args) -> int:
+    path = export_onnx(model, args.out, opset=args.opset)
+    print(f"exported: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    return 0
+
+
+def cmd_validate(args) -> int:
+    paths = sorted(
+        os.path.join(args.image_dir, name)
+        for name in os.listdir(args.image_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not paths:
+        print(f"{args.image_dir} 에 이미지가 없습니다.")
+        return 2
+
+    reference = TorchBackend(model)
+    candidate = create_backend(args.backend, model, onnx_path=args.onnx_path)
+
+    agree = 0
+    max_drift = 0.0
+    for path in paths:
+        pixel_values = [preprocess_image(Image.open(path).convert("RGB"))]
+        expected = classify_batch(pixel_values, backend=reference)[0]
+        actual = classify_batch(pixel_values, backend=candidate)[0]
+
+        top1_ok = expected.index(max(expected)) == actual.index(max(actual))
+        drift = max(abs(a - b) for a, b in zip(expected, actual))
+        agree += top1_ok
+        max_drift = max(max_drift, drift)
+        print(f"{path}: top1 {'same' if top1_ok else 'DIFF'}, max |Δp| = {drift:.4f}")
+
+    agreement = agree / len(paths)
+    ok = agreement >= args.min_agreement and max_drift <= args.max_drift
+    print(
+        f"{'OK' if ok else 'FAIL'}: backend={args.backend} images={len(paths)} "
+        f"top1 agreement={agreement:.3f} (min {args.min_agreement}) "
+        f"max |Δp|={max_drift:.4f} (max {args.max_drift})"
+    )
+    return 0 if ok else 1
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.visualization.backend_check")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="vision encoder 를 ONNX 로 export")
+    p_export.add_argument("--out", default=DEFAULT_ONNX_PATH)
+    p_export.add_argument("--opset", type=int, default=17)
+    p_export.set_defaults(func=cmd_export)
+
+    p_validate = sub.add_parser("validate", help="fp32 대비 정확도 확인")
+    p_validate.add_argument("image_dir")
+    p_validate.add_argument("--backend", choices=BACKEND_NAMES, default="int8")
+    p_validate.add_argument("--onnx-path", default=DEFAULT_ONNX_PATH)
+    p_validate.add_argument("--min-agreement", type=float, default=0.98)
+    p_validate.add_argument("--max-drift", type=float, default=0.05)
+    p_validate.set_defaults(func=cmd_validate)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
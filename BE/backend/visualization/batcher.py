@@ -0,0 +1,114 @@
+# backend/visualization/batcher.py
+"""
+동시에 들어온 /visualize/visualize 요청들을 모아서 한 번의 CLIP 이미지 인코더 호출로
+처리하는 micro-batching 스케줄러.
+
+- max_batch_size 개가 모이거나, 첫 요청이 들어온 뒤 max_wait_ms 가 지나면 flush
+- 배치 실행은 이벤트 루프 밖(executor)에서 돌리고, 결과는 요청별 Future 로 돌려줌
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional
+
+from backend.metrics import Gauge, Histogram
+
+QUEUE_DEPTH = Gauge(
+    "kcu_inference_queue_depth",
+    "배치 스케줄러에서 대기 중인 이미지 수",
+)
+BATCH_SIZE = Histogram(
+    "kcu_inference_batch_size",
+    "한 번의 forward 로 처리한 이미지 수",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+BATCH_WAIT = Histogram(
+    "kcu_inference_batch_wait_seconds",
+    "요청이 큐에 들어간 뒤 배치 실행이 시작될 때까지 걸린 시간",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+class MicroBatcher:
+    """
+    run_batch(items) -> results 를 받아서 요청 단위 submit(item) 을 배치 단위 호출로 묶어줌.
+    run_batch 는 블로킹 함수이고 items 와 같은 길이/순서의 결과 리스트를 반환해야 함.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        executor: Optional[Executor] = None,
+    ):
+        self.run_batch = run_batch
+        self.executor = executor  # None 이면 루프 기본 executor 사용
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_started(self) -> None:
+        # 이벤트 루프 안에서 처음 호출될 때 큐 + 워커 태스크 생성
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """item 하나를 큐에 넣고, 배치 처리 결과가 나올 때까지 기다림"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        QUEUE_DEPTH.set(self._queue.qsize())
+        return await future
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # 이미 쌓여 있는 건 기다리지 않고 바로 가져옴
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        QUEUE_DEPTH.set(self._queue.qsize())
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+
+            # 클라이언트가 이미 끊은 요청은 빼고 실행
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                BATCH_WAIT.observe(started - enqueued)
+            BATCH_SIZE.observe(len(batch))
+
+            items = [item for item, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.run_batch, items)
+            except Exception as exc:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,146 @@
+# backend/visualization/clip_backends.py
+"""
+CLIP 이미지 인코더 실행 백엔드.
+
+추론 시에는 vision tower (vision_model + visual_projection) 만 쓰기 때문에
+그 부분만 골라서 아래 중 하나로 실행함 (KCU_CLIP_BACKEND 로 선택):
+- "torch": 기존 PyTorch fp32
+- "int8" : PyTorch dynamic int8 양자화 (nn.Linear)
+- "onnx" : export_onnx() 로 뽑은 ONNX vision encoder 를 onnxruntime 으로 실행
+("stub" 은 여기가 아니라 router_visualize 에서 clip_model 대신 stub_model 을 로드함)
+"""
+
+import os
+import threading
+
+import torch
+from torch import nn
+
+BACKEND_NAMES = ("torch", "int8", "onnx")
+
+# ONNX 파일 기본 위치 (BE/models/clip_vision.onnx)
+DEFAULT_ONNX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "models",
+    "clip_vision.onnx",
+)
+
+
+class VisionEncoder(nn.Module):
+    """CLIPModel.get_image_features 와 같은 계산만 하는 vision tower"""
+
+    def __init__(self, clip_model):
+        super().__init__()
+        self.vision_model = clip_model.vision_model
+        self.visual_projection = clip_model.visual_projection
+
+    def forward(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        pooled = self.vision_model(pixel_values=pixel_values).pooler_output
+        return self.visual_projection(pooled)
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, clip_model):
+        self.encoder = VisionEncoder(clip_model).eval()
+
+    def image_features(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return self.encoder(pixel_values)
+
+
+class QuantizedTorchBackend(TorchBackend):
+    name = "int8"
+
+    def __init__(self, clip_model, inplace: bool = False):
+        super().__init__(clip_model)
+        # Linear 레이어 가중치만 int8 로 (activation 은 실행 중에 동적으로 양자화)
+        # inplace=True 면 clip_model 의 vision tower 자체를 바꿔서 fp32 가중치를 따로 들고 있지 않음
+        # (False 면 복사본을 양자화 → fp32 원본과 비교할 때용)
+        self.encoder = torch.ao.quantization.quantize_dynamic(
+            self.encoder,
+            {nn.Linear},
+            dtype=torch.qint8,
+            inplace=inplace,
+        )
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, onnx_path: str = DEFAULT_ONNX_PATH, intra_op_threads: int = 0):
+        import onnxruntime  # noqa: F401  (선택 의존성, 없으면 여기서 바로 실패)
+
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(
+                f"{onnx_path} 가 없습니다. "
+                "python -m backend.visualization.backend_check export 로 먼저 만들어주세요."
+            )
+        self.onnx_path = onnx_path
+        self.intra_op_threads = intra_op_threads
+        # InferenceSession 은 만들 때 스레드 풀을 띄워서 fork 하면 안전하지 않음 →
+        # gunicorn pre-fork 마스터에서는 만들지 않고, 각 워커에서 처음 쓸 때 (warm-up) 생성
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        # KCU_TORCH_THREADS 가 없으면 prefork.init_worker 가 워커별로 나눈 torch 스레드 수를 따름
+        threads = self.intra_op_threads if self.intra_op_threads > 0 else torch.get_num_threads()
+        options.intra_op_num_threads = max(1, threads)
+        return ort.InferenceSession(
+            self.onnx_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+
+    def image_features(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        (image_embeds,) = self.session.run(
+            ["image_embeds"],
+            {"pixel_values": pixel_values.numpy()},
+        )
+        return torch.from_numpy(image_embeds)
+
+
+def create_backend(name: str, clip_model, onnx_path: str = DEFAULT_ONNX_PATH, intra_op_threads: int = 0,
+                   inplace: bool = False):
+    """설정값(name)에 맞는 백엔드 생성 (inplace: int8 양자화를 clip_model 에 바로 적용)"""
+    if name == "torch":
+        return TorchBackend(clip_model)
+    if name == "int8":
+        return QuantizedTorchBackend(clip_model, inplace=inplace)
+    if name == "onnx":
+        return OnnxBackend(onnx_path, intra_op_threads=intra_op_threads)
+    raise ValueError(f"알 수 없는 CLIP 백엔드: {name} (가능한 값: {', '.join(BACKEND_NAMES)})")
+
+
+def export_onnx(clip_model, onnx_path: str = DEFAULT_ONNX_PATH, opset: int = 17) -> str:
+    """vision tower 만 ONNX 로 export (batch 차원은 동적)"""
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+
+    encoder = VisionEncoder(clip_model).eval()
+    size = clip_model.config.vision_config.image_size
+    dummy = torch.zeros(1, 3, size, size)
+
+    with torch.no_grad():
+        torch.onnx.export(
+            encoder,
+            (dummy,),
+            onnx_path,
+            input_names=["pixel_values"],
+            output_names=["image_embeds"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+            opset_version=opset,
+        )
+    return onnx_path
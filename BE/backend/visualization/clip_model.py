@@ -0,0 +1,157 @@
+# backend/visualization/clip_model.py
+"""
+CLIP 모델 / 프로세서 / 텍스트 임베딩 / 이미지 인코더 백엔드.
+
+torch, transformers 를 import 하고 모델을 로드하는 무거운 모듈이라
+서버 import 시점에는 불러오지 않고, model_loader 가 백그라운드에서 import 함.
+(parity / backend_check 같은 커맨드는 그냥 직접 import 해서 써도 됨)
+"""
+
+import gc
+import os
+import threading
+
+import numpy as np
+import torch
+from PIL import Image
+from transformers import CLIPModel, CLIPProcessor, CLIPVisionModel
+
+from backend.visualization.clip_backends import DEFAULT_ONNX_PATH, create_backend
+from backend.visualization.labels import PROMPTS
+
+# torch intra-op 스레드 수 (워커 프로세스/추론 스레드 수에 맞춰 조절)
+# pre-fork 모드에서는 마스터가 1 스레드로 로드하고, 워커에서 warmup() 할 때 적용됨
+TORCH_THREADS = int(os.getenv("KCU_TORCH_THREADS", "0"))
+
+# 이미지 인코더 실행 백엔드: torch (fp32) / int8 (dynamic 양자화) / onnx (onnxruntime)
+CLIP_BACKEND = os.getenv("KCU_CLIP_BACKEND", "torch")
+CLIP_ONNX_PATH = os.getenv("KCU_CLIP_ONNX_PATH", DEFAULT_ONNX_PATH)
+
+MODEL_NAME = "openai/clip-vit-base-patch32"
+
+# CLIP 모델은 이 모듈이 import 될 때 1번만 로드
+model = CLIPModel.from_pretrained(MODEL_NAME)
+processor = CLIPProcessor.from_pretrained(MODEL_NAME)
+model.eval()
+
+# int8 은 vision tower 를 제자리에서 양자화 (fp32 복사본을 따로 들고 있지 않음)
+clip_backend = create_backend(
+    CLIP_BACKEND,
+    model,
+    onnx_path=CLIP_ONNX_PATH,
+    intra_op_threads=TORCH_THREADS,
+    inplace=True,
+)
+
+
+def encode_text_features() -> torch.Tensor:
+    """
+    PROMPTS 를 한 번만 인코딩해서 L2 정규화된 텍스트 임베딩 행렬 (len(LABELS), dim) 반환.
+    LABELS 는 바뀌지 않으니 요청마다 텍스트 인코더를 돌릴 필요가 없음.
+    """
+    text_inputs = processor(text=PROMPTS, return_tensors="pt", padding=True)
+    with torch.no_grad():
+        text_features = model.get_text_features(**text_inputs)
+    return text_features / text_features.norm(p=2, dim=-1, keepdim=True)
+
+
+# 텍스트 임베딩 + logit scale 미리 계산
+TEXT_FEATURES = encode_text_features()
+LOGIT_SCALE = model.logit_scale.exp().item()
+
+
+def release_unused_weights() -> None:
+    """
+    int8 / onnx 백엔드는 워커당 메모리를 줄이는 게 목적이라, 텍스트 임베딩을 캐시한 뒤
+    더 이상 안 쓰는 가중치를 버림.
+    - 텍스트 타워: 위에서 TEXT_FEATURES 로 계산 끝
+    - onnx 의 fp32 vision tower: 추론은 onnxruntime 이 하니까 필요 없음
+      (heatmap 용 attention_map 은 처음 요청될 때 vision tower 만 따로 로드)
+    torch 백엔드는 parity / backend_check 가 전체 모델을 쓰니까 그대로 둠.
+    """
+    if CLIP_BACKEND == "torch":
+        return
+    model.text_model = None
+    model.text_projection = None
+    if CLIP_BACKEND == "onnx":
+        model.vision_model = None
+        model.visual_projection = None
+    gc.collect()
+
+
+release_unused_weights()
+
+# onnx 백엔드에서 attention_map 용으로 나중에 로드하는 vision tower
+_attention_vision_model = None
+_attention_lock = threading.Lock()
+
+
+def _vision_model():
+    global _attention_vision_model
+    if model.vision_model is not None:
+        return model.vision_model
+    with _attention_lock:
+        if _attention_vision_model is None:
+            _attention_vision_model = CLIPVisionModel.from_pretrained(MODEL_NAME).vision_model.eval()
+    return _attention_vision_model
+
+
+def preprocess_image(image: Image.Image) -> torch.Tensor:
+    """이미지 1장 -> CLIP 입력 텐서 (1, 3, 224, 224)"""
+    return processor(images=image, return_tensors="pt")["pixel_values"]
+
+
+def classify_batch(pixel_values: list[torch.Tensor], backend=None) -> list[list[float]]:
+    """
+    여러 이미지의 pixel_values 를 한 번에 forward -> 이미지별 LABELS 순서 확률 리스트.
+    CLIPModel.forward 와 같은 계산 (정규화된 임베딩 내적 * logit scale) 인데
+    이미지 인코더만 실행함. backend 를 안 주면 설정된 clip_backend 사용.
+    """
+    backend = backend or clip_backend
+    image_features = backend.image_features(torch.cat(pixel_values, dim=0))
+
+    image_features = image_features / image_features.norm(p=2, dim=-1, keepdim=True)
+    logits = LOGIT_SCALE * image_features @ TEXT_FEATURES.T
+
+    return logits.softmax(dim=1).tolist()
+
+
+def classify_image(image: Image.Image) -> list[float]:
+    """이미지 1장 -> LABELS 순서의 확률 리스트 (배치 없이 바로 실행)"""
+    return classify_batch([preprocess_image(image)])[0]
+
+
+def image_embedding(image: Image.Image) -> np.ndarray:
+    """이미지 1장의 L2 정규화된 CLIP 임베딩 (1, dim)"""
+    image_features = clip_backend.image_features(preprocess_image(image))
+    image_features = image_features / image_features.norm(p=2, dim=-1, keepdim=True)
+    return image_features.numpy()
+
+
+def text_embeddings() -> np.ndarray:
+    """LABELS 순서의 L2 정규화된 텍스트 임베딩 (len(LABELS), dim)"""
+    return TEXT_FEATURES.numpy()
+
+
+def attention_map(image: Image.Image) -> np.ndarray:
+    """
+    vision tower 마지막 레이어에서 CLS 토큰이 각 패치에 주는 attention (head 평균).
+    ViT-B/32 기준 (7, 7) 격자로 반환.
+    """
+    with torch.no_grad():
+        output = _vision_model()(
+            pixel_values=preprocess_image(image),
+            output_attentions=True,
+        )
+    attn = output.attentions[-1][0].mean(dim=0)[0, 1:]
+    grid = int(attn.numel() ** 0.5)
+    return attn.reshape(grid, grid).numpy()
+
+
+def warmup() -> None:
+    """첫 요청이 느리지 않도록 더미 이미지로 전처리 + forward 한 번 실행"""
+    if TORCH_THREADS > 0:
+        torch.set_num_threads(TORCH_THREADS)
+
+    size = model.config.vision_config.image_size
+    classify_image(Image.new("RGB", (size, size)))
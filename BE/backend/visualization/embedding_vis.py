@@ -1,10 +1,48 @@
+import hashlib
+
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.manifold import TSNE
+from matplotlib.figure import Figure
+
+# 2D 투영 방식
+# - "pca" : 라벨 텍스트 임베딩으로 PCA 기저를 한 번만 구하고, 이미지 임베딩은 행렬곱 한 번으로 투영
+#           (결정적이라 유저끼리 그림을 비교할 수 있음, 기본값)
+# - "tsne": 예전 방식. 요청마다 7개 점으로 t-SNE 를 새로 학습 (느림, 오프라인 분석용)
+PROJECTION_MODES = ("pca", "tsne")
+
+# 텍스트 임베딩 해시 -> (mean, components)
+_pca_cache: dict = {}
+
+
+def fit_projection(text_emb):
+    """
+    라벨 텍스트 임베딩 (n_labels, dim) 으로 2D PCA 기저 계산 (같은 입력이면 캐시 재사용).
+    반환: (mean (dim,), components (2, dim))
+    """
+    text_emb = np.asarray(text_emb, dtype=np.float32)
+    key = hashlib.sha1(text_emb.tobytes()).digest()
+    cached = _pca_cache.get(key)
+    if cached is not None:
+        return cached
+
+    mean = text_emb.mean(axis=0)
+    _, _, vt = np.linalg.svd(text_emb - mean, full_matrices=False)
+    components = vt[:2]
 
-def save_embedding_vis(image_emb, text_emb, labels, save_path):
+    # SVD 부호는 임의라서, 각 축에서 절댓값이 가장 큰 성분이 양수가 되도록 고정
+    signs = np.sign(components[np.arange(2), np.abs(components).argmax(axis=1)])
+    components = components * signs[:, None]
 
-    all_embeddings = np.vstack([image_emb, text_emb])
+    _pca_cache[key] = (mean, components)
+    return mean, components
+
+
+def project(emb, mean, components):
+    """임베딩 (n, dim) -> 2D 좌표 (n, 2)"""
+    return (np.asarray(emb, dtype=np.float32) - mean) @ components.T
+
+
+def _tsne(all_embeddings):
+    from sklearn.manifold import TSNE  # t-SNE 모드에서만 필요
 
     tsne = TSNE(
         n_components=2,
@@ -14,22 +52,36 @@ def save_embedding_vis(image_emb, text_emb, labels, save_path):
         init='random',
         random_state=42
     )
+    return tsne.fit_transform(all_embeddings)
+
+
+def save_embedding_vis(image_emb, text_emb, labels, save_path, mode="pca"):
 
-    reduced = tsne.fit_transform(all_embeddings)
+    if mode == "pca":
+        mean, components = fit_projection(text_emb)
+        img_pt = project(image_emb, mean, components)[0]
+        txt_pts = project(text_emb, mean, components)
+    elif mode == "tsne":
+        reduced = _tsne(np.vstack([image_emb, text_emb]))
+        img_pt = reduced[0]
+        txt_pts = reduced[1:]
+    else:
+        raise ValueError(f"알 수 없는 투영 방식: {mode} (가능한 값: {', '.join(PROJECTION_MODES)})")
 
-    img_pt = reduced[0]
-    txt_pts = reduced[1:]
+    # 라벨 글자 위치 오프셋은 좌표 범위에 맞춰서 (PCA 좌표는 t-SNE 보다 훨씬 작음)
+    offset = 0.02 * float(np.ptp(np.vstack([txt_pts, img_pt[None, :]]))) or 0.01
 
-    plt.figure(figsize=(7, 7))
-    plt.title("CLIP Embedding Visualization (t-SNE)", fontsize=14)
+    # pyplot 전역 상태를 안 쓰는 Figure 객체 사용 (렌더 스레드 여러 개에서 동시에 그려도 안전)
+    fig = Figure(figsize=(7, 7))
+    ax = fig.subplots()
+    ax.set_title(f"CLIP Embedding Visualization ({'PCA' if mode == 'pca' else 't-SNE'})", fontsize=14)
 
     for i, pt in enumerate(txt_pts):
-        plt.scatter(pt[0], pt[1], c="blue")
-        plt.text(pt[0] + 2, pt[1] + 2, labels[i], fontsize=10)
+        ax.scatter(pt[0], pt[1], c="blue")
+        ax.text(pt[0] + offset, pt[1] + offset, labels[i], fontsize=10)
 
-    plt.scatter(img_pt[0], img_pt[1], c="red")
-    plt.text(img_pt[0] + 2, img_pt[1] + 2, "IMAGE", fontsize=12, color="red")
+    ax.scatter(img_pt[0], img_pt[1], c="red")
+    ax.text(img_pt[0] + offset, img_pt[1] + offset, "IMAGE", fontsize=12, color="red")
 
-    plt.tight_layout()
-    plt.savefig(save_path)
-    plt.close()
+    fig.tight_layout()
+    fig.savefig(save_path)
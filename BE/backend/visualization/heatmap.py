@@ -4,7 +4,11 @@ import numpy as np
 from PIL import Image
 
 def save_heatmap(attn_map, img_path, out_path):
-    image = Image.open(img_path).convert("RGB")
+    # img_path 로 이미 디코딩된 PIL 이미지를 넘겨도 됨 (렌더 job 은 업로드를 메모리에서 바로 씀)
+    if isinstance(img_path, Image.Image):
+        image = img_path.convert("RGB")
+    else:
+        image = Image.open(img_path).convert("RGB")
 
     cam = attn_map
     cam = cv2.resize(cam, image.size)
@@ -0,0 +1,71 @@
+# backend/visualization/inference_pool.py
+"""
+CLIP 추론 / 이미지 디코딩 전용 스레드 풀.
+
+- 이벤트 루프에서는 블로킹 작업을 하지 않고 이 풀로 넘김
+  (그래야 /match/join, /ranking/top10, /auth/me 가 업로드 부하 중에도 안 멈춤)
+- 동시에 처리 중인 요청 수(max_pending)를 넘으면 InferenceQueueFull 을 던져서
+  라우터가 503 으로 바로 돌려보낼 수 있게 함 (backpressure)
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Callable
+
+from backend.metrics import Counter, Gauge
+
+IN_FLIGHT = Gauge(
+    "kcu_inference_in_flight",
+    "추론 풀에 들어와 있는 (대기 + 처리 중) 요청 수",
+)
+REJECTED = Counter(
+    "kcu_inference_rejected_total",
+    "추론 풀이 가득 차서 503 으로 거절한 요청 수",
+)
+
+
+class InferenceQueueFull(Exception):
+    """추론 풀에 더 이상 요청을 받을 자리가 없음"""
+
+
+class InferencePool:
+    def __init__(self, workers: int = 2, max_pending: int = 64):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="clip-inference",
+        )
+        # 이벤트 루프 스레드에서만 바뀌는 값이라 락 필요 없음
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        요청 1건이 끝날 때까지 자리 1개를 잡아둠.
+        자리가 없으면 기다리지 않고 바로 InferenceQueueFull.
+        """
+        if self._pending >= self.max_pending:
+            REJECTED.inc()
+            raise InferenceQueueFull()
+
+        self._pending += 1
+        IN_FLIGHT.set(self._pending)
+        try:
+            yield
+        finally:
+            self._pending -= 1
+            IN_FLIGHT.set(self._pending)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """블로킹 함수 fn(*args) 를 풀 스레드에서 실행하고 결과를 기다림"""
+        loop = asyncio.get_running_loop()
+        # 요청 context (느린 요청 로그의 단계 기록 등) 를 풀 스레드에서도 그대로 보이게
+        return await loop.run_in_executor(self.executor, partial(contextvars.copy_context().run, fn, *args))
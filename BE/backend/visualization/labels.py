@@ -0,0 +1,17 @@
+# backend/visualization/labels.py
+"""도형 라벨 / 한글 이름 / CLIP 프롬프트 (torch 없이 import 가능)"""
+
+LABELS = ["sphere", "cube", "cylinder", "cone", "pyramid", "torus"]
+
+# 영어 -> 한글 변환 매핑
+LABEL_KOR = {
+    "sphere": "원",
+    "cube": "사각형",
+    "cylinder": "원기둥",
+    "cone": "원뿔",
+    "pyramid": "삼각형",
+    "torus": "도넛"
+}
+
+# 분류에 쓰는 텍스트 프롬프트 (LABELS 순서 그대로)
+PROMPTS = [f"a photo of a {label}" for label in LABELS]
@@ -0,0 +1,80 @@
+# backend/visualization/model_loader.py
+"""
+CLIP 모델 지연 로딩 + 백그라운드 warm-up.
+
+서버 import / 시작 시점에는 torch, transformers 를 건드리지 않고,
+start() 를 부르면 별도 스레드에서 clip_model 모듈을 import (= 모델 로드) 한 뒤
+warm-up forward 까지 끝나면 ready 상태가 됨.
+그동안 auth / ranking / match 요청은 바로 처리되고, /readyz 는 503 을 반환.
+"""
+
+import importlib
+import logging
+import threading
+import time
+from types import ModuleType
+from typing import Optional
+
+from backend.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+MODEL_READY = Gauge("kcu_model_ready", "CLIP 모델 로드 + warm-up 완료 여부 (0/1)")
+MODEL_LOAD_SECONDS = Gauge("kcu_model_load_seconds", "CLIP 모델 로드 + warm-up 에 걸린 시간")
+
+
+class ModelNotReady(Exception):
+    """모델이 아직 로딩 중이거나 로딩에 실패함"""
+
+
+class ModelLoader:
+    def __init__(self, module_name: str = "backend.visualization.clip_model"):
+        self.module_name = module_name
+        self.state = "idle"  # idle -> loading -> ready / failed
+        self.error: Optional[str] = None
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self) -> None:
+        """아직 로딩을 시작하지 않았으면 백그라운드 스레드에서 로딩 시작"""
+        with self._lock:
+            if self.state in ("loading", "ready"):
+                return
+            self.state = "loading"
+            self.error = None
+
+        threading.Thread(target=self.load, name="clip-model-loader", daemon=True).start()
+
+    def load(self) -> None:
+        """모델 로드 + warm-up (블로킹)"""
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(self.module_name)
+            module.warmup()
+        except Exception as exc:
+            logger.exception("CLIP 모델 로딩 실패")
+            with self._lock:
+                self.state = "failed"
+                self.error = f"{type(exc).__name__}: {exc}"
+            return
+
+        with self._lock:
+            self._module = module
+            self.state = "ready"
+        MODEL_READY.set(1)
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - started)
+        logger.info("CLIP 모델 준비 완료 (%.1fs)", time.perf_counter() - started)
+
+    @property
+    def module(self) -> ModuleType:
+        """로드된 clip_model 모듈. 준비 안 됐으면 ModelNotReady"""
+        if self._module is None:
+            raise ModelNotReady(self.state)
+        return self._module
+
+    def status(self) -> dict:
+        return {"state": self.state, "error": self.error}
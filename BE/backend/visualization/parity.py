@@ -0,0 +1,55 @@
+# backend/visualization/parity.py
+"""
+텍스트 임베딩 캐시 경로(classify_image)가 기존 CLIPModel 전체 forward 와
+같은 확률을 내는지 확인하는 스크립트.
+
+사용법 (BE 디렉토리에서):
+    python -m backend.visualization.parity img1.jpg img2.png ...
+(가중치가 캐시에 있으면 tests/test_parity.py 가 합성 이미지로 자동으로 확인함)
+"""
+
+import os
+import sys
+
+import torch
+from PIL import Image
+
+# full forward 는 텍스트 타워까지 필요해서 항상 fp32 torch 백엔드로 로드
+os.environ["KCU_CLIP_BACKEND"] = "torch"
+
+from backend.visualization.clip_model import classify_image, model, processor
+from backend.visualization.labels import PROMPTS
+
+# float32 연산 순서 차이 정도만 허용
+TOLERANCE = 1e-5
+
+
+def full_forward_probs(image: Image.Image) -> list[float]:
+    """예전 방식: 매 요청마다 텍스트 + 이미지를 CLIPModel.forward 로 같이 돌림"""
+    inputs = processor(text=PROMPTS, images=image, return_tensors="pt", padding=True)
+    with torch.no_grad():
+        output = model(**inputs)
+    return output.logits_per_image.softmax(dim=1)[0].tolist()
+
+
+def main(paths: list[str]) -> int:
+    if not paths:
+        print("usage: python -m backend.visualization.parity IMAGE [IMAGE ...]")
+        return 2
+
+    worst = 0.0
+    for path in paths:
+        image = Image.open(path).convert("RGB")
+        expected = full_forward_probs(image)
+        actual = classify_image(image)
+        diff = max(abs(a - b) for a, b in zip(expected, actual))
+        worst = max(worst, diff)
+        print(f"{path}: max |Δp| = {diff:.2e}")
+
+    ok = worst <= TOLERANCE
+    print(f"{'OK' if ok else 'FAIL'}: worst max |Δp| = {worst:.2e} (tolerance {TOLERANCE:.0e})")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
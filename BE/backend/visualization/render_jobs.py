@@ -0,0 +1,133 @@
+# backend/visualization/render_jobs.py
+"""
+heatmap / embedding 시각화 렌더링 job 큐.
+
+렌더링(matplotlib, t-SNE, OpenCV)은 CPU 를 오래 쓰기 때문에 요청 안에서 돌리지 않고
+- submit() 은 job id 만 바로 돌려주고
+- 별도 스레드 풀(max_concurrent 개)에서 렌더링한 뒤
+- 결과는 내용 해시 기반 경로 (out_dir/<key>.png) 에 저장함
+  → 동시에 여러 유저가 요청해도 서로 파일을 덮어쓰지 않고,
+    같은 입력은 이미 만든 파일을 그대로 재사용
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from uuid import uuid4
+
+from backend.metrics import Counter, Gauge, Histogram
+
+RENDER_JOBS = Counter(
+    "kcu_render_jobs_total",
+    "시각화 렌더링 job 수 (kind, status=done|failed|reused)",
+    labelnames=("kind", "status"),
+)
+RENDER_PENDING = Gauge(
+    "kcu_render_jobs_pending",
+    "대기 + 실행 중인 렌더링 job 수",
+)
+RENDER_SECONDS = Histogram(
+    "kcu_render_seconds",
+    "렌더링 job 1개 실행 시간",
+    labelnames=("kind",),
+)
+
+
+class RenderQueueFull(Exception):
+    """대기 중인 렌더링 job 이 너무 많음"""
+
+
+class RenderJob:
+    def __init__(self, kind: str, key: str, path: str):
+        self.id = uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.path = path
+        self.status = "queued"  # queued -> running -> done / failed
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+
+class RenderQueue:
+    def __init__(
+        self,
+        out_dir: str,
+        max_concurrent: int = 2,
+        max_pending: int = 32,
+        max_jobs: int = 1000,
+    ):
+        self.out_dir = out_dir
+        self.max_pending = max(1, max_pending)
+        self.max_jobs = max(1, max_jobs)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, max_concurrent),
+            thread_name_prefix="render",
+        )
+        self._jobs: "OrderedDict[str, RenderJob]" = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.out_dir, f"{key}.png")
+
+    def submit(self, kind: str, key: str, render: Callable[[str], None]) -> RenderJob:
+        """
+        render(out_path) 를 백그라운드에서 실행하는 job 등록.
+        key 는 입력 내용의 해시 (같은 key 면 같은 결과 파일).
+        """
+        job = RenderJob(kind, key, self.path_for(key))
+
+        with self._lock:
+            if os.path.exists(job.path):
+                # 같은 입력으로 이미 렌더링한 결과가 있음
+                job.status = "done"
+                job.finished_at = time.time()
+                self._remember(job)
+                RENDER_JOBS.inc(kind=kind, status="reused")
+                return job
+
+            if self._pending >= self.max_pending:
+                raise RenderQueueFull()
+            self._remember(job)
+            self._pending += 1
+            RENDER_PENDING.set(self._pending)
+
+        self.executor.submit(self._run, job, render)
+        return job
+
+    def get(self, job_id: str) -> Optional[RenderJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _remember(self, job: RenderJob) -> None:
+        # 오래된 job 기록은 버림 (결과 파일은 디스크에 남아 있음)
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+    def _run(self, job: RenderJob, render: Callable[[str], None]) -> None:
+        job.status = "running"
+        started = time.perf_counter()
+        # 다 그린 다음에 이름을 바꿔서, 반쯤 쓴 파일이 노출되지 않게 함
+        tmp_path = f"{job.path}.{job.id}.tmp.png"
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            render(tmp_path)
+            os.replace(tmp_path, job.path)
+            job.status = "done"
+        except Exception as exc:
+            job.status = "failed"
+            job.error = f"{type(exc).__name__}: {exc}"
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        finally:
+            job.finished_at = time.time()
+            RENDER_SECONDS.observe(time.perf_counter() - started, kind=job.kind)
+            RENDER_JOBS.inc(kind=job.kind, status=job.status)
+            with self._lock:
+                self._pending -= 1
+                RENDER_PENDING.set(self._pending)
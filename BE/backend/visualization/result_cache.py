@@ -0,0 +1,121 @@
+# backend/visualization/result_cache.py
+"""
+도형 분류 결과 캐시 (LRU + TTL).
+
+같은 사진을 다시 올리거나 FE 가 네트워크 문제로 재시도하면
+CLIP forward 를 다시 돌리지 않고 예전 predictions 를 그대로 돌려줌.
+- 키: 업로드 바이트의 sha256 (옵션으로 디코딩된 이미지의 perceptual hash 도 사용)
+- 메모리 예산(max_bytes)을 넘으면 가장 오래 안 쓴 항목부터 제거
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from PIL import Image
+
+from backend.metrics import Counter, Gauge
+
+CACHE_REQUESTS = Counter(
+    "kcu_result_cache_requests_total",
+    "분류 결과 캐시 조회 수 (kind=bytes|phash, result=hit|miss)",
+    labelnames=("kind", "result"),
+)
+CACHE_BYTES = Gauge(
+    "kcu_result_cache_bytes",
+    "분류 결과 캐시가 쓰고 있는 (추정) 메모리 바이트 수",
+)
+CACHE_ENTRIES = Gauge(
+    "kcu_result_cache_entries",
+    "분류 결과 캐시 항목 수",
+)
+
+# 항목 1개당 키/OrderedDict 노드 등 고정 오버헤드 (대략)
+_ENTRY_OVERHEAD = 256
+
+
+def content_key(data: bytes) -> str:
+    """업로드 바이트 그대로의 해시 키"""
+    return "sha256:" + hashlib.sha256(data).hexdigest()
+
+
+def perceptual_key(image: Image.Image) -> str:
+    """
+    difference hash (dHash, 64bit).
+    재인코딩/리사이즈 정도만 다른 같은 사진은 같은 키가 나옴.
+    """
+    gray = image.convert("L").resize((9, 8), Image.BILINEAR)
+    pixels = list(gray.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return f"dhash:{bits:016x}"
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, ttl_seconds: float = 600.0):
+        self.max_bytes = max(0, max_bytes)
+        self.ttl = ttl_seconds
+        # key -> (expires_at, value, size)
+        self._entries: "OrderedDict[str, tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str, kind: str = "bytes") -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        CACHE_REQUESTS.inc(kind=kind, result="hit" if entry is not None else "miss")
+        return entry[1] if entry is not None else None
+
+    def put(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+
+        size = len(json.dumps(value, ensure_ascii=False)) + len(key) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._bytes += size
+
+            # 예산 초과 시 LRU 순서로 제거
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+            CACHE_BYTES.set(self._bytes)
+            CACHE_ENTRIES.set(len(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            CACHE_BYTES.set(0)
+            CACHE_ENTRIES.set(0)
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
@@ -1,29 +1,200 @@
 # backend/visualization/router_visualize.py
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from pydantic import BaseModel
 from PIL import Image
-import numpy as np
-import torch
-from transformers import CLIPModel, CLIPProcessor
-import tempfile
+from functools import partial
+import hashlib
+import io
+import os
+
+from backend.metrics import Histogram
+from backend.visualization.batcher import MicroBatcher
+from backend.visualization.inference_pool import InferencePool, InferenceQueueFull
+from backend.visualization.labels import LABELS, LABEL_KOR
+from backend.visualization.model_loader import ModelLoader
+from backend.visualization.render_jobs import RenderJob, RenderQueue, RenderQueueFull
+from backend.visualization.result_cache import ResultCache, content_key, perceptual_key
 
 router = APIRouter()
 
-LABELS = ["sphere", "cube", "cylinder", "cone", "pyramid", "torus"]
+# 업로드 제한 (바이트 수 / 픽셀 수)
+MAX_UPLOAD_BYTES = int(os.getenv("KCU_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("KCU_MAX_IMAGE_PIXELS", str(40_000_000)))
+
+# JPEG 은 CLIP 입력(224px) 보다 큰 해상도까지만 축소 디코딩 (draft)
+DECODE_DRAFT_SIZE = int(os.getenv("KCU_DECODE_DRAFT_SIZE", "224"))
+
+# /visualize/visualize 단계별 시간
+# decode / preprocess: 추론 풀 스레드 안, forward: 배치 대기 + 배치 forward, postprocess: 응답 만들기 + 캐시 저장
+VISUALIZE_STAGE_SECONDS = Histogram(
+    "kcu_visualize_stage_seconds",
+    "/visualize/visualize 단계별 시간 (stage: decode / preprocess / forward / postprocess)",
+    labelnames=("stage",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    trace=True,
+)
+
+# CLIP 모델은 import 시점이 아니라 백그라운드에서 로드 (main.py 시작 시 start())
+# torch / transformers 도 이때 처음 import 됨
+# KCU_CLIP_BACKEND=stub 이면 모델 없이 numpy 로 흉내내는 stub_model 사용 (벤치마크용)
+CLIP_MODULE = (
+    "backend.visualization.stub_model"
+    if os.getenv("KCU_CLIP_BACKEND") == "stub"
+    else "backend.visualization.clip_model"
+)
+model_loader = ModelLoader(CLIP_MODULE)
+
+
+def decode_image(data: bytes) -> Image.Image:
+    """
+    업로드된 바이트를 디스크에 쓰지 않고 메모리에서 바로 RGB 이미지로 디코딩.
+    - 헤더만 읽은 상태에서 픽셀 수 제한 확인 (디코딩 전에 거절)
+    - JPEG 은 draft() 로 DCT 단계에서 축소 디코딩 (어차피 224px 로 줄일 거라 충분함)
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Exception:
+        raise HTTPException(status_code=400, detail="이미지 파일을 읽을 수 없습니다.")
+
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise HTTPException(status_code=413, detail="이미지 해상도가 너무 큽니다.")
+
+    if image.format == "JPEG":
+        image.draft("RGB", (DECODE_DRAFT_SIZE, DECODE_DRAFT_SIZE))
+
+    try:
+        return image.convert("RGB")
+    except Exception:
+        raise HTTPException(status_code=400, detail="이미지 파일을 읽을 수 없습니다.")
+
+
+def load_and_preprocess(data: bytes):
+    """
+    업로드된 바이트 -> RGB 이미지 -> (CLIP 입력 텐서, perceptual hash 키) (추론 풀 스레드에서 실행).
+    RESULT_CACHE_PHASH 가 꺼져 있으면 키는 None.
+    """
+    with VISUALIZE_STAGE_SECONDS.timer(stage="decode"):
+        image = decode_image(data)
+    with VISUALIZE_STAGE_SECONDS.timer(stage="preprocess"):
+        phash = perceptual_key(image) if RESULT_CACHE_PHASH else None
+        return model_loader.module.preprocess_image(image), phash
+
+
+def classify_batch(pixel_values: list) -> list[list[float]]:
+    """배치 스케줄러가 부르는 함수 (로드된 clip_model 로 위임)"""
+    return model_loader.module.classify_batch(pixel_values)
+
+
+# 같은 사진 재업로드 / 재시도용 결과 캐시
+# (KCU_RESULT_CACHE_BYTES=0 이면 끔, KCU_RESULT_CACHE_PHASH=1 이면 perceptual hash 로도 조회)
+RESULT_CACHE_BYTES = int(os.getenv("KCU_RESULT_CACHE_BYTES", str(8 * 1024 * 1024)))
+RESULT_CACHE_TTL = float(os.getenv("KCU_RESULT_CACHE_TTL", "600"))
+RESULT_CACHE_PHASH = os.getenv("KCU_RESULT_CACHE_PHASH", "0") == "1"
+
+result_cache = ResultCache(max_bytes=RESULT_CACHE_BYTES, ttl_seconds=RESULT_CACHE_TTL)
+
+# 디코딩 + 추론 전용 스레드 풀
+# (KCU_INFERENCE_MAX_PENDING 건 넘게 밀려 있으면 503 으로 거절)
+INFERENCE_WORKERS = int(os.getenv("KCU_INFERENCE_WORKERS", "2"))
+INFERENCE_MAX_PENDING = int(os.getenv("KCU_INFERENCE_MAX_PENDING", "64"))
+
+inference_pool = InferencePool(
+    workers=INFERENCE_WORKERS,
+    max_pending=INFERENCE_MAX_PENDING,
+)
+
+# 동시 요청을 모아서 한 번에 forward 하는 배치 스케줄러
+# (KCU_BATCH_MAX_SIZE 개가 모이거나 KCU_BATCH_MAX_WAIT_MS 가 지나면 실행)
+BATCH_MAX_SIZE = int(os.getenv("KCU_BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("KCU_BATCH_MAX_WAIT_MS", "10"))
+
+batcher = MicroBatcher(
+    classify_batch,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    executor=inference_pool.executor,
+)
+
+
+# heatmap / embedding 시각화 렌더링 job 큐
+# (결과는 static/renders/<내용 해시>.png, 동시에 KCU_RENDER_WORKERS 개까지만 렌더링)
+RENDER_DIR = os.path.join("static", "renders")
+RENDER_URL_PREFIX = "/static/renders"
+RENDER_KINDS = ("heatmap", "embedding")
+
+# embedding 시각화 2D 투영 방식: pca (기본, 빠르고 결정적) / tsne (느림, 오프라인 분석용)
+EMBEDDING_PROJECTION = os.getenv("KCU_EMBEDDING_PROJECTION", "pca")
+
+render_queue = RenderQueue(
+    out_dir=RENDER_DIR,
+    max_concurrent=int(os.getenv("KCU_RENDER_WORKERS", "2")),
+    max_pending=int(os.getenv("KCU_RENDER_MAX_PENDING", "32")),
+)
 
-# 영어 -> 한글 변환 매핑
-LABEL_KOR = {
-    "sphere": "원",
-    "cube": "사각형",
-    "cylinder": "원기둥",
-    "cone": "원뿔",
-    "pyramid": "삼각형",
-    "torus": "도넛"
-}
 
-# CLIP 모델은 서버 시작 시 1번만 로드
-model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+class RenderJobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str            # queued / running / done / failed
+    url: str | None = None  # done 일 때 결과 이미지 URL
+    error: str | None = None
+
+
+def render_heatmap(data: bytes, out_path: str) -> None:
+    """CLIP attention heatmap 렌더링 (렌더 스레드에서 실행)"""
+    from backend.visualization.heatmap import save_heatmap
+
+    image = decode_image(data)
+    attn_map = model_loader.module.attention_map(image)
+    save_heatmap(attn_map, image, out_path)
+
+
+def render_embedding(data: bytes, out_path: str) -> None:
+    """이미지 / 라벨 텍스트 임베딩 2D 시각화 렌더링 (렌더 스레드에서 실행)"""
+    from backend.visualization.embedding_vis import save_embedding_vis
+
+    clip = model_loader.module
+    image = decode_image(data)
+    save_embedding_vis(
+        clip.image_embedding(image),
+        clip.text_embeddings(),
+        LABELS,
+        out_path,
+        mode=EMBEDDING_PROJECTION,
+    )
+
+
+def to_render_response(job: RenderJob) -> RenderJobResponse:
+    return RenderJobResponse(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        url=f"{RENDER_URL_PREFIX}/{job.key}.png" if job.status == "done" else None,
+        error=job.error,
+    )
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    # 제한보다 1바이트만 더 읽어서 크기 초과 여부 판단 (큰 파일을 끝까지 읽지 않음)
+    data = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="이미지 파일이 너무 큽니다.")
+    if not data:
+        raise HTTPException(status_code=400, detail="빈 파일입니다.")
+    return data
+
+
+def ensure_model_ready() -> None:
+    # 모델이 아직 로딩 중이면 (서버 막 시작한 직후) 503
+    if not model_loader.ready:
+        model_loader.start()
+        raise HTTPException(
+            status_code=503,
+            detail="AI 모델을 준비하는 중입니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": "5"},
+        )
 
 
 @router.post("/visualize")
@@ -33,38 +204,93 @@ async def visualize(file: UploadFile = File(...)):
     반환 형식: predictions = [{label, confidence}, ...]
     """
 
-    # 1) 파일 저장
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            tmp.write(await file.read())
-            img_path = tmp.name
-    except Exception:
-        raise HTTPException(status_code=400, detail="이미지를 저장할 수 없습니다.")
+    data = await read_upload(file)
 
-    # 2) 이미지 로드
-    image = Image.open(img_path).convert("RGB")
+    # 0) 같은 바이트로 이미 분류한 적 있으면 바로 반환
+    cache_key = content_key(data)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return {"predictions": cached}
 
-    # 3) CLIP 입력 생성
-    prompts = [f"a photo of a {label}" for label in LABELS]
+    ensure_model_ready()
 
-    inputs = processor(
-        text=prompts,
-        images=image,
-        return_tensors="pt",
-        padding=True
-    )
+    try:
+        async with inference_pool.slot():
+            # 1) 메모리에서 이미지 디코딩 + 전처리 (추론 풀에서 실행)
+            pixel_values, phash = await inference_pool.run(load_and_preprocess, data)
 
-    # 4) CLIP 실행
-    with torch.no_grad():
-        output = model(**inputs)
+            # 재인코딩만 다른 같은 사진이면 캐시된 결과 반환
+            if phash is not None:
+                cached = result_cache.get(phash, kind="phash")
+                if cached is not None:
+                    result_cache.put(cache_key, cached)
+                    return {"predictions": cached}
 
-    # 5) softmax → 확률 계산
-    probs = output.logits_per_image.softmax(dim=1)[0].tolist()
+            # 2) CLIP 이미지 인코더 실행 (다른 요청들과 배치로 묶여서 실행됨)
+            #    + 미리 계산한 텍스트 임베딩과 비교 → 확률
+            with VISUALIZE_STAGE_SECONDS.timer(stage="forward"):
+                probs = await batcher.submit(pixel_values)
+    except InferenceQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="요청이 너무 많습니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": "1"},
+        )
 
-    # 6) FE에서 기대하는 predictions 포맷 (한글로 변환)
-    predictions = [
-        {"label": LABEL_KOR[LABELS[i]], "confidence": float(probs[i])}
-        for i in range(len(LABELS))
-    ]
+    # 3) FE에서 기대하는 predictions 포맷 (한글로 변환)
+    with VISUALIZE_STAGE_SECONDS.timer(stage="postprocess"):
+        predictions = [
+            {"label": LABEL_KOR[LABELS[i]], "confidence": float(probs[i])}
+            for i in range(len(LABELS))
+        ]
+
+        result_cache.put(cache_key, predictions)
+        if phash is not None:
+            result_cache.put(phash, predictions)
 
     return {"predictions": predictions}
+
+
+# -----------------------
+#  시각화 렌더링 job API
+# -----------------------
+
+@router.post("/render", response_model=RenderJobResponse, status_code=202)
+async def create_render_job(
+    kind: str = Query(..., description="heatmap 또는 embedding"),
+    file: UploadFile = File(...),
+):
+    """
+    시각화 렌더링 job 생성. 렌더링은 백그라운드에서 하고 job_id 를 바로 반환.
+    결과는 GET /visualize/render/{job_id} 로 확인.
+    """
+    if kind not in RENDER_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind 는 {', '.join(RENDER_KINDS)} 중 하나여야 합니다.")
+
+    data = await read_upload(file)
+    ensure_model_ready()
+
+    render = render_heatmap if kind == "heatmap" else render_embedding
+    # 같은 업로드라도 투영 방식이 다르면 다른 결과 파일
+    variant = kind if kind == "heatmap" else f"{kind}-{EMBEDDING_PROJECTION}"
+    key = hashlib.sha256(variant.encode("utf-8") + b"\0" + data).hexdigest()
+
+    try:
+        job = render_queue.submit(kind, key, partial(render, data))
+    except RenderQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="렌더링 요청이 너무 많습니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": "5"},
+        )
+
+    return to_render_response(job)
+
+
+@router.get("/render/{job_id}", response_model=RenderJobResponse)
+async def get_render_job(job_id: str):
+    """렌더링 job 상태 조회 (done 이면 url 에 결과 이미지 경로)"""
+    job = render_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="해당 job_id 를 찾을 수 없습니다.")
+    return to_render_response(job)
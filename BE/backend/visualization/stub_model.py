@@ -0,0 +1,82 @@
+# backend/visualization/stub_model.py
+"""
+CLIP 없이 돌아가는 가짜 clip_model (KCU_CLIP_BACKEND=stub).
+
+벤치마크 / 로컬 개발에서 torch, transformers, 가중치 다운로드 없이
+/visualize 의 업로드 → 디코딩 → 전처리 → 배치 → 응답 경로를 그대로 태우기 위한 것.
+clip_model 과 같은 함수들을 numpy 로만 구현하고, 결과는 이미지 픽셀에서 결정적으로 나옴
+(분류 결과 자체는 의미 없음).
+- 전처리: 224x224 리사이즈 + float 정규화 (CLIPProcessor 와 비슷한 비용)
+- forward: KCU_STUB_FORWARD_MS (배치 1번당) 만큼 sleep 해서 모델 시간을 흉내냄
+"""
+
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+from backend.visualization.labels import LABELS
+
+IMAGE_SIZE = 224
+EMBED_DIM = 512
+FORWARD_MS = float(os.getenv("KCU_STUB_FORWARD_MS", "5"))
+
+_rng = np.random.default_rng(0)
+# 픽셀 통계 (채널 평균 / 표준편차 + 4x4 격자 밝기) -> 임베딩 으로 가는 고정 투영
+_FEATURES = 6 + 16
+_PROJECTION = _rng.standard_normal((_FEATURES, EMBED_DIM)).astype(np.float32)
+TEXT_FEATURES = _rng.standard_normal((len(LABELS), EMBED_DIM)).astype(np.float32)
+TEXT_FEATURES /= np.linalg.norm(TEXT_FEATURES, axis=1, keepdims=True)
+LOGIT_SCALE = 100.0
+
+
+def preprocess_image(image: Image.Image) -> np.ndarray:
+    """이미지 1장 -> (1, 3, 224, 224) float32"""
+    resized = image.convert("RGB").resize((IMAGE_SIZE, IMAGE_SIZE), Image.BICUBIC)
+    pixels = np.asarray(resized, dtype=np.float32) / 255.0
+    return pixels.transpose(2, 0, 1)[None]
+
+
+def _image_features(pixel_values: np.ndarray) -> np.ndarray:
+    batch = pixel_values.shape[0]
+    gray = pixel_values.mean(axis=1)
+    grid = gray.reshape(batch, 4, IMAGE_SIZE // 4, 4, IMAGE_SIZE // 4).mean(axis=(2, 4)).reshape(batch, 16)
+    stats = np.concatenate(
+        [pixel_values.mean(axis=(2, 3)), pixel_values.std(axis=(2, 3)), grid],
+        axis=1,
+    )
+    features = stats @ _PROJECTION
+    return features / np.maximum(np.linalg.norm(features, axis=1, keepdims=True), 1e-12)
+
+
+def classify_batch(pixel_values: list, backend=None) -> list[list[float]]:
+    if FORWARD_MS > 0:
+        time.sleep(FORWARD_MS / 1000)
+    logits = LOGIT_SCALE * _image_features(np.concatenate(pixel_values, axis=0)) @ TEXT_FEATURES.T
+    logits -= logits.max(axis=1, keepdims=True)
+    probs = np.exp(logits)
+    probs /= probs.sum(axis=1, keepdims=True)
+    return probs.tolist()
+
+
+def classify_image(image: Image.Image) -> list[float]:
+    return classify_batch([preprocess_image(image)])[0]
+
+
+def image_embedding(image: Image.Image) -> np.ndarray:
+    return _image_features(preprocess_image(image))
+
+
+def text_embeddings() -> np.ndarray:
+    return TEXT_FEATURES
+
+
+def attention_map(image: Image.Image) -> np.ndarray:
+    """밝기 7x7 격자를 attention 대신 반환"""
+    gray = preprocess_image(image)[0].mean(axis=0)
+    return gray.reshape(7, IMAGE_SIZE // 7, 7, IMAGE_SIZE // 7).mean(axis=(1, 3))
+
+
+def warmup() -> None:
+    classify_image(Image.new("RGB", (IMAGE_SIZE, IMAGE_SIZE)))
@@ -0,0 +1,398 @@
+# BE/bench/app_load.py
+"""
+API 부하 벤치마크 (실제 라우터 / 미들웨어 / DB 를 모두 거침).
+
+임시 SQLite DB 로 앱을 띄우고 (in-process 또는 uvicorn 서브프로세스)
+시나리오별로 동시 요청을 정해진 시간 동안 보낸 뒤, 처리량과 p50/p95/p99 를 JSON 으로 출력.
+저장해둔 baseline 이 있으면 비교해서 느려진 시나리오를 표시함.
+
+시나리오:
+- visualize: /visualize/visualize 이미지 업로드 (static/*.png + 합성 도형 이미지)
+- match    : /match/join 두 명 → 매칭되면 /match/result
+- score    : /score/save 쓰기 + /ranking/top10 읽기 혼합 (--write-ratio)
+- auth     : /auth/signup → /auth/login
+
+사용법 (BE 디렉토리에서, httpx 필요):
+    python bench/app_load.py                               # 전부, in-process, stub 모델
+    python bench/app_load.py --scenarios score,match --concurrency 32 --seconds 10
+    python bench/app_load.py --server uvicorn --workers 2  # 실제 서버 프로세스로
+    python bench/app_load.py --model clip                 # 실제 CLIP 모델 (가중치 다운로드 필요)
+    python bench/app_load.py --save-baseline              # 결과를 bench/baseline.json 으로 저장
+    python bench/app_load.py --fail-on-regression         # baseline 보다 느려지면 exit 1
+
+같은 머신 / 같은 옵션으로 잰 baseline 끼리만 비교할 것.
+"""
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+BE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BE_DIR)
+
+SCENARIOS = ("visualize", "match", "score", "auth")
+DEFAULT_BASELINE = os.path.join(BE_DIR, "bench", "baseline.json")
+
+
+def percentile(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def summary(samples: list, seconds: float) -> dict:
+    return {
+        "requests": len(samples),
+        "throughput_rps": len(samples) / seconds,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "mean_ms": (statistics.fmean(samples) * 1000) if samples else 0.0,
+    }
+
+
+class Recorder:
+    """요청별 latency 를 op 이름별로 모음 (asyncio 단일 스레드라 락 없음)"""
+
+    def __init__(self):
+        self.latencies: dict = {}
+        self.errors: dict = {}
+
+    async def request(self, client, op: str, method: str, url: str, ok=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            resp = await client.request(method, url, **kwargs)
+        except Exception as exc:
+            self.errors.setdefault(op, []).append(repr(exc))
+            return None
+        self.latencies.setdefault(op, []).append(time.perf_counter() - started)
+        if resp.status_code not in ok:
+            self.errors.setdefault(op, []).append(f"HTTP {resp.status_code}: {resp.text[:200]}")
+            return None
+        return resp
+
+    def report(self, seconds: float) -> dict:
+        all_samples = [s for samples in self.latencies.values() for s in samples]
+        errors = sum(len(e) for e in self.errors.values())
+        first_error = next((e[0] for e in self.errors.values() if e), None)
+        return {
+            **summary(all_samples, seconds),
+            "errors": errors,
+            "first_error": first_error,
+            "ops": {op: summary(samples, seconds) for op, samples in sorted(self.latencies.items())},
+        }
+
+
+# -----------------------
+#  업로드용 이미지
+# -----------------------
+def sample_images(count: int) -> list:
+    """static/*.png (있으면) + 원 / 사각형 / 삼각형 합성 이미지 count 장 (PNG / JPEG 반반)"""
+    from PIL import Image, ImageDraw
+
+    images = []
+    static_dir = os.path.join(BE_DIR, "static")
+    for name in sorted(os.listdir(static_dir)) if os.path.isdir(static_dir) else []:
+        if name.lower().endswith((".png", ".jpg", ".jpeg")):
+            with open(os.path.join(static_dir, name), "rb") as f:
+                images.append((name, f.read()))
+
+    rng = random.Random(0)
+    for i in range(count):
+        image = Image.new("RGB", (256, 256), "white")
+        draw = ImageDraw.Draw(image)
+        x, y, r = rng.randint(60, 196), rng.randint(60, 196), rng.randint(20, 60)
+        color = tuple(rng.randint(0, 200) for _ in range(3))
+        kind = i % 3
+        if kind == 0:
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=color)
+        elif kind == 1:
+            draw.rectangle((x - r, y - r, x + r, y + r), fill=color)
+        else:
+            draw.polygon([(x, y - r), (x - r, y + r), (x + r, y + r)], fill=color)
+        buf = io.BytesIO()
+        image.save(buf, format="JPEG" if i % 2 else "PNG")
+        images.append((f"shape{i}.{'jpg' if i % 2 else 'png'}", buf.getvalue()))
+    return images
+
+
+# -----------------------
+#  시나리오 (한 번 호출 = 한 iteration)
+# -----------------------
+async def run_visualize(client, rec: Recorder, worker: int, i: int, ctx: dict) -> None:
+    images = ctx["images"]
+    name, data = images[(worker * 7919 + i) % len(images)]
+    if not ctx["cache_hits"]:
+        # 파일 끝 뒤에 붙은 바이트는 디코더가 무시함 → 결과 캐시 키만 달라짐
+        data += next(ctx["seq"]).to_bytes(8, "big")
+    await rec.request(client, "visualize", "POST", "/visualize/visualize", files={"file": (name, data)})
+
+
+async def run_match(client, rec: Recorder, worker: int, i: int, ctx: dict) -> None:
+    n = next(ctx["seq"])
+    users = [f"bench-{ctx['run']}-{n}-{side}" for side in ("a", "b")]
+    for user_id in users:
+        resp = await rec.request(client, "match.join", "POST", "/match/join", json={"user_id": user_id})
+        if resp is None:
+            continue
+        body = resp.json()
+        if body.get("status") != "matched":
+            continue
+        # 다른 워커의 대기자와 매칭될 수도 있음 → 매칭된 응답을 받은 쪽이 결과 저장
+        await rec.request(client, "match.result", "POST", "/match/result", json={
+            "match_id": body["match_id"],
+            "winner_id": user_id,
+            "loser_id": body["opponent_id"],
+        })
+
+
+async def run_score(client, rec: Recorder, worker: int, i: int, ctx: dict) -> None:
+    if ctx["rng"].random() < ctx["write_ratio"]:
+        await rec.request(client, "score.save", "POST", "/score/save", json={
+            "user_id": f"bench-{worker}-{i % 200}",
+            "score": ctx["rng"].random() * 100,
+        })
+    else:
+        await rec.request(client, "ranking.top10", "GET", "/ranking/top10")
+
+
+async def run_auth(client, rec: Recorder, worker: int, i: int, ctx: dict) -> None:
+    credentials = {"email": f"bench-{ctx['run']}-{next(ctx['seq'])}@example.com", "password": "bench-password"}
+    if await rec.request(client, "auth.signup", "POST", "/auth/signup", json=credentials) is None:
+        return
+    await rec.request(client, "auth.login", "POST", "/auth/login", json=credentials)
+
+
+RUNNERS = {
+    "visualize": run_visualize,
+    "match": run_match,
+    "score": run_score,
+    "auth": run_auth,
+}
+
+
+async def run_scenario(client, name: str, concurrency: int, seconds: float, ctx: dict) -> dict:
+    rec = Recorder()
+    runner = RUNNERS[name]
+    deadline = time.perf_counter() + seconds
+
+    async def worker(n: int):
+        i = 0
+        while time.perf_counter() < deadline:
+            await runner(client, rec, n, i, ctx)
+            i += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return rec.report(time.perf_counter() - started)
+
+
+# -----------------------
+#  앱 띄우기
+# -----------------------
+@asynccontextmanager
+async def in_process_client():
+    """lifespan 까지 실행한 앱에 ASGI 로 직접 요청 (네트워크 / 직렬화 비용 없음)"""
+    import httpx
+
+    from backend.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            yield client
+
+
+@asynccontextmanager
+async def uvicorn_client(port: int, workers: int, timeout: float):
+    import httpx
+
+    # 빈 DB 에 워커 여러 개가 동시에 create_all 하면 "table already exists" 로 죽을 수 있어서 미리 만들어 둠
+    from backend.database import init_db
+
+    init_db()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BE_DIR,
+        env=os.environ.copy(),
+    )
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=1000)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+            await wait_ready(client, proc, timeout)
+            yield client
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+async def wait_ready(client, proc, timeout: float) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn 이 종료됐습니다 (exit {proc.returncode})")
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"서버가 {timeout}s 안에 준비되지 않았습니다.")
+
+
+async def wait_model(timeout: float) -> None:
+    """in-process: warm-up 이 끝날 때까지 (visualize 가 503 으로 측정되지 않도록)"""
+    from backend.visualization.router_visualize import model_loader
+
+    deadline = time.time() + timeout
+    while not model_loader.ready:
+        if model_loader.state == "failed" or time.time() > deadline:
+            raise RuntimeError(f"모델 로딩 실패: {model_loader.status()}")
+        await asyncio.sleep(0.2)
+
+
+# -----------------------
+#  baseline 비교
+# -----------------------
+def compare(current: dict, baseline: dict, tolerance: float) -> dict:
+    """시나리오별 변화율. 처리량이 tolerance 넘게 줄거나 p95 / p99 가 tolerance 넘게 늘면 regression"""
+    result = {}
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        delta = {}
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if before.get(key):
+                delta[key] = (now[key] - before[key]) / before[key]
+        regressed = (
+            delta.get("throughput_rps", 0.0) < -tolerance
+            or delta.get("p95_ms", 0.0) > tolerance
+            or delta.get("p99_ms", 0.0) > tolerance
+        )
+        result[name] = {"change": delta, "regression": regressed}
+    return result
+
+
+async def run(args) -> dict:
+    ctx = {
+        "run": f"{int(time.time())}",
+        "seq": itertools.count(),  # 유저 id / 이메일이 warm-up 과 겹치지 않게
+        "cache_hits": args.cache_hits,
+        "rng": random.Random(1),
+        "write_ratio": args.write_ratio,
+        "images": sample_images(args.images) if "visualize" in args.scenarios else [],
+    }
+    if args.server == "uvicorn":
+        client_cm = uvicorn_client(args.port, args.workers, args.startup_timeout)
+    else:
+        client_cm = in_process_client()
+
+    results = {}
+    async with client_cm as client:
+        if args.server == "inprocess" and "visualize" in args.scenarios:
+            await wait_model(args.startup_timeout)
+        for name in args.scenarios:
+            if args.warmup > 0:
+                await run_scenario(client, name, args.concurrency, args.warmup, ctx)
+            results[name] = await run_scenario(client, name, args.concurrency, args.seconds, ctx)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"쉼표로 구분 ({', '.join(SCENARIOS)})")
+    parser.add_argument("--server", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn 워커 수")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--model", choices=("stub", "clip"), default="stub",
+                        help="stub: 가중치 없이 numpy 가짜 모델 (KCU_CLIP_BACKEND=stub)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0, help="시나리오별 측정 시간")
+    parser.add_argument("--warmup", type=float, default=1.0, help="시나리오별 측정 전 warm-up 시간")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="score 시나리오의 쓰기 비율")
+    parser.add_argument("--images", type=int, default=64, help="합성 업로드 이미지 수")
+    parser.add_argument("--cache-hits", action="store_true",
+                        help="같은 이미지를 그대로 다시 올림 (기본은 요청마다 바이트를 바꿔서 결과 캐시를 피함)")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.15, help="baseline 대비 허용 변화율")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (없으면 stdout 만)")
+    args = parser.parse_args()
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"알 수 없는 시나리오: {', '.join(sorted(unknown))}")
+
+    # 항상 임시 DB / 매칭 저장소 / journal 로 (운영 파일은 건드리지 않음)
+    # 환경변수는 backend 를 import 하기 전에 설정해야 함
+    tmpdir = tempfile.mkdtemp(prefix="kcu-bench-")
+    os.environ["KCU_DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ.setdefault("KCU_MATCH_STORE", os.path.join(tmpdir, "match_state.db"))
+    os.environ.setdefault("KCU_INGEST_JOURNAL", os.path.join(tmpdir, "ingest.journal"))
+    if args.server == "uvicorn" and args.workers > 1:
+        # 워커별 메모리 매칭 큐면 서로 다른 워커에 붙은 유저끼리 매칭 / 결과 저장이 안 됨
+        os.environ.setdefault("KCU_MATCH_BACKEND", "sqlite")
+    if args.model == "stub":
+        os.environ["KCU_CLIP_BACKEND"] = "stub"
+    os.chdir(BE_DIR)  # StaticFiles(directory="static") 가 CWD 기준
+
+    started = time.time()
+    scenarios = asyncio.run(run(args))
+
+    result = {
+        "config": {
+            "server": args.server,
+            "workers": args.workers if args.server == "uvicorn" else 1,
+            "model": args.model,
+            "concurrency": args.concurrency,
+            "seconds": args.seconds,
+            "write_ratio": args.write_ratio,
+            "cache_hits": args.cache_hits,
+            "python": sys.version.split()[0],
+            "cpus": os.cpu_count(),
+            "env": {k: v for k, v in sorted(os.environ.items()) if k.startswith("KCU_") and k != "KCU_DATABASE_URL"},
+        },
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "scenarios": scenarios,
+    }
+
+    regressed = False
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        result["baseline"] = {"path": args.baseline, "tolerance": args.tolerance,
+                              "scenarios": compare(result, baseline, args.tolerance)}
+        regressed = any(s["regression"] for s in result["baseline"]["scenarios"].values())
+
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(text + "\n")
+        print(f"baseline 저장: {args.baseline}", file=sys.stderr)
+
+    return 1 if regressed and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# BE/bench/db_mixed.py
+"""
+DB 읽기/쓰기 혼합 부하 벤치마크.
+
+/ranking/top10 과 같은 쿼리를 도는 reader 스레드들과
+/score/save 와 같은 트랜잭션을 도는 writer 스레드들을 동시에 돌려서
+초당 처리량과 지연시간을 JSON 으로 출력함.
+(메모리 리더보드는 안 거치고 DB 쿼리만 측정)
+
+사용법 (BE 디렉토리에서):
+    python bench/db_mixed.py                      # 튜닝 적용 (WAL 등)
+    KCU_SQLITE_TUNING=0 python bench/db_mixed.py  # 기본 SQLite 설정과 비교
+    python bench/db_mixed.py --readers 8 --writers 4 --seconds 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--seed-rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    # 항상 임시 DB 로 (실행할 때마다 새로, 운영 DB 는 건드리지 않음)
+    tmpdir = tempfile.mkdtemp(prefix="kcu-bench-")
+    os.environ["KCU_DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    from backend.database import SQLITE_TUNING, SessionLocal, engine, init_db
+    from backend.models import Score
+    from backend.rankings import record_user_best
+
+    init_db()
+    with engine.begin() as conn:
+        conn.execute(
+            Score.__table__.insert(),
+            [
+                {"user_id": f"seed{i % 5000}", "date": "2026-01-01", "score": (i * 7919 % 10007) / 10007}
+                for i in range(args.seed_rows)
+            ],
+        )
+
+    stop = threading.Event()
+    read_latencies: list = []
+    write_latencies: list = []
+    errors: list = []
+
+    def reader():
+        local = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with SessionLocal() as db:
+                    db.query(Score).order_by(Score.score.desc(), Score.id.asc()).limit(10).all()
+            except Exception as exc:
+                errors.append(repr(exc))
+            local.append(time.perf_counter() - started)
+        read_latencies.extend(local)
+
+    def writer(n: int):
+        local = []
+        i = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with SessionLocal() as db:
+                    row = Score(user_id=f"w{n}-{i % 100}", date="2026-01-02", score=(i % 1000) / 1000)
+                    db.add(row)
+                    db.flush()
+                    record_user_best(db, row)
+                    db.commit()
+            except Exception as exc:
+                errors.append(repr(exc))
+            local.append(time.perf_counter() - started)
+            i += 1
+        write_latencies.extend(local)
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    def summary(samples: list) -> dict:
+        return {
+            "ops": len(samples),
+            "ops_per_sec": len(samples) / args.seconds,
+            "p50_ms": percentile(samples, 0.50) * 1000,
+            "p95_ms": percentile(samples, 0.95) * 1000,
+            "p99_ms": percentile(samples, 0.99) * 1000,
+            "mean_ms": (statistics.fmean(samples) * 1000) if samples else 0.0,
+        }
+
+    print(json.dumps({
+        "sqlite_tuning": SQLITE_TUNING,
+        "readers": args.readers,
+        "writers": args.writers,
+        "seconds": args.seconds,
+        "read": summary(read_latencies),
+        "write": summary(write_latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# BE/bench/worker_memory.py
+"""
+gunicorn 마스터 + 워커들의 RSS / PSS 측정.
+
+PSS 는 공유 페이지를 공유 프로세스 수로 나눈 값이라,
+pre-fork 로 가중치를 공유하면 워커당 PSS 가 RSS 보다 훨씬 작게 나옴.
+
+사용법 (BE 디렉토리에서, Linux 전용):
+    # 이미 떠 있는 서버 측정
+    python bench/worker_memory.py --pid <gunicorn 마스터 PID>
+
+    # 직접 띄워서 pre-fork on/off 비교
+    python bench/worker_memory.py --launch --workers 4 --prefork 1
+    python bench/worker_memory.py --launch --workers 4 --prefork 0
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def read_memory_kb(pid: int) -> dict:
+    """/proc/<pid>/smaps_rollup 에서 Rss / Pss / Shared 읽기 (kB)"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "shared_kb": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+
+def children_of(pid: int) -> list[int]:
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(c) for c in f.read().split())
+    return sorted(children)
+
+
+def wait_ready(url: str, timeout: float) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as resp:
+                if resp.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(1)
+    raise TimeoutError(f"{url} 가 {timeout}s 안에 준비되지 않았습니다.")
+
+
+def report(master_pid: int) -> dict:
+    workers = [dict(pid=pid, **read_memory_kb(pid)) for pid in children_of(master_pid)]
+    result = {
+        "master": dict(pid=master_pid, **read_memory_kb(master_pid)),
+        "workers": workers,
+    }
+    if workers:
+        result["avg_worker_rss_mb"] = sum(w["rss_kb"] for w in workers) / len(workers) / 1024
+        result["avg_worker_pss_mb"] = sum(w["pss_kb"] for w in workers) / len(workers) / 1024
+        result["total_pss_mb"] = (
+            result["master"]["pss_kb"] + sum(w["pss_kb"] for w in workers)
+        ) / 1024
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pid", type=int, help="이미 떠 있는 gunicorn 마스터 PID")
+    parser.add_argument("--launch", action="store_true", help="gunicorn 을 직접 띄워서 측정")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--prefork", choices=("0", "1"), default="1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--settle", type=float, default=10.0, help="모든 워커 warm-up 대기 시간(초)")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    if not args.launch:
+        if not args.pid:
+            parser.error("--pid 또는 --launch 중 하나가 필요합니다.")
+        print(json.dumps(report(args.pid), indent=2))
+        return 0
+
+    env = dict(
+        os.environ,
+        KCU_WORKERS=str(args.workers),
+        KCU_PREFORK_MODEL=args.prefork,
+        KCU_BIND=f"127.0.0.1:{args.port}",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "backend.main:app"],
+        env=env,
+    )
+    try:
+        wait_ready(f"http://127.0.0.1:{args.port}/readyz", args.timeout)
+        # /readyz 는 워커 하나만 확인하니까 나머지 워커 warm-up 까지 조금 더 기다림
+        time.sleep(args.settle)
+        result = report(proc.pid)
+        result["prefork"] = args.prefork == "1"
+        print(json.dumps(result, indent=2))
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+# BE/gunicorn.conf.py
+#
+# 여러 워커로 띄울 때 (BE 디렉토리에서):
+#   gunicorn -c gunicorn.conf.py backend.main:app
+#
+# KCU_PREFORK_MODEL=1 (기본) 이면 마스터에서 CLIP 가중치를 한 번만 로드하고
+# 워커들이 copy-on-write 로 공유함. 0 이면 워커마다 따로 로드 (uvicorn --workers 와 같음).
+
+import os
+
+bind = os.getenv("KCU_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("KCU_WORKERS", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# 앱(backend.main)을 마스터에서 import 한 뒤 fork
+preload_app = True
+
+PREFORK_MODEL = os.getenv("KCU_PREFORK_MODEL", "1") == "1"
+
+
+def when_ready(server):
+    # 마스터: 리스닝 소켓 준비 후, 워커 fork 전에 호출됨
+    # 스키마 생성 / 백필은 여기서 한 번만 (워커 lifespan 에서는 건너뜀)
+    from backend.database import prepare_db
+
+    prepare_db()
+    if PREFORK_MODEL:
+        from backend.prefork import preload_model
+
+        preload_model()
+
+
+def post_fork(server, worker):
+    if PREFORK_MODEL:
+        from backend.prefork import init_worker
+
+        init_worker(server.cfg.workers)
@@ -0,0 +1,49 @@
+# BE/tests/conftest.py
+"""
+테스트 공통 설정.
+
+backend 모듈들은 import 시점에 환경변수(KCU_*)를 읽으니까
+어떤 backend 모듈보다 먼저 임시 DB / journal / 락 파일 경로를 잡아둠 (운영 shape.db 는 건드리지 않음).
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+BE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BE_DIR)
+
+_tmpdir = tempfile.mkdtemp(prefix="kcu-test-")
+os.environ["KCU_DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'test.db')}"
+os.environ.setdefault("KCU_INGEST_JOURNAL", os.path.join(_tmpdir, "ingest.journal"))
+os.environ.setdefault("KCU_MATCH_STORE", os.path.join(_tmpdir, "match_state.db"))
+os.environ.setdefault("KCU_MIGRATE_LOCK", os.path.join(_tmpdir, "migrate.lock"))
+os.environ.setdefault("KCU_MODEL_WARMUP", "0")
+
+
+@pytest.fixture(scope="session")
+def db_ready():
+    """임시 DB 에 테이블 생성 (서버 시작 때와 같은 prepare_db)"""
+    from backend.database import prepare_db
+
+    prepare_db()
+
+
+@pytest.fixture
+def user_id():
+    """테스트마다 겹치지 않는 user_id (같은 임시 DB 를 여러 테스트가 같이 씀)"""
+    return f"user-{uuid.uuid4().hex[:8]}"
+
+
+@pytest.fixture(scope="session")
+def client(db_ready):
+    """lifespan 까지 실행한 앱 (CLIP 모델은 KCU_MODEL_WARMUP=0 이라 로드 안 함)"""
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,93 @@
+# BE/tests/test_auth.py
+"""계정 저장 (users 테이블) / 로그인 (scrypt, 예전 해시 교체) / 검증된 토큰 캐시 / 컬럼 추가 마이그레이션"""
+
+import hashlib
+
+from sqlalchemy import inspect as sa_inspect
+
+from backend import database
+from backend.auth.passwords import password_hasher
+from backend.auth.token_cache import token_cache
+from backend.database import SessionLocal
+from backend.models import User
+
+
+def _signup(client, email: str, password: str = "pw-1234"):
+    return client.post("/auth/signup", json={"email": email, "password": password})
+
+
+def test_signup_stores_account_in_users_table(client, user_id):
+    email = f"{user_id}@example.com"
+    assert _signup(client, email).status_code == 200
+    assert _signup(client, email).status_code == 409
+
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.email == email).one()
+        assert user.user_id == email
+        assert user.password_hash.startswith("scrypt$")
+
+
+def test_login_upgrades_legacy_sha256_hash(client, user_id):
+    email = f"{user_id}@example.com"
+    with SessionLocal() as db:
+        db.add(User(user_id=email, email=email, password_hash=hashlib.sha256(b"pw-1234").hexdigest()))
+        db.commit()
+
+    assert client.post("/auth/login", json={"email": email, "password": "wrong"}).status_code == 401
+    response = client.post("/auth/login", json={"email": email, "password": "pw-1234"})
+    assert response.status_code == 200
+
+    with SessionLocal() as db:
+        upgraded = db.query(User).filter(User.email == email).one().password_hash
+    assert upgraded.startswith("scrypt$")
+    # 교체된 해시로도 로그인
+    assert client.post("/auth/login", json={"email": email, "password": "pw-1234"}).status_code == 200
+
+
+def test_unknown_email_is_rejected_like_wrong_password(client, user_id):
+    # 없는 이메일도 DUMMY_HASH 로 검증한 뒤 같은 401
+    response = client.post("/auth/login", json={"email": f"{user_id}@example.com", "password": "pw-1234"})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "이메일 또는 비밀번호가 틀렸습니다."
+
+
+def test_login_returns_503_when_hash_pool_is_full(client, user_id, monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    response = client.post("/auth/login", json={"email": f"{user_id}@example.com", "password": "pw-1234"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_verified_token_is_cached(client, user_id):
+    email = f"{user_id}@example.com"
+    token = _signup(client, email).json()["access_token"]
+    assert token_cache.get(token) is None
+
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/auth/me", headers=headers).json() == {"email": email}
+    assert token_cache.get(token)["sub"] == email
+    # 캐시에서 꺼내도 같은 결과
+    assert client.get("/auth/me", headers=headers).json() == {"email": email}
+
+
+def test_bad_token_is_rejected(client):
+    response = client.get("/auth/me", headers={"Authorization": "Bearer not-a-jwt"})
+    assert response.status_code == 401
+
+
+def test_add_missing_columns_when_another_worker_added_them(db_ready, monkeypatch):
+    # 다른 워커가 email 컬럼을 먼저 추가한 상황: 조회 결과에는 없지만 ALTER 하면 "duplicate column"
+    real_inspect = sa_inspect
+
+    class StaleInspector:
+        def __init__(self, bind):
+            self._inspector = real_inspect(bind)
+
+        def get_columns(self, table_name):
+            columns = self._inspector.get_columns(table_name)
+            if table_name == "users":
+                columns = [c for c in columns if c["name"] != "email"]
+            return columns
+
+    monkeypatch.setattr(database, "inspect", StaleInspector)
+    database._add_missing_columns()  # 예전에는 OperationalError 로 워커 시작 실패
@@ -0,0 +1,30 @@
+# BE/tests/test_database.py
+"""서버 시작 시 DB 준비 (backend/database.py prepare_db)"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+BE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_workers_preparing_same_db_concurrently(tmp_path):
+    # 워커 여러 개가 동시에 시작하면서 기존 shape.db 에 새 테이블 / 컬럼을 만드는 경우
+    # (예전에는 init_db 를 동시에 불러서 "table user_best_scores already exists" 로 워커가 죽었음)
+    shutil.copy(os.path.join(BE_DIR, "shape.db"), tmp_path / "shape.db")
+    env = {
+        **os.environ,
+        "KCU_DATABASE_URL": f"sqlite:///{tmp_path / 'shape.db'}",
+        "KCU_MIGRATE_LOCK": str(tmp_path / "migrate.lock"),
+    }
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-c", "from backend.database import prepare_db; prepare_db()"],
+            cwd=BE_DIR, env=env, stderr=subprocess.PIPE, text=True,
+        )
+        for _ in range(3)
+    ]
+    for worker in workers:
+        _, stderr = worker.communicate(timeout=120)
+        assert worker.returncode == 0, stderr
@@ -0,0 +1,113 @@
+# BE/tests/test_idempotency.py
+"""Idempotency-Key 재전송 / 보관 기간이 지난 키 재사용 (backend/idempotency.py)"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.database import AsyncSessionLocal, SessionLocal
+from backend.idempotency import RECORD_FIELD, TTL_SECONDS, IdempotencyStore
+from backend.ingest import SCORE, write_records
+from backend.models import IdempotencyKey, MatchResult, Score
+
+
+pytestmark = pytest.mark.usefixtures("db_ready")
+
+
+@pytest.fixture
+def key():
+    return f"score.save:{uuid.uuid4()}"
+
+
+def _store_expired(key: str, age_seconds: float) -> None:
+    with SessionLocal() as db:
+        db.add(IdempotencyKey(
+            key=key,
+            response='{"old": true}',
+            created_at=datetime.utcnow() - timedelta(seconds=age_seconds),
+        ))
+        db.commit()
+
+
+def _stored(key: str) -> str:
+    with SessionLocal() as db:
+        return db.get(IdempotencyKey, key).response
+
+
+def test_expired_key_is_reused_as_new_request(key):
+    store = IdempotencyStore(ttl_seconds=60)
+    _store_expired(key, 120)
+
+    async def request():
+        async with AsyncSessionLocal() as db:
+            assert await store.lookup(db, key) is None
+            store.record(db, key, {"new": True})
+            # 예전에는 만료된 행이 남아 있어서 PK 충돌 → IntegrityError (500)
+            assert await store.commit_or_replay(db, key) is None
+
+    asyncio.run(request())
+    assert _stored(key) == '{"new": true}'
+
+
+def test_unexpired_key_is_replayed(key):
+    store = IdempotencyStore(ttl_seconds=60)
+    _store_expired(key, 10)
+
+    async def request():
+        async with AsyncSessionLocal() as db:
+            return await store.lookup(db, key)
+
+    replay = asyncio.run(request())
+    assert replay is not None
+    assert replay.headers["Idempotent-Replayed"] == "true"
+
+
+def test_write_behind_flush_reuses_expired_key(key, user_id):
+    _store_expired(key, TTL_SECONDS + 60)
+    record = {
+        "user_id": user_id,
+        "score": 42,
+        "date": "2026-10-18",
+        RECORD_FIELD: {"key": key, "response": {"new": True}},
+    }
+
+    with SessionLocal() as db:
+        scores, _ = write_records(db, [(SCORE, record)])
+
+    assert len(scores) == 1
+    assert _stored(key) == '{"new": true}'
+    with SessionLocal() as db:
+        assert db.query(Score).filter(Score.user_id == user_id).count() == 1
+
+
+def test_compete_submit_is_replayed_without_second_row(client, user_id):
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    body = {"user_id": user_id, "shape": "cube", "confidence": 0.9}
+
+    first = client.post("/compete/submit", json=body, headers=headers)
+    again = client.post("/compete/submit", json=body, headers=headers)
+
+    assert first.status_code == again.status_code == 200
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.json() == first.json()
+    with SessionLocal() as db:
+        assert db.query(Score).filter(Score.user_id == user_id).count() == 1
+
+
+def test_match_result_is_replayed_without_second_row(client, user_id):
+    winner, loser = f"{user_id}-a", f"{user_id}-b"
+    assert client.post("/match/join", json={"user_id": winner}).json()["status"] == "waiting"
+    match_id = client.post("/match/join", json={"user_id": loser}).json()["match_id"]
+
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    body = {"match_id": match_id, "winner_id": winner, "loser_id": loser}
+    first = client.post("/match/result", json=body, headers=headers)
+    again = client.post("/match/result", json=body, headers=headers)
+
+    assert first.status_code == again.status_code == 200
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.json() == first.json()
+    with SessionLocal() as db:
+        assert db.query(MatchResult).filter(MatchResult.match_id == match_id).count() == 1
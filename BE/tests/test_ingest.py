@@ -0,0 +1,163 @@
+# BE/tests/test_ingest.py
+"""write-behind 버퍼 (backend/ingest.py) 의 journal replay / dead-letter"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from sqlalchemy.exc import OperationalError
+
+from backend import ingest
+from backend.database import BASE_DIR, SessionLocal
+from backend.ingest import MATCH_RESULT, SCORE, WriteBehindBuffer, _dump, _make_buffer, write_records
+from backend.models import Rating, Score
+
+
+pytestmark = pytest.mark.usefixtures("db_ready")
+
+
+def _buffer(tmp_path, **kwargs) -> WriteBehindBuffer:
+    return WriteBehindBuffer(SessionLocal, journal_path=str(tmp_path / "ingest.journal"), fsync=False, **kwargs)
+
+
+def _score(user_id: str, score: float, **extra) -> dict:
+    return {"user_id": user_id, "score": score, "date": "2026-10-18", **extra}
+
+
+def _saved(user_id: str) -> list:
+    with SessionLocal() as db:
+        return sorted(s for (s,) in db.query(Score.score).filter(Score.user_id == user_id))
+
+
+def _dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_journal_is_per_process(tmp_path, user_id):
+    buffer = _buffer(tmp_path)
+    buffer.start()
+    try:
+        assert buffer.journal_path == f"{tmp_path / 'ingest.journal'}.{os.getpid()}"
+        buffer.submit(SCORE, [_score(user_id, 10)])
+        assert os.path.getsize(buffer.journal_path) > 0
+    finally:
+        buffer.stop()
+    assert _saved(user_id) == [10]
+
+
+def test_replays_only_orphaned_journals(tmp_path, user_id):
+    base = tmp_path / "ingest.journal"
+    dead = _dead_pid()
+    (base.parent / f"ingest.journal.{dead}.123.flushing").write_text(_dump(SCORE, _score(user_id, 1)))
+    (base.parent / f"ingest.journal.{dead}").write_text(_dump(SCORE, _score(user_id, 2)))
+    # 살아 있는 다른 워커 (여기서는 pytest 의 부모 프로세스) 가 쓰는 중인 journal
+    live = base.parent / f"ingest.journal.{os.getppid()}"
+    live.write_text(_dump(SCORE, _score(user_id, 3)))
+
+    buffer = _buffer(tmp_path)
+    buffer.start()
+    buffer.stop()
+
+    assert _saved(user_id) == [1, 2]
+    assert not (base.parent / f"ingest.journal.{dead}").exists()
+    assert live.exists()
+
+
+def test_rejected_record_goes_to_dead_letter(tmp_path, user_id):
+    with SessionLocal() as db:
+        existing = Score(**_score(user_id, 5))
+        db.add(existing)
+        db.commit()
+        existing_id = existing.id
+
+    buffer = _buffer(tmp_path)
+    buffer.start()
+    try:
+        buffer.submit(SCORE, [
+            _score(user_id, 6),
+            _score(user_id, 7, id=existing_id),  # PK 중복 → IntegrityError
+            _score(user_id, 8),
+        ])
+        assert buffer.flush() == 3
+        assert buffer._retry is None
+    finally:
+        buffer.stop()
+
+    assert _saved(user_id) == [5, 6, 8]
+    with open(buffer.dead_letter_path, encoding="utf-8") as f:
+        dead = [json.loads(line) for line in f]
+    assert [entry["data"]["score"] for entry in dead] == [7]
+
+
+def test_replay_does_not_fail_on_rejected_record(tmp_path, user_id):
+    with SessionLocal() as db:
+        existing = Score(**_score(user_id, 5))
+        db.add(existing)
+        db.commit()
+        existing_id = existing.id
+
+    (tmp_path / f"ingest.journal.{_dead_pid()}").write_text(
+        _dump(SCORE, _score(user_id, 7, id=existing_id)) + _dump(SCORE, _score(user_id, 9))
+    )
+    buffer = _buffer(tmp_path)
+    buffer.start()
+    buffer.stop()
+
+    assert _saved(user_id) == [5, 9]
+    assert os.path.exists(buffer.dead_letter_path)
+
+
+def test_two_results_for_new_player_in_one_batch(user_id):
+    records = [
+        (MATCH_RESULT, {"match_id": f"{user_id}-1", "winner_id": user_id, "loser_id": f"{user_id}-b"}),
+        (MATCH_RESULT, {"match_id": f"{user_id}-2", "winner_id": user_id, "loser_id": f"{user_id}-c"}),
+    ]
+    # 버퍼의 배치 분할 재시도 없이 트랜잭션 1번으로 써야 함
+    with SessionLocal() as db:
+        write_records(db, records)
+
+    with SessionLocal() as db:
+        rating = db.get(Rating, user_id)
+        assert (rating.games, rating.wins) == (2, 2)
+
+
+def test_retry_after_partial_flush_skips_committed_chunks(tmp_path, user_id, monkeypatch):
+    buffer = _buffer(tmp_path, max_batch=2)
+    monkeypatch.setattr(buffer, "_run", lambda: None)  # 백그라운드 flush 없이 테스트에서 직접 flush
+    buffer.start()
+    try:
+        buffer.submit(SCORE, [_score(user_id, score) for score in (1, 2, 3, 4)])
+
+        # 첫 청크 (1, 2) 는 commit, 두 번째 청크에서 DB 가 잠깐 잠김
+        calls = []
+
+        def flaky(db, records):
+            calls.append(len(records))
+            if len(calls) == 2:
+                raise OperationalError("INSERT", {}, Exception("database is locked"))
+            return write_records(db, records)
+
+        monkeypatch.setattr(ingest, "write_records", flaky)
+        with pytest.raises(OperationalError):
+            buffer.flush()
+        assert _saved(user_id) == [1, 2]
+        records, segment = buffer._retry
+        assert [data["score"] for _, data in records] == [3, 4]
+        # 재시도 전에 죽어도 replay 가 1, 2 를 다시 쓰지 않도록 segment 에도 남은 것만
+        assert [data["score"] for _, data in buffer._read_journal(segment)] == [3, 4]
+
+        assert buffer.flush() == 2
+    finally:
+        buffer.stop()
+    assert _saved(user_id) == [1, 2, 3, 4]
+
+
+def test_default_journal_is_next_to_backend_not_cwd(monkeypatch, tmp_path):
+    monkeypatch.delenv("KCU_INGEST_JOURNAL", raising=False)
+    monkeypatch.chdir(tmp_path)
+    assert _make_buffer().journal_base == os.path.join(BASE_DIR, "ingest.journal")
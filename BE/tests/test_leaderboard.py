@@ -0,0 +1,55 @@
+# BE/tests/test_leaderboard.py
+"""메모리 리더보드 (backend/leaderboard.py) 의 seed / offer"""
+
+import pytest
+
+from backend.database import SessionLocal
+from backend.leaderboard import Leaderboard
+from backend.models import Score
+
+
+pytestmark = pytest.mark.usefixtures("db_ready")
+
+
+def _save(db, user_id: str, score: float) -> Score:
+    row = Score(user_id=user_id, score=score, date="2026-10-18")
+    db.add(row)
+    db.commit()
+    return row
+
+
+def test_offer_during_seed_is_not_lost(user_id, monkeypatch):
+    board = Leaderboard(capacity=5)
+    with SessionLocal() as db:
+        _save(db, user_id, 1e9)
+
+    # seed 가 DB 를 읽은 뒤 ~ 리스트를 바꾸기 전에 다른 요청이 점수를 저장하고 offer
+    to_entry = Leaderboard._to_entry
+    late = []
+
+    def racing_to_entry(row):
+        if row.score == 1e9 and not late:
+            with SessionLocal() as other:
+                new = _save(other, user_id, 2e9)
+                late.append(new.id)
+                board.offer(new)
+        return to_entry(row)
+
+    monkeypatch.setattr(board, "_to_entry", racing_to_entry)
+    with SessionLocal() as db:
+        board.seed(db)
+
+    top = board.top(2)
+    assert [e.score for e in top] == [2e9, 1e9]
+    assert top[0].id == late[0]
+
+
+def test_seed_drops_offered_entries_the_snapshot_already_has(user_id):
+    board = Leaderboard(capacity=5)
+    with SessionLocal() as db:
+        row = _save(db, user_id, 3e9)
+        board.offer(row)  # seed 전 offer
+        board.seed(db)
+        board.offer(row)  # 같은 점수 다시 offer
+
+    assert [e.id for e in board.top(5)].count(row.id) == 1
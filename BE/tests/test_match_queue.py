@@ -0,0 +1,69 @@
+# BE/tests/test_match_queue.py
+"""진행 중 매치가 있는 유저가 다시 join 할 때 (backend/match_queue.py, match_backends.py)"""
+
+import asyncio
+
+from backend.match_backends import SqliteMatchBackend
+from backend.match_queue import MatchQueue
+
+
+def _queue() -> MatchQueue:
+    return MatchQueue(rating_of=lambda user_id: 1000.0)
+
+
+def test_waiter_picks_up_match_once():
+    queue = _queue()
+    assert queue.join("a") == (None, False, None)
+    match, created, _ = queue.join("b")
+    assert created
+
+    # 먼저 기다리던 a 는 다시 join 해서 매치를 받음
+    assert queue.join("a") == (match, False, None)
+    # 받은 뒤 다시 join 하면 새 게임: 이전 매치는 끝나고 대기열로
+    again, created, ended = queue.join("a")
+    assert (again, created) == (None, False)
+    assert ended == match
+    assert queue.get(match.match_id) is None
+    assert queue.is_waiting("a")
+
+
+def test_rejoin_after_playing_does_not_return_old_match():
+    queue = _queue()
+    queue.join("a")
+    match, _, _ = queue.join("b")
+
+    # b 는 join 응답으로 이미 받았으니 다시 join 하면 이전 매치가 아니라 새로 참가
+    again, created, ended = queue.join("b")
+    assert again is None and not created
+    assert ended == match
+
+
+def test_matched_event_marks_match_seen():
+    queue = _queue()
+    queue.join("a")
+    match, _, _ = queue.join("b")
+    queue.mark_seen("a", match.match_id)
+
+    _, _, ended = queue.join("a")
+    assert ended == match
+
+
+def test_sqlite_backend_same_rules(tmp_path):
+    backend = SqliteMatchBackend(path=str(tmp_path / "match_state.db"))
+
+    async def scenario():
+        await backend.start()
+        try:
+            assert (await backend.join("a"))[0] is None
+            match, created, _ = await backend.join("b")
+            assert created
+            assert await backend.join("a") == (match, False, None)
+
+            again, created, ended = await backend.join("a")
+            assert again is None and not created
+            assert ended == match
+            assert await backend.get(match.match_id) is None
+        finally:
+            await backend.stop()
+
+    asyncio.run(scenario())
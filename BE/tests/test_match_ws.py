@@ -0,0 +1,25 @@
+# BE/tests/test_match_ws.py
+"""/match/ws 가 이상한 프레임을 받아도 연결을 유지하는지"""
+
+import pytest
+
+
+@pytest.fixture
+def ws(client, user_id):
+    with client.websocket_connect(f"/match/ws?user_id={user_id}") as websocket:
+        assert websocket.receive_json()["type"] == "status"
+        yield websocket
+
+
+def test_malformed_json_frame_gets_error_event(ws):
+    ws.send_text("{not json")
+    assert ws.receive_json()["type"] == "error"
+    ws.send_json({"type": "ping"})
+    assert ws.receive_json() == {"type": "pong"}
+
+
+def test_binary_frame_gets_error_event(ws):
+    ws.send_bytes(b"\x00\x01binary")
+    assert ws.receive_json()["type"] == "error"
+    ws.send_json({"type": "ping"})
+    assert ws.receive_json() == {"type": "pong"}
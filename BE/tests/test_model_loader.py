@@ -0,0 +1,41 @@
+# BE/tests/test_model_loader.py
+"""CLIP 모델 지연 로딩 (backend/visualization/model_loader.py) 과 /healthz, /readyz"""
+
+import time
+
+import pytest
+
+from backend.visualization.model_loader import ModelLoader, ModelNotReady
+
+
+def test_healthz_ok_and_readyz_503_before_model_is_loaded(client):
+    # conftest 에서 KCU_MODEL_WARMUP=0 → 모델 로딩을 시작하지 않음
+    assert client.get("/healthz").json() == {"status": "ok"}
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["state"] == "idle"
+
+
+def test_loader_becomes_ready_after_load():
+    loader = ModelLoader("backend.visualization.stub_model")
+    with pytest.raises(ModelNotReady):
+        loader.module
+    loader.load()
+    assert loader.ready
+    assert loader.module.__name__ == "backend.visualization.stub_model"
+
+
+def test_failed_load_is_reported_and_can_be_retried():
+    loader = ModelLoader("backend.visualization.no_such_model")
+    loader.load()
+    assert loader.status()["state"] == "failed"
+    assert "ModuleNotFoundError" in loader.status()["error"]
+    with pytest.raises(ModelNotReady):
+        loader.module
+
+    loader.module_name = "backend.visualization.stub_model"
+    loader.start()
+    deadline = time.monotonic() + 10
+    while not loader.ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert loader.status() == {"state": "ready", "error": None}
@@ -0,0 +1,50 @@
+# BE/tests/test_parity.py
+"""
+텍스트 임베딩 캐시 + 배치 경로(classify_image)가
+예전 요청마다 CLIPModel 전체 forward 하던 결과와 같은 확률을 내는지 확인.
+torch / transformers 가 없거나 CLIP 가중치가 로컬 캐시에 없으면 skip (다운로드하지 않음).
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+huggingface_hub = pytest.importorskip("huggingface_hub")
+
+MODEL_NAME = "openai/clip-vit-base-patch32"
+
+if not isinstance(huggingface_hub.try_to_load_from_cache(MODEL_NAME, "config.json"), str):
+    pytest.skip(f"{MODEL_NAME} 가중치가 로컬 캐시에 없음", allow_module_level=True)
+if os.getenv("KCU_CLIP_BACKEND", "torch") != "torch":
+    pytest.skip("parity 는 fp32 torch 백엔드 기준", allow_module_level=True)
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from backend.visualization.parity import TOLERANCE, full_forward_probs  # noqa: E402
+from backend.visualization.clip_model import classify_image  # noqa: E402
+
+
+def shape_images():
+    images = [Image.new("RGB", (224, 224), "white")]
+    for i, draw_shape in enumerate(("ellipse", "rectangle", "polygon")):
+        image = Image.new("RGB", (320, 240), "white")
+        draw = ImageDraw.Draw(image)
+        color = (40 * i, 80, 200 - 40 * i)
+        if draw_shape == "polygon":
+            draw.polygon([(160, 30), (60, 210), (260, 210)], fill=color)
+        else:
+            getattr(draw, draw_shape)((80, 40, 240, 200), fill=color)
+        images.append(image)
+    return images
+
+
+@pytest.mark.parametrize("image", shape_images())
+def test_classify_image_matches_full_forward(image):
+    expected = full_forward_probs(image)
+    actual = classify_image(image)
+    assert len(actual) == len(expected)
+    assert max(abs(a - b) for a, b in zip(expected, actual)) <= TOLERANCE
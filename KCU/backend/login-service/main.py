@@ -1,20 +1,112 @@
 from fastapi import FastAPI, HTTPException, status
 from pydantic import BaseModel
+import asyncio
+import base64
 import hashlib  # 🔹 추가: 표준 라이브러리 해시 사용
+import hmac
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 
 app = FastAPI()
+logger = logging.getLogger(__name__)
 
 # -----------------------
-#  비밀번호 해시 함수 (SHA-256 사용)
+#  비밀번호 해시 함수 (scrypt 사용, 예전 SHA-256 해시는 로그인 때 scrypt 로 교체)
+#  메인 서버(BE/backend/auth/passwords.py)와 같은 구조:
+#  전용 스레드 풀에서만 돌리고, 대기 + 실행 중 요청이 너무 많으면 라우트가 바로 503
 # -----------------------
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2 ** 14, 8, 1  # 해시 1번에 16MB
+SALT_BYTES = 16
+SCRYPT_DKLEN = 32
+
+HASH_WORKERS = int(os.getenv("KCU_PASSWORD_HASH_WORKERS", "2"))
+HASH_MAX_PENDING = int(os.getenv("KCU_PASSWORD_HASH_MAX_PENDING", "32"))
+
+
+class PasswordHashQueueFull(Exception):
+    """해시 풀 대기열이 가득 참 (라우트에서 503 으로 바꿈)"""
+
+
+def _scrypt(plain_password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        plain_password.encode("utf-8"),
+        salt=salt, n=n, r=r, p=p,
+        maxmem=256 * r * n,
+        dklen=SCRYPT_DKLEN,
+    )
+
+
 def hash_password(plain_password: str) -> str:
-    # 평문 비밀번호를 SHA-256으로 해시해서 16진수 문자열로 반환
-    return hashlib.sha256(plain_password.encode("utf-8")).hexdigest()
+    # "scrypt$n$r$p$salt$hash" 형식으로 저장
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(plain_password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return "scrypt${}${}${}${}${}".format(
+        SCRYPT_N, SCRYPT_R, SCRYPT_P,
+        base64.b64encode(salt).decode(), base64.b64encode(digest).decode(),
+    )
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    # 입력 비밀번호를 다시 해시해서 DB에 저장된 값과 비교
-    return hash_password(plain_password) == hashed_password
+    # scrypt 해시면 같은 salt / 파라미터로 다시 계산, 아니면 예전 SHA-256 hex
+    try:
+        if hashed_password.startswith("scrypt$"):
+            _, n, r, p, salt, digest = hashed_password.split("$")
+            candidate = _scrypt(plain_password, base64.b64decode(salt), int(n), int(r), int(p))
+            return hmac.compare_digest(candidate, base64.b64decode(digest))
+        legacy = hashlib.sha256(plain_password.encode("utf-8")).hexdigest()
+        return hmac.compare_digest(legacy, hashed_password)
+    except ValueError:
+        return False
+
+
+# 없는 이메일로 로그인할 때 대신 검증하는 해시 (응답 시간으로 가입 여부를 알 수 없게)
+# 현재 파라미터라서 비용이 같고, digest 가 전부 0 이라 어떤 비밀번호와도 안 맞음
+DUMMY_HASH = "scrypt${}${}${}${}${}".format(
+    SCRYPT_N, SCRYPT_R, SCRYPT_P,
+    base64.b64encode(bytes(SALT_BYTES)).decode(), base64.b64encode(bytes(SCRYPT_DKLEN)).decode(),
+)
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.max_pending = max(1, max_pending)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="password-hash")
+        self._pending = 0  # 이벤트 루프 스레드에서만 바뀜
+
+    @asynccontextmanager
+    async def slot(self):
+        """자리가 없으면 기다리지 않고 바로 PasswordHashQueueFull"""
+        if self._pending >= self.max_pending:
+            raise PasswordHashQueueFull()
+        self._pending += 1
+        try:
+            yield
+        finally:
+            self._pending -= 1
+
+    async def _run(self, fn, *args):
+        async with self.slot():
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def hash(self, plain_password: str) -> str:
+        return await self._run(hash_password, plain_password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_busy() -> HTTPException:
+    # 로그인 / 가입이 몰려서 해시 풀 대기열이 가득 찬 경우
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="로그인 요청이 많습니다. 잠시 후 다시 시도해주세요.",
+        headers={"Retry-After": "1"},
+    )
 
 
 class SignUpRequest(BaseModel):
@@ -41,11 +133,11 @@ def root():
 
 
 @app.post("/signup", response_model=UserPublic)
-def signup(payload: SignUpRequest):
+async def signup(payload: SignUpRequest):
     email = payload.email
     password = payload.password
 
-    print("SIGNUP 요청:", email, password)
+    logger.debug("SIGNUP 요청")
 
     if email in fake_users_db:
         raise HTTPException(
@@ -53,31 +145,44 @@ def signup(payload: SignUpRequest):
             detail="이미 존재하는 이메일입니다.",
         )
 
-    # 🔹 여기서 SHA-256 해시 사용
-    hashed_pw = hash_password(password)
+    try:
+        hashed_pw = await password_hasher.hash(password)
+    except PasswordHashQueueFull:
+        raise hash_busy()
     fake_users_db[email] = {
         "email": email,
         "password": hashed_pw,
     }
-
-    print("현재 fake_users_db:", fake_users_db)
+    logger.debug("가입 완료 (계정 %d 개)", len(fake_users_db))
 
     return UserPublic(email=email)
 
 
 @app.post("/login")
-def login(payload: LoginRequest):
+async def login(payload: LoginRequest):
     email = payload.email
     password = payload.password
 
-    print("LOGIN 요청:", email, password)
-    print("현재 fake_users_db:", fake_users_db)
+    logger.debug("LOGIN 요청")
 
     user = fake_users_db.get(email)
-    if not user or not verify_password(password, user["password"]):
+    try:
+        # 없는 이메일도 같은 비용의 scrypt 를 돌림 (바로 401 을 주면 응답 시간으로 가입 여부가 드러남)
+        verified = await password_hasher.verify(password, user["password"] if user else DUMMY_HASH)
+        verified = verified and user is not None
+    except PasswordHashQueueFull:
+        raise hash_busy()
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="이메일 또는 비밀번호가 틀렸습니다.",
         )
 
+    # 예전 SHA-256 해시면 scrypt 로 교체 (풀이 바쁘면 다음 로그인 때 다시)
+    if not user["password"].startswith("scrypt$"):
+        try:
+            user["password"] = await password_hasher.hash(password)
+        except PasswordHashQueueFull:
+            pass
+
     return {"message": "로그인 성공"}